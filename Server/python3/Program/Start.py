@@ -5,15 +5,15 @@ Script principal que coordina el sistema completo de análisis de mercados.
 
 import sys
 import os
+import time
 
 # Agregar la carpeta scripts al path para importar los módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
 
+# Solo módulos ligeros al arrancar: pandas, requests y plotly se cargan en la etapa que los usa
 from scripts.DebugMotorBolsaIA import DebugMotorBolsaIA
-from scripts.NotificationLogicSender import comparar_y_notificar
 from scripts.styles.title_console import mostrar_titulo_estrategia
-from scripts.styles.exit_console import mostrar_resultados_trading
-from scripts.ObtenerIndicesDelMercado import obtener_indices_mercado
+from scripts.ObtenerIndicesDelMercado import obtener_indices_mercado, obtener_indices_mercado_estrategias, ESTRATEGIAS_DISPONIBLES, resolver_estrategias
 
 
 
@@ -23,6 +23,8 @@ def mostrar_uso():
     """
     print("🚀 SISTEMA DE ANÁLISIS DE MERCADOS - USO:")
     print("python Start.py <estrategia> [debug]")
+    print("python Start.py <all|estrategia1,estrategia2,...> [debug]")
+    print("python Start.py daemon [estrategia1,estrategia2,...] [debug]")
     print("")
     print("📋 ESTRATEGIAS DISPONIBLES:")
     print("   - corto_plazo     (Trading intradía)")
@@ -34,11 +36,249 @@ def mostrar_uso():
     print("🔍 OPCIONES DEBUG:")
     print("   - true/1/yes/y/verdadero  -> Activar modo debug")
     print("   - false/0/no/n/falso       -> Modo normal (por defecto)")
+    print("   Variables de entorno del modo debug (salida asíncrona con niveles y muestreo):")
+    print("   - MOTORBOLSA_LOG_NIVELES=ProcesingDataPandas=INFO,TradingLogicMarket=OFF")
+    print("   - MOTORBOLSA_LOG_MUESTREO=5        -> Trazas detalladas para 1 de cada 5 símbolos")
+    print("   - MOTORBOLSA_LOG_SIMBOLOS=AAPL,BTC  -> Trazas detalladas solo para esos símbolos")
+    print("   - MOTORBOLSA_LOG_SINCRONO=1         -> Salida por consola síncrona")
+    print("   - --startup-profile         -> Muestra el tiempo de importación de cada módulo")
+    print("")
+    print("🔬 PERFILADO (resultados en /app/logs/perfiles):")
+    print("   - --profile[=cprofile]      -> cProfile por etapa (archivo .pstats)")
+    print("   - --profile=sample          -> Muestreo de pilas de bajo coste (formato flamegraph .folded)")
+    print("   - --profile=tracemalloc     -> Mayores asignadores de memoria por etapa")
+    print("   - --profile-stages=<lista>  -> fetch, conversion, indicators, analysis, reports, events, notifications, pipeline o all")
+    print("                                  (por defecto fetch,indicators,analysis,reports)")
     print("")
     print("💡 EJEMPLOS:")
     print("   python Start.py mediano_plazo")
     print("   python Start.py corto_plazo true")
     print("   python Start.py agresivo 1")
+    print("   python Start.py all")
+    print("   python Start.py corto_plazo,mediano_plazo true")
+    print("   python Start.py daemon corto_plazo,agresivo")
+    print("   python Start.py mediano_plazo --startup-profile")
+    print("   python Start.py corto_plazo --profile=sample --profile-stages=fetch,indicators")
+    print("")
+    print("🤖 MODO DAEMON:")
+    print("   Mantiene el proceso activo y ejecuta cada estrategia según su 'frecuencia_daemon'")
+    print("   Sin lista de estrategias se planifican todas. Se detiene con SIGTERM o Ctrl+C")
+
+
+
+def ejecutar_estrategia(estrategia, modo_debug, debug, **contexto):
+    """
+    Ejecuta un ciclo completo (índices, resultados y reportes) para una estrategia.
+    :param contexto: Configuración y cachés reutilizadas entre ciclos en modo daemon
+    :return: Resultados del análisis o None si hubo error
+    """
+    try:
+        # Paso 1: Obtener índices del mercado
+        debug.escribir_paso(1, "obtener_indices_mercado", {
+            "estrategia": estrategia,
+            "modo_debug": modo_debug
+        })
+        
+        print("\n📊 PASO 1: Obteniendo índices del mercado...")
+        resultados_previos = (contexto.get('cache_resultados') or {}).get(estrategia, (None, None))[1]
+        with debug.span('obtener_indices_mercado', estrategia=estrategia) as registro:
+            resultados_trading = obtener_indices_mercado(estrategia, modo_debug, **contexto)
+            registro['simbolos'] = len(resultados_trading or {})
+        
+        if not resultados_trading:
+            print("❌ Error al obtener los índices del mercado")
+            return
+
+        # Modo daemon: sin barras nuevas no hay nada nuevo que mostrar ni reportar, solo los resúmenes vencidos
+        if resultados_previos is not None and resultados_trading is resultados_previos:
+            despachar_resumenes_vencidos(estrategia, modo_debug, debug)
+            return resultados_trading
+        
+        debug.escribir_paso(1, "obtener_indices_mercado_completado", {
+            "simbolos_procesados": len(resultados_trading)
+        })
+
+
+        publicar_resultados(estrategia, resultados_trading, modo_debug, debug)
+        
+        return resultados_trading
+
+    except Exception as e:
+        print(f"❌ ERROR en el proceso principal: {e}")
+        debug.escribir_error("main", str(e))
+        return None
+
+
+
+def publicar_resultados(estrategia, resultados_trading, modo_debug, debug):
+    """
+    Muestra los resultados de una estrategia, genera sus reportes y procesa las notificaciones (pasos 2 a 4).
+    """
+    # Paso 2: Mostrar resultados
+    debug.escribir_paso(2, "mostrar_resultados", {
+        "estrategia": estrategia,
+        "resultados_count": len(resultados_trading)
+    })
+    
+    print(f"\n📈 PASO 2: Mostrando resultados para {len(resultados_trading)} símbolos...")
+    from scripts.styles.exit_console import mostrar_resultados_trading
+    with debug.span('mostrar_resultados', estrategia=estrategia):
+        mostrar_resultados_trading(estrategia, resultados_trading, "actuales")
+
+
+    # Índice de cambios de señal (solo las barras nuevas desde la ejecución anterior): lo usan reportes y notificaciones
+    from helpers.eventos_senales import actualizar_eventos
+    with debug.span('eventos_senal', estrategia=estrategia) as registro:
+        registro['eventos'] = actualizar_eventos(estrategia, resultados_trading, verbose=modo_debug)
+
+
+    # Paso 3: Generación de Reportes Excel y Dashboard
+    debug.escribir_paso(3, "generar_reportes_excel_dashboard", {
+        "estrategia": estrategia,
+        "user_name": "Sistema_IA",  # o obtener de configuración
+        "resultados_count": len(resultados_trading)
+    })
+
+    print(f"\n📊 PASO 3: Generando reportes Excel y dashboard...")
+    from scripts.CreateReportExcelAndDashboard import generar_reporte_excel_dashboard
+
+    with debug.span('generar_reportes', estrategia=estrategia) as registro:
+        archivos_reportes = generar_reporte_excel_dashboard(
+            resultados_trading, 
+            estrategia, 
+            "Sistema_IA",  # username
+            modo_debug
+        )
+        registro['archivos'] = len(archivos_reportes or [])
+
+    if archivos_reportes:
+        debug.escribir_paso(3, "generar_reportes_excel_dashboard_completado", {
+            "archivos_generados": len(archivos_reportes)
+        })
+        print(f"✅ Reportes generados: {len(archivos_reportes)} archivos")
+    else:
+        print("❌ Error generando reportes")
+
+    # Paso 4: Notificaciones (comparación con el estado de señales de la ejecución anterior)
+    procesar_notificaciones(estrategia, resultados_trading, modo_debug, debug)
+
+
+
+def despachar_resumenes_vencidos(estrategia, modo_debug, debug):
+    """Encola los resúmenes de alertas con la ventana vencida de una estrategia sin barras nuevas."""
+    from scripts.NotificationLogicSender import despachar_pendientes
+    from scripts.ObtenerIndicesDelMercado import RUTA_LISTA_NOTIFICACIONES
+
+    with debug.span('resumenes_vencidos', estrategia=estrategia) as registro:
+        registro['lotes'] = despachar_pendientes(estrategia, RUTA_LISTA_NOTIFICACIONES, modo_debug)
+
+
+
+def symbols_configurados(estrategia):
+    """Símbolos configurados de la estrategia o None si no se pudo leer la configuración."""
+    from scripts.ObtenerIndicesDelMercado import cargar_configuracion
+
+    try:
+        return cargar_configuracion(estrategia)["symbols"]
+    except Exception as e:
+        print(f"⚠️  No se pudieron leer los símbolos configurados de {estrategia}: {e}")
+        return None
+
+
+
+def procesar_notificaciones(estrategia, resultados_trading, modo_debug, debug):
+    """
+    Compara las señales de la última barra con las guardadas en la ejecución anterior,
+    prepara la notificación si cambiaron y guarda el nuevo estado (paso 4).
+    Solo se lee y guarda el estado compacto por símbolo, no el histórico de resultados.
+    """
+    debug.escribir_paso(4, "procesar_notificaciones", {
+        "estrategia": estrategia
+    })
+
+    print(f"\n🔔 PASO 4: Procesando notificaciones...")
+    from scripts.NotificationLogicSender import comparar_y_notificar
+    from scripts.ObtenerIndicesDelMercado import RUTA_LISTA_NOTIFICACIONES, RUTA_LOG_NOTIFICACIONES
+    from helpers.estado_senales import extraer_matriz, cargar_matriz, guardar_estado
+    from helpers.eventos_senales import ultimos_cambios
+
+    with debug.span('notificaciones', estrategia=estrategia) as registro:
+        estado_actual = extraer_matriz(resultados_trading)
+        estado_anterior = cargar_matriz(estrategia, verbose=modo_debug)
+        resultado_notificacion = comparar_y_notificar(
+            estado_anterior or {},
+            estado_actual,
+            estrategia,
+            RUTA_LISTA_NOTIFICACIONES,
+            RUTA_LOG_NOTIFICACIONES,
+            modo_debug,
+            eventos=ultimos_cambios(estrategia)
+        )
+        guardar_estado(estrategia, estado_actual, verbose=modo_debug, symbols_configurados=symbols_configurados(estrategia))
+        registro['simbolos'] = len(estado_actual)
+
+    if isinstance(resultado_notificacion, tuple):
+        numeros, _ = resultado_notificacion
+        resultado_notificacion = f"Notificación preparada para {len(numeros)} números"
+
+    debug.escribir_paso(4, "procesar_notificaciones_completado", {
+        "estrategia": estrategia,
+        "resultado": resultado_notificacion
+    })
+    print(f"✅ {resultado_notificacion}")
+
+
+
+def cerrar_ejecucion(debug, estrategias, inicio, resultados, etiqueta):
+    """
+    Registra la duración y el resultado de la ejecución en las métricas y escribe
+    el archivo de métricas de Prometheus y el resumen JSON de la ejecución.
+    """
+    # Mismo módulo (helpers.metricas) que usa el pipeline, para compartir el registro
+    from helpers.metricas import DURACION_EJECUCION, ULTIMA_EJECUCION, escribir_metricas
+
+    duracion = time.time() - inicio
+    for estrategia in estrategias:
+        DURACION_EJECUCION.establecer(duracion, estrategia=estrategia)
+        ULTIMA_EJECUCION.establecer(time.time(), estrategia=estrategia, resultado="ok" if resultados else "error")
+
+    escribir_metricas(verbose=debug.modo_debug)
+    debug.escribir_perfiles(etiqueta)
+    debug.escribir_resumen(etiqueta)
+
+
+
+def ejecutar_estrategias(estrategias, modo_debug, debug):
+    """
+    Ejecuta varias estrategias en una sola pasada: descarga e indicadores compartidos
+    y después resultados y reportes de cada estrategia.
+    :return: Diccionario {estrategia: resultados} o None si hubo error
+    """
+    try:
+        debug.escribir_paso(1, "obtener_indices_mercado_estrategias", {
+            "estrategias": estrategias,
+            "modo_debug": modo_debug
+        })
+
+        print(f"\n📊 PASO 1: Obteniendo índices del mercado para {len(estrategias)} estrategias...")
+        with debug.span('obtener_indices_mercado_estrategias', estrategias=estrategias) as registro:
+            resultados_por_estrategia = obtener_indices_mercado_estrategias(estrategias, modo_debug)
+            registro['estrategias_con_resultados'] = len(resultados_por_estrategia or {})
+
+        if not resultados_por_estrategia:
+            print("❌ Error al obtener los índices del mercado")
+            return
+
+        for estrategia, resultados_trading in resultados_por_estrategia.items():
+            mostrar_titulo_estrategia(f"Resultados: {estrategia}")
+            publicar_resultados(estrategia, resultados_trading, modo_debug, debug)
+
+        return resultados_por_estrategia
+
+    except Exception as e:
+        print(f"❌ ERROR en el proceso principal: {e}")
+        debug.escribir_error("main", str(e))
+        return None
 
 
 
@@ -46,6 +286,18 @@ def main():
     """
     Función principal del sistema
     """
+    # Perfil de arranque: vuelve a ejecutar el programa midiendo la importación de cada módulo
+    if '--startup-profile' in sys.argv:
+        from scripts.helpers.startup_profile import ejecutar_con_perfil_arranque
+        argumentos = [argumento for argumento in sys.argv[1:] if argumento != '--startup-profile']
+        ejecutar_con_perfil_arranque(argumentos, script=os.path.abspath(__file__))
+        return
+
+    # Perfilado por etapas: --profile[=modo] y --profile-stages=etapas
+    from scripts.helpers.perfilado import extraer_opciones_perfil
+    argumentos_cli, modo_perfil, etapas_perfil = extraer_opciones_perfil(sys.argv[1:])
+    sys.argv = sys.argv[:1] + argumentos_cli
+
     # Paso 0: Verificar argumentos de línea de comandos
     if len(sys.argv) < 2:
         print("❌ ERROR: Debes especificar una estrategia")
@@ -56,21 +308,36 @@ def main():
     estrategia = sys.argv[1].lower()
     
     # Estrategias válidas
-    estrategias_validas = ['corto_plazo', 'mediano_plazo', 'largo_plazo', 'agresivo', 'conservador']
+    estrategias_validas = ESTRATEGIAS_DISPONIBLES
+    valores_debug_activo = ['true', '1', 'yes', 'y', 'verdadero']
+    valores_debug_inactivo = ['false', '0', 'no', 'n', 'falso']
+    argumentos = sys.argv[2:]
+    
+    # Varias estrategias en una pasada: 'all' o lista separada por comas
+    estrategias = resolver_estrategias(estrategia)
+    
+    # Modo daemon: lista opcional de estrategias separadas por coma (por defecto todas)
+    modo_daemon = estrategia == 'daemon'
+    if modo_daemon:
+        estrategias = estrategias_validas
+        if argumentos and argumentos[0].lower() not in valores_debug_activo + valores_debug_inactivo:
+            estrategias = resolver_estrategias(argumentos[0])
+            argumentos = argumentos[1:]
     
-    if estrategia not in estrategias_validas:
-        print(f"❌ ERROR: Estrategia '{estrategia}' no válida")
+    estrategias_invalidas = [e for e in estrategias if e not in estrategias_validas]
+    if estrategias_invalidas or not estrategias:
+        print(f"❌ ERROR: Estrategia '{', '.join(estrategias_invalidas)}' no válida")
         mostrar_uso()
         return
     
-    # Segundo parámetro: modo debug (opcional)
+    # Siguiente parámetro: modo debug (opcional)
     modo_debug = False
-    if len(sys.argv) > 2:
-        debug_arg = sys.argv[2].lower()
-        if debug_arg in ['true', '1', 'yes', 'y', 'verdadero']:
+    if argumentos:
+        debug_arg = argumentos[0].lower()
+        if debug_arg in valores_debug_activo:
             modo_debug = True
             print("🔍 MODO DEBUG ACTIVADO")
-        elif debug_arg in ['false', '0', 'no', 'n', 'falso']:
+        elif debug_arg in valores_debug_inactivo:
             modo_debug = False
             print("⚡ MODO NORMAL")
         else:
@@ -80,86 +347,56 @@ def main():
     
     # Inicializar el modo debug
     debug = DebugMotorBolsaIA(modo_debug=modo_debug)
+    if modo_perfil and not debug.activar_perfilado(modo_perfil, etapas_perfil):
+        mostrar_uso()
+        return
     
     # Mostrar banner del sistema
     mostrar_titulo_estrategia("SISTEMA DE ANÁLISIS DE MERCADOS")
-    print(f"🎯 Estrategia seleccionada: {estrategia.upper()}")
+    print(f"🎯 Estrategia seleccionada: {', '.join(estrategias).upper()}")
     print(f"🔍 Modo debug: {'ACTIVADO' if modo_debug else 'DESACTIVADO'}")
+    if modo_daemon:
+        print("🤖 Modo daemon: ACTIVADO")
+    if modo_perfil:
+        print(f"🔬 Perfilado: {modo_perfil}")
     print("=" * 80)
 
-    try:
-        # Paso 1: Obtener índices del mercado
-        debug.escribir_paso(1, "obtener_indices_mercado", {
-            "estrategia": estrategia,
-            "modo_debug": modo_debug
-        })
-        
-        print("\n📊 PASO 1: Obteniendo índices del mercado...")
-        resultados_trading = obtener_indices_mercado(estrategia, modo_debug)
-        
-        if not resultados_trading:
-            print("❌ Error al obtener los índices del mercado")
-            return
-        
-        debug.escribir_paso(1, "obtener_indices_mercado_completado", {
-            "simbolos_procesados": len(resultados_trading)
-        })
-
-
-        # Paso 2: Mostrar resultados
-        debug.escribir_paso(2, "mostrar_resultados", {
-            "estrategia": estrategia,
-            "resultados_count": len(resultados_trading)
-        })
-        
-        print(f"\n📈 PASO 2: Mostrando resultados para {len(resultados_trading)} símbolos...")
-        mostrar_resultados_trading(estrategia, resultados_trading, "actuales")
-
+    if modo_daemon:
+        from scripts.DaemonMotorBolsaIA import DaemonMotorBolsaIA
 
-        # Paso 3: Generación de Reportes Excel y Dashboard
-        debug.escribir_paso(3, "generar_reportes_excel_dashboard", {
-            "estrategia": estrategia,
-            "user_name": "Sistema_IA",  # o obtener de configuración
-            "resultados_count": len(resultados_trading)
-        })
+        from helpers.metricas import iniciar_servidor_metricas
 
-        print(f"\n📊 PASO 3: Generando reportes Excel y dashboard...")
-        from scripts.CreateReportExcelAndDashboard import generar_reporte_excel_dashboard
+        def ejecutar_ciclo(estrategia, **contexto):
+            # Un resumen JSON por ciclo: los registros se vacían al escribirlo
+            inicio, resultados = time.time(), None
+            try:
+                resultados = ejecutar_estrategia(estrategia, modo_debug, debug, **contexto)
+                return resultados
+            finally:
+                cerrar_ejecucion(debug, [estrategia], inicio, resultados, f"daemon_{estrategia}")
 
-        archivos_reportes = generar_reporte_excel_dashboard(
-            resultados_trading, 
-            estrategia, 
-            "Sistema_IA",  # username
-            modo_debug
-        )
+        # Endpoint /metrics mientras el daemon esté activo
+        servidor_metricas = iniciar_servidor_metricas(verbose=modo_debug)
+        daemon = DaemonMotorBolsaIA(estrategias, ejecutar_ciclo, modo_debug=modo_debug)
+        try:
+            daemon.ejecutar()
+        finally:
+            if servidor_metricas:
+                servidor_metricas.shutdown()
+        return
 
-        if archivos_reportes:
-            debug.escribir_paso(3, "generar_reportes_excel_dashboard_completado", {
-                "archivos_generados": len(archivos_reportes)
-            })
-            print(f"✅ Reportes generados: {len(archivos_reportes)} archivos")
+    # Métricas de Prometheus y resumen JSON de la ejecución (tiempos por etapa, latencias de proveedores)
+    inicio, resultados = time.time(), None
+    try:
+        if len(estrategias) > 1:
+            resultados = ejecutar_estrategias(estrategias, modo_debug, debug)
         else:
-            print("❌ Error generando reportes")
+            resultados = ejecutar_estrategia(estrategias[0], modo_debug, debug)
+        return resultados
+    finally:
+        cerrar_ejecucion(debug, estrategias, inicio, resultados, estrategias[0] if len(estrategias) == 1 else "multiestrategia")
 
-        '''
-        # Paso 4: Notificaciones (opcional - puedes comentar si no quieres notificaciones)
-        debug.escribir_paso(3, "procesar_notificaciones", {
-            "estrategia": estrategia
-        })
-        
-        print(f"\n🔔 PASO 4: P  rocesando notificaciones...")
-        # Aquí puedes agregar la lógica de notificaciones si la necesitas
-        # resultado_notificacion = comparar_y_notificar(...)
-        
-        print("✅ PROCESO COMPLETADO EXITOSAMENTE")
-        '''
-        
-        return resultados_trading
 
-    except Exception as e:
-        print(f"❌ ERROR en el proceso principal: {e}")
-        debug.escribir_error("main", str(e))
-        return None
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
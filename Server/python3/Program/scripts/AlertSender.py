@@ -1,11 +1,17 @@
-import smtplib
+def enviar_alerta(mensaje, destinatarios=None):
+    """
+    Encola la alerta por correo. El envío lo hace el despachador de notificaciones en segundo plano,
+    reutilizando una conexión SMTP autenticada (sección [SMTP] de notificaciones.info).
+    :param destinatarios: Lista de correos (por defecto los destinatarios configurados)
+    :return: Número de lotes encolados o None si el correo no está configurado
+    """
+    from helpers.cola_notificaciones import obtener_despachador
 
-def enviar_alerta(mensaje):
-    servidor = smtplib.SMTP("smtp.gmail.com", 587)
-    servidor.starttls()
-    servidor.login("tu_correo@gmail.com", "tu_contraseña")
-    servidor.sendmail("tu_correo@gmail.com", "destinatario@gmail.com", mensaje)
-    servidor.quit()
+    despachador = obtener_despachador()
+    if despachador is None or 'email' not in despachador.canales:
+        print("❌ Canal de correo no configurado (sección [SMTP] de notificaciones.info)")
+        return None
+    return despachador.encolar('email', destinatarios or despachador.canales['email'].destinatarios, mensaje)
 
 # Dentro de la estrategia
 def next(self):
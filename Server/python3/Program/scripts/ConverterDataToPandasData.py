@@ -1,5 +1,60 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from helpers.log_asincrono import traza_activa
+
+
+FORMATO_FECHA_PROVEEDOR = '%Y-%m-%d %H:%M:%S'
+
+
+
+def _construir_dataframe_directo(values, verbose=False):
+    """
+    Ruta rápida: construye el DataFrame directamente desde los registros del proveedor,
+    con una sola reserva de memoria por columna, tipos finales y orden ascendente.
+    Si los datos ya vienen ordenados (los proveedores entregan del más reciente al más antiguo)
+    se invierte con una vista en lugar de ordenar.
+    :param values: Lista de registros {'datetime', 'open', 'high', 'low', 'close', 'volume'}
+    :return: DataFrame con índice datetime ascendente o None si los datos requieren la ruta general
+    """
+    n = len(values)
+    try:
+        fechas = pd.to_datetime(
+            np.fromiter((registro['datetime'] for registro in values), dtype=object, count=n),
+            format=FORMATO_FECHA_PROVEEDOR
+        )
+        columnas = {
+            destino: np.fromiter((registro[origen] for registro in values), dtype=np.float64, count=n)
+            for origen, destino in (('open', 'Open'), ('high', 'High'), ('low', 'Low'), ('close', 'Close'), ('volume', 'Volume'))
+        }
+    except (KeyError, TypeError, ValueError):
+        # Fechas con formato irregular o campos faltantes: usar la ruta general con reparación
+        return None
+
+    marcas = fechas.asi8
+    saltos = np.diff(marcas)
+    if (saltos >= 0).all():
+        orden = "ascendente"
+    elif (saltos <= 0).all():
+        # Vista invertida: sin copia
+        orden = "descendente (vista invertida)"
+        fechas = fechas[::-1]
+        columnas = {nombre: columna[::-1] for nombre, columna in columnas.items()}
+    else:
+        orden = "desordenado (argsort)"
+        indices = np.argsort(marcas, kind='stable')
+        fechas = fechas[indices]
+        columnas = {nombre: columna[indices] for nombre, columna in columnas.items()}
+
+    if verbose:
+        print(f"  ⚡ Ruta rápida: {n} registros, orden de entrada {orden}")
+
+    # Índice sin nombre para no hacer ambigua la columna 'datetime' en sort_values
+    return pd.DataFrame(
+        {'datetime': fechas, **columnas},
+        index=pd.DatetimeIndex(fechas),
+        copy=False
+    )
 
 def convertir_a_dataframe(datos_historicos, verbose=False):
     """
@@ -16,22 +71,34 @@ def convertir_a_dataframe(datos_historicos, verbose=False):
     dataframes = {}
     
     for symbol, data in datos_historicos.items():
-        if verbose:
+        # Trazas detalladas solo para los símbolos muestreados (helpers.log_asincrono)
+        detalle = traza_activa('ConverterDataToPandasData', symbol, verbose)
+        if detalle:
             print(f"\n{'='*50}")
             print(f"PROCESANDO SÍMBOLO: {symbol}")
             print(f"{'='*50}")
         
         if 'values' not in data or not data['values']:
-            if verbose:
+            if detalle:
                 print(f"❌ No hay datos válidos para {symbol}")
             continue
         
         if 'values' in data:
-            # Crear DataFrame
+            df = _construir_dataframe_directo(data['values'], detalle)
+            if df is not None:
+                if detalle:
+                    print(f"\nRESUMEN PARA {symbol}:")
+                    print(f"  DataFrame shape: {df.shape}")
+                    print(f"  Rango de fechas: {df['datetime'].iloc[0]} a {df['datetime'].iloc[-1]}")
+                    print(f"  Último precio Close: {df['Close'].iloc[-1]}")
+                dataframes[symbol] = df
+                continue
+
+            # Ruta general: crear DataFrame
             df = pd.DataFrame(data['values'])
 
-            # Mostrar datos de entrada si verbose está activado
-            if verbose:
+            # Mostrar datos de entrada si las trazas del símbolo están activadas
+            if detalle:
                 print(f"DATOS DE ENTRADA PARA {symbol}:")
                 print(f"Número de registros: {len(df)}")
                 if len(df) > 0:
@@ -45,49 +112,44 @@ def convertir_a_dataframe(datos_historicos, verbose=False):
                     print(f"  volume: {primer_registro['volume']}")
                 
             # Conversión de datetime
-            if verbose:
+            if detalle:
                 print(f"\nCÁLCULO: Conversión de datetime")
                 print(f"  Función: pd.to_datetime(df['datetime'], errors='coerce')")
                 print(f"  Valores de entrada: {len(df)} registros de fecha/hora")
                 if len(df) > 0:
                     print(f"  Ejemplo: {df['datetime'].iloc[0]}")
 
+            fechas_originales = df['datetime'].astype(str)
             df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')  # Convertir a formato de fecha y hora
 
             # Verificar si hay fechas que no se pudieron parsear
             fechas_invalidas = df['datetime'].isna().sum()
             if fechas_invalidas > 0:
-                if verbose:
+                if detalle:
                     print(f"⚠️  Advertencia: {fechas_invalidas} fechas no pudieron ser parseadas automáticamente")
-                    print("🔄 Intentando parsing manual para fechas problemáticas...")
+                    print("🔄 Intentando reparar en bloque las fechas problemáticas...")
                 
-                # Método de respaldo: parsing manual para fechas problemáticas
-                for idx in df[df['datetime'].isna()].index:
-                    fecha_original = df.loc[idx, 'datetime']
-                    try:
-                        # Limpiar formato de fecha (ej: "2025-10-16 04:00:00:00" -> "2025-10-16 04:00:00")
-                        fecha_limpia = str(fecha_original).rstrip(':00')
-                        if len(fecha_limpia) == 19:  # Formato YYYY-MM-DD HH:MM:SS
-                            df.loc[idx, 'datetime'] = pd.to_datetime(fecha_limpia, errors='coerce')
-                        elif len(fecha_limpia) == 16:  # Formato YYYY-MM-DD HH:MM
-                            df.loc[idx, 'datetime'] = pd.to_datetime(fecha_limpia + ':00', errors='coerce')
-                        elif len(fecha_limpia) == 10:  # Formato YYYY-MM-DD
-                            df.loc[idx, 'datetime'] = pd.to_datetime(fecha_limpia + ' 00:00:00', errors='coerce')
-                    except:
-                        continue
+                # Método de respaldo vectorizado: extraer fecha y hora de las cadenas problemáticas
+                # (ej: "2025-10-16 04:00:00:00" -> "2025-10-16 04:00:00", "2025-10-16" -> "2025-10-16 00:00:00")
+                mascara = df['datetime'].isna()
+                partes = fechas_originales[mascara].str.extract(
+                    r'^\s*(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2})(?::(\d{2}))?)?'
+                )
+                fechas_limpias = partes[0] + ' ' + partes[1].fillna('00:00') + ':' + partes[2].fillna('00')
+                df.loc[mascara, 'datetime'] = pd.to_datetime(fechas_limpias, format='%Y-%m-%d %H:%M:%S', errors='coerce')
                 
                 # Contar fechas aún inválidas después del parsing manual
                 fechas_invalidas_final = df['datetime'].isna().sum()
                 if fechas_invalidas_final > 0:
-                    if verbose:
+                    if detalle:
                         print(f"❌ {fechas_invalidas_final} fechas aún no pudieron ser parseadas")
                     # Eliminar filas con fechas inválidas
                     df = df.dropna(subset=['datetime'])
-                    if verbose:
+                    if detalle:
                         print(f"✅ Filas restantes después de limpieza: {len(df)}")
 
             # Renombrar columnas
-            if verbose:
+            if detalle:
                 print(f"\nCÁLCULO: Renombrado de columnas")
                 print(f"  Función: df.rename(columns=mapping_dict)")
                 column_mapping = {
@@ -108,11 +170,11 @@ def convertir_a_dataframe(datos_historicos, verbose=False):
                 'volume': 'Volume'
             })
 
-            if verbose:
+            if detalle:
                 print(f"  Columnas después: {list(df.columns)}")
             
             # Conversión de tipos de datos numéricos
-            if verbose:
+            if detalle:
                 print(f"\nCÁLCULO: Conversión de tipos numéricos")
                 print(f"  Función: df[columns].astype(float)")
                 numeric_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
@@ -125,22 +187,25 @@ def convertir_a_dataframe(datos_historicos, verbose=False):
             df[['Open', 'High', 'Low', 'Close', 'Volume']] = df[['Open', 'High', 'Low', 'Close', 'Volume']].astype(float)  # Convertir valores numéricos
 
             # Ordenar por fecha
-            if verbose:
+            if detalle:
                 print(f"\nCÁLCULO: Ordenamiento por fecha")
                 print(f"  Función: df.sort_values(by='datetime')")
                 print(f"  Registros antes: {len(df)}")
                 if len(df) > 1:
                     print(f"  Rango temporal: {df['datetime'].min()} a {df['datetime'].max()}")
             
-            df = df.sort_values(by='datetime')
+            df = df.sort_values(by='datetime', kind='stable')
+            # Mismo resultado que la ruta rápida: índice datetime ascendente sin nombre
+            df = df.set_index(pd.DatetimeIndex(df['datetime']), drop=False)
+            df.index.name = None
 
-            if verbose:
+            if detalle:
                 print(f"  Registros después: {len(df)}")
                 if len(df) > 1:
                     print(f"  Rango temporal ordenado: {df['datetime'].min()} a {df['datetime'].max()}")
             
             # Resumen final
-            if verbose:
+            if detalle:
                 print(f"\nRESUMEN PARA {symbol}:")
                 print(f"  DataFrame shape: {df.shape}")
                 print(f"  Columnas: {list(df.columns)}")
@@ -153,7 +218,7 @@ def convertir_a_dataframe(datos_historicos, verbose=False):
 
             dataframes[symbol] = df
         else:
-            if verbose:
+            if detalle:
                 print(f"ADVERTENCIA: No se encontraron valores para {symbol}")
             else:
                 print(f"Advertencia: No se encontraron valores para {symbol}")
@@ -4,20 +4,42 @@ Script para generar reportes en Excel, CSV y dashboards gráficos interactivos.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.patches import Rectangle
 import numpy as np
 import os
 from datetime import datetime
 import warnings
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import plotly.express as px
 warnings.filterwarnings('ignore')
 
+# Directorio donde se guardan los reportes (CSV, Excel y gráficos HTML)
+DIRECTORIO_REPORTES = "/app/tmp"
+
+# Procesos para los artefactos por símbolo (CSV y gráfico HTML): None = opción 'procesos' de reportes.info
+# (0 o sin configurar = uno por núcleo), 1 = en serie en el proceso principal
+PROCESOS_REPORTES = None
+
+# Salida HTML de los dashboards (sobrescribibles con modo_dashboard/comprimir_dashboard de reportes.info):
+# - 'compartido': plotly.js se escribe una sola vez en DIRECTORIO_ASSETS y cada HTML lo referencia;
+#   los datos van como arrays binarios compactos (float32 y fechas en milisegundos)
+# - 'autonomo': cada HTML incluye plotly.js completo y los datos en float64 (comportamiento anterior)
+MODO_DASHBOARD = 'compartido'
+COMPRIMIR_DASHBOARD = True          # escribe además .gz precomprimidos (gzip_static de nginx o similares)
+DIRECTORIO_ASSETS = "assets"        # relativo a DIRECTORIO_REPORTES
+
+# Nivel de detalle de los gráficos: puntos por serie de cada panel (0 = todas las barras) y barras recientes
+# que se dibujan siempre completas; el histórico anterior se reduce (LTTB en líneas y barras, OHLC en velas).
+# Sobrescribibles con puntos_<panel> y ventana_completa de reportes.info
+PUNTOS_PANELES = {
+    'velas': 1000,
+    'volumen': 1500,
+    'momento': 2000,
+    'macd': 2000,
+    'tendencia': 1500
+}
+VENTANA_COMPLETA = 500
+
 # Configuración de estilo
-plt.style.use('seaborn-v0_8')
 COLORES = {
     'compra_fuerte': '#00FF00',
     'compra': '#90EE90', 
@@ -40,9 +62,11 @@ COLORES = {
     'volume': '#4169E1'
 }
 
-def generar_reporte_excel_dashboard(resultados_trading, estrategia, user_name, verbose=False):
+def generar_reporte_excel_dashboard(resultados_trading, estrategia, user_name, verbose=False, procesos=None):
     """
     Función principal que genera reportes Excel, CSV y dashboards gráficos.
+    Los CSV y gráficos de cada símbolo se generan en paralelo (ver generar_artefactos_por_symbol).
+    :param procesos: Número de procesos para los artefactos por símbolo (None = PROCESOS_REPORTES / reportes.info)
     """
     
     if verbose:
@@ -63,24 +87,21 @@ def generar_reporte_excel_dashboard(resultados_trading, estrategia, user_name, v
         #if archivo_excel:
         #    archivos_generados.append(archivo_excel)
         
-        # Paso 2: Generar archivos CSV por símbolo
+        # Pasos 2 y 3: Generar archivos CSV y gráficos interactivos individuales por símbolo
         if verbose:
-            print(f"   📊 Paso 2: Generando archivos CSV...")
+            print(f"   📊 Pasos 2 y 3: Generando archivos CSV y gráficos interactivos individuales...")
         
-        archivos_csv = generar_archivos_csv(resultados_trading, user_name, timestamp, estrategia, verbose)
-        archivos_generados.extend(archivos_csv)
+        opciones_dashboard = resolver_opciones_dashboard(verbose)
+        artefactos = generar_artefactos_por_symbol(resultados_trading, estrategia, user_name, timestamp, procesos, verbose,
+                                                   opciones_dashboard)
+        archivos_generados.extend(archivo_csv for archivo_csv, _ in artefactos if archivo_csv)
         
-        # Paso 3: Generar gráficos interactivos individuales por símbolo
-        if verbose:
-            print(f"   📊 Paso 3: Generando gráficos interactivos individuales...")
+        # Paso 2b: Último cambio de cada señal y su vigencia (desde el índice de eventos, sin releer históricos)
+        archivo_cambios = generar_csv_cambios_señal(estrategia, user_name, verbose)
+        if archivo_cambios:
+            archivos_generados.append(archivo_cambios)
         
-        for symbol, df in resultados_trading.items():
-            if len(df) > 0:
-                archivo_individual = generar_grafico_interactivo_individual(
-                    symbol, df, estrategia, user_name, timestamp, verbose
-                )
-                if archivo_individual:
-                    archivos_generados.append(archivo_individual)
+        archivos_generados.extend(archivo_grafico for _, archivo_grafico in artefactos if archivo_grafico)
         
         if verbose:
             print(f"   ✅ Reportes generados exitosamente: {len(archivos_generados)} archivos")
@@ -92,13 +113,107 @@ def generar_reporte_excel_dashboard(resultados_trading, estrategia, user_name, v
             print(f"   ❌ Error generando reportes: {e}")
         return []
 
+def generar_artefactos_por_symbol(resultados_trading, estrategia, user_name, timestamp, procesos=None, verbose=False,
+                                  opciones_dashboard=None):
+    """
+    Genera el CSV y el gráfico interactivo de cada símbolo. write_html y la serialización de la figura
+    son CPU, así que con más de un proceso los símbolos se reparten en un pool de procesos.
+    Los nombres de archivo no dependen del orden de ejecución y el resultado sigue el orden de resultados_trading.
+    Si el pool falla (por ejemplo, sin permisos para crear procesos) se genera todo en serie.
+    :return: Lista de tuplas (ruta_csv, ruta_grafico), con None en los artefactos no generados
+    """
+    symbols = list(resultados_trading)
+    procesos = resolver_procesos_reportes(procesos, len(symbols), verbose)
+    opciones_dashboard = opciones_dashboard or resolver_opciones_dashboard(verbose)
+
+    # plotly.js compartido: se escribe antes de repartir el trabajo para que los procesos no compitan por él
+    if opciones_dashboard['modo'] == 'compartido' and symbols:
+        preparar_plotlyjs_compartido(opciones_dashboard['comprimir'], verbose)
+
+    if procesos > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # forkserver/spawn: el proceso principal puede tener hilos activos (despachador de notificaciones)
+        metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        contexto = multiprocessing.get_context(metodo)
+        if metodo == 'forkserver':
+            # El servidor importa pandas/plotly una vez y los procesos nacen con ellos ya cargados
+            contexto.set_forkserver_preload(['__main__', __name__])
+        if verbose:
+            print(f"      ⚙️  {len(symbols)} símbolos en {procesos} procesos ({metodo})")
+        try:
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                                     initializer=_inicializar_proceso_reportes, initargs=(DIRECTORIO_REPORTES,)) as executor:
+                futuros = [executor.submit(generar_artefactos_symbol, symbol, resultados_trading[symbol],
+                                           estrategia, user_name, timestamp, verbose, opciones_dashboard)
+                           for symbol in symbols]
+                return [futuro.result() for futuro in futuros]
+        except Exception as e:
+            print(f"   ⚠️  Error en el pool de procesos de reportes ({e}); se generan en serie")
+
+    return [generar_artefactos_symbol(symbol, resultados_trading[symbol], estrategia, user_name, timestamp, verbose,
+                                      opciones_dashboard)
+            for symbol in symbols]
+
+def resolver_procesos_reportes(procesos, num_symbols, verbose=False):
+    """
+    Número de procesos a usar: el parámetro, PROCESOS_REPORTES o la opción de reportes.info, en ese orden
+    (0 = uno por núcleo), sin superar el número de símbolos.
+    """
+    if procesos is None:
+        procesos = PROCESOS_REPORTES
+    if procesos is None:
+        from helpers.config_loader import cargar_opciones_reportes
+
+        procesos = cargar_opciones_reportes(verbose).get('procesos', 0)
+    if procesos <= 0:
+        procesos = os.cpu_count() or 1
+    return max(1, min(procesos, num_symbols))
+
+def resolver_opciones_dashboard(verbose=False):
+    """
+    Opciones de salida de los dashboards: MODO_DASHBOARD y COMPRIMIR_DASHBOARD, sobrescritas por reportes.info.
+    :return: Diccionario {'modo': 'compartido' | 'autonomo', 'comprimir': bool}
+    """
+    from helpers.config_loader import cargar_opciones_reportes
+
+    opciones = cargar_opciones_reportes(verbose)
+    modo = opciones.get('modo_dashboard', MODO_DASHBOARD)
+    if modo not in ('compartido', 'autonomo'):
+        print(f"   ⚠️  modo_dashboard desconocido '{modo}', se usa '{MODO_DASHBOARD}'")
+        modo = MODO_DASHBOARD
+    return {
+        'modo': modo,
+        'comprimir': opciones.get('comprimir_dashboard', COMPRIMIR_DASHBOARD),
+        'puntos': {panel: opciones.get(f'puntos_{panel}', puntos) for panel, puntos in PUNTOS_PANELES.items()},
+        'ventana_completa': opciones.get('ventana_completa', VENTANA_COMPLETA)
+    }
+
+def _inicializar_proceso_reportes(directorio):
+    """Inicializa cada proceso del pool con el directorio de reportes del proceso principal."""
+    global DIRECTORIO_REPORTES
+    DIRECTORIO_REPORTES = directorio
+
+def generar_artefactos_symbol(symbol, df, estrategia, user_name, timestamp, verbose=False, opciones_dashboard=None):
+    """
+    Genera el CSV y el gráfico interactivo de un símbolo (unidad de trabajo del pool de reportes).
+    :return: Tupla (ruta_csv, ruta_grafico), con None en los artefactos no generados
+    """
+    if len(df) == 0:
+        return None, None
+    archivo_csv = generar_csv_symbol(symbol, df, user_name, estrategia, verbose)
+    archivo_grafico = generar_grafico_interactivo_individual(symbol, df, estrategia, user_name, timestamp, verbose,
+                                                             opciones_dashboard)
+    return archivo_csv, archivo_grafico
+
 def generar_archivo_excel(resultados_trading, estrategia, user_name, timestamp, verbose=False):
     """
     Genera archivo Excel con todos los datos de trading ordenados por fecha.
     """
     try:
         nombre_archivo = f"{user_name}_reporte_{estrategia}_{timestamp}.xlsx"
-        ruta_archivo = f"/app/tmp/{nombre_archivo}"
+        ruta_archivo = os.path.join(DIRECTORIO_REPORTES, nombre_archivo)
         
         with pd.ExcelWriter(ruta_archivo, engine='openpyxl') as writer:
             # Hoja 1: Resumen ejecutivo
@@ -142,23 +257,16 @@ def crear_resumen_ejecutivo(resultados_trading, verbose=False):
     """
     Crea DataFrame con resumen ejecutivo de todas las estrategias.
     """
+    from helpers.estado_senales import es_columna_señal
+
     datos_resumen = []
     
     for symbol, df in resultados_trading.items():
         if len(df) > 0:
             ultimo = df.iloc[-1]
             
-            # Extraer señales de estrategia
-            señales_estrategia = {}
-            for col in df.columns:
-                if col.startswith('estrategia_') and not col.endswith(('_valor', '_descripcion')):
-                    if col in ultimo:
-                        señales_estrategia[col] = ultimo[col]
-            
-            # Contar señales
-            compras = sum(1 for s in señales_estrategia.values() if 'COMPRA' in str(s))
-            ventas = sum(1 for s in señales_estrategia.values() if 'VENTA' in str(s))
-            holds = sum(1 for s in señales_estrategia.values() if 'HOLD' in str(s))
+            # Señales de estrategia de la última barra, contadas sobre toda la fila a la vez
+            señales_estrategia = ultimo[[col for col in df.columns if es_columna_señal(col)]].astype(str)
             
             datos_resumen.append({
                 'Símbolo': symbol,
@@ -166,9 +274,9 @@ def crear_resumen_ejecutivo(resultados_trading, verbose=False):
                 'Señal Mayoritaria': ultimo.get('estrategia_mayoritaria', 'N/A'),
                 #'Fuerza Señal': ultimo.get('fuerza_señal', 'N/A'),
                 'Total Estrategias': len(señales_estrategia),
-                'Señales COMPRA': compras,
-                'Señales VENTA': ventas,
-                'Señales HOLD': holds,
+                'Señales COMPRA': int(señales_estrategia.str.contains('COMPRA', regex=False).sum()),
+                'Señales VENTA': int(señales_estrategia.str.contains('VENTA', regex=False).sum()),
+                'Señales HOLD': int(señales_estrategia.str.contains('HOLD', regex=False).sum()),
                 'RSI Actual': ultimo.get('RSI', 'N/A'),
                 'MACD Actual': ultimo.get('MACD', 'N/A'),
                 'Timestamp': ultimo.get('datetime', 'N/A')
@@ -178,26 +286,36 @@ def crear_resumen_ejecutivo(resultados_trading, verbose=False):
 
 def extraer_señales_trading(resultados_trading, verbose=False):
     """
-    Extrae todas las señales de trading para análisis.
+    Extrae todas las señales de trading para análisis: una fila por barra y estrategia con señal,
+    en el orden de las barras y, dentro de cada barra, en el de las columnas.
+    Las columnas de señal se aplanan como matriz (barras × estrategias) en lugar de recorrer filas.
     """
-    datos_señales = []
+    from helpers.estado_senales import es_columna_señal
+
+    tablas = []
     
     for symbol, df in resultados_trading.items():
         if len(df) > 0:
-            for idx, fila in df.iterrows():
-                for col in df.columns:
-                    if col.startswith('estrategia_') and not col.endswith(('_valor', '_descripcion')):
-                        if col in fila and pd.notna(fila[col]):
-                            datos_señales.append({
-                                'Símbolo': symbol,
-                                'Fecha_Hora': fila.get('datetime', 'N/A'),
-                                'Estrategia': col.replace('estrategia_', ''),
-                                'Señal': fila[col],
-                                'Precio': fila.get('Close', 'N/A')
-                                #'Fuerza': fila.get('fuerza_señal', 'N/A')  # COMENTADO: Fuerza de señal deshabilitada
-                            })
+            columnas = [col for col in df.columns if es_columna_señal(col)]
+            if not columnas:
+                continue
+            
+            señales = df[columnas].to_numpy(dtype=object)
+            # np.nonzero recorre la matriz por filas: mismo orden que barra a barra y columna a columna
+            filas, posiciones = np.nonzero(pd.notna(señales))
+            
+            tablas.append(pd.DataFrame({
+                'Símbolo': symbol,
+                'Fecha_Hora': df['datetime'].array[filas] if 'datetime' in df.columns else 'N/A',
+                'Estrategia': np.array([col.replace('estrategia_', '') for col in columnas], dtype=object)[posiciones],
+                'Señal': señales[filas, posiciones],
+                'Precio': df['Close'].to_numpy()[filas] if 'Close' in df.columns else 'N/A'
+                #'Fuerza': fila.get('fuerza_señal', 'N/A')  # COMENTADO: Fuerza de señal deshabilitada
+            }))
     
-    return pd.DataFrame(datos_señales)
+    if not tablas:
+        return pd.DataFrame()
+    return pd.concat(tablas, ignore_index=True)
 
 def generar_archivos_csv(resultados_trading, user_name, timestamp, estrategia, verbose=False):
     """
@@ -206,45 +324,86 @@ def generar_archivos_csv(resultados_trading, user_name, timestamp, estrategia, v
     """
     archivos_generados = []
     
-    try:
-        for symbol, df in resultados_trading.items():
-            if len(df) > 0:
-                # Crear copia para no modificar el original
-                df_csv = df.copy()
-                
-                # COMENTADO: Excluir columna fuerza_señal en CSV
-                if 'fuerza_señal' in df_csv.columns:
-                    df_csv = df_csv.drop(columns=['fuerza_señal'])
-                
-                # Ordenar por fecha más reciente primero
-                if 'datetime' in df_csv.columns:
-                    df_csv = df_csv.sort_values('datetime', ascending=False)
-                    
-                    # Manejar timezone - convertir a string con timezone
-                    if pd.api.types.is_datetime64_any_dtype(df_csv['datetime']):
-                        # Si tiene timezone, convertir a string con timezone
-                        if df_csv['datetime'].dt.tz is not None:
-                            df_csv['datetime'] = df_csv['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S%z')
-                        else:
-                            # Si no tiene timezone, asumir UTC y añadir timezone
-                            df_csv['datetime'] = df_csv['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S') + '+0000'
-                
-                #nombre_archivo = f"{user_name}_datos_{symbol}_{timestamp}.csv"
-                nombre_archivo = f"{user_name}_datos__{symbol}_{estrategia}.csv"
-                ruta_archivo = f"/app/tmp/{nombre_archivo}"
-                
-                df_csv.to_csv(ruta_archivo, index=False, encoding='utf-8')
+    for symbol, df in resultados_trading.items():
+        if len(df) > 0:
+            ruta_archivo = generar_csv_symbol(symbol, df, user_name, estrategia, verbose)
+            if ruta_archivo:
                 archivos_generados.append(ruta_archivo)
-                
-                if verbose:
-                    print(f"      ✅ CSV generado: {symbol}")
+    
+    return archivos_generados
+
+def generar_csv_symbol(symbol, df, user_name, estrategia, verbose=False):
+    """
+    Genera el CSV de un símbolo ordenado por fecha (más reciente primero).
+    NOTA: Se comenta la columna 'fuerza_señal' en los CSV exportados.
+    """
+    try:
+        # Crear copia para no modificar el original
+        df_csv = df.copy()
         
-        return archivos_generados
+        # COMENTADO: Excluir columna fuerza_señal en CSV
+        if 'fuerza_señal' in df_csv.columns:
+            df_csv = df_csv.drop(columns=['fuerza_señal'])
+        
+        # Ordenar por fecha más reciente primero
+        if 'datetime' in df_csv.columns:
+            df_csv = df_csv.sort_values('datetime', ascending=False)
+            
+            # Manejar timezone - convertir a string con timezone
+            if pd.api.types.is_datetime64_any_dtype(df_csv['datetime']):
+                # Si tiene timezone, convertir a string con timezone
+                if df_csv['datetime'].dt.tz is not None:
+                    df_csv['datetime'] = df_csv['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S%z')
+                else:
+                    # Si no tiene timezone, asumir UTC y añadir timezone
+                    df_csv['datetime'] = df_csv['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S') + '+0000'
+        
+        #nombre_archivo = f"{user_name}_datos_{symbol}_{timestamp}.csv"
+        nombre_archivo = f"{user_name}_datos__{symbol}_{estrategia}.csv"
+        ruta_archivo = os.path.join(DIRECTORIO_REPORTES, nombre_archivo)
+        
+        df_csv.to_csv(ruta_archivo, index=False, encoding='utf-8')
+        
+        if verbose:
+            print(f"      ✅ CSV generado: {symbol}")
+        
+        return ruta_archivo
         
     except Exception as e:
         if verbose:
-            print(f"      ❌ Error generando CSVs: {e}")
-        return []
+            print(f"      ❌ Error generando CSV {symbol}: {e}")
+        return None
+
+def generar_csv_cambios_señal(estrategia, user_name, verbose=False):
+    """
+    Genera un CSV con el último cambio de cada señal por símbolo (fecha, de/a, precio) y cuánto lleva vigente.
+    """
+    from helpers.eventos_senales import ultimos_cambios
+
+    cambios = ultimos_cambios(estrategia)
+    if cambios is None or len(cambios) == 0:
+        return None
+
+    try:
+        cambios = cambios.rename(columns={
+            'symbol': 'Símbolo', 'columna': 'Estrategia', 'fecha': 'Fecha_Cambio', 'anterior': 'Señal_Anterior',
+            'actual': 'Señal_Actual', 'precio': 'Precio_Cambio', 'ultima_barra': 'Última_Barra', 'vigencia': 'Vigencia'
+        })
+        cambios['Estrategia'] = cambios['Estrategia'].str.replace('estrategia_', '', n=1)
+        cambios['Vigencia_Horas'] = (cambios.pop('Vigencia').dt.total_seconds() / 3600).round(2)
+
+        nombre_archivo = f"{user_name}_cambios_senal_{estrategia}.csv"
+        ruta_archivo = os.path.join(DIRECTORIO_REPORTES, nombre_archivo)
+        cambios.to_csv(ruta_archivo, index=False, encoding='utf-8')
+
+        if verbose:
+            print(f"      ✅ CSV de cambios de señal generado: {len(cambios)} señales")
+        return ruta_archivo
+
+    except Exception as e:
+        if verbose:
+            print(f"      ❌ Error generando CSV de cambios de señal: {e}")
+        return None
 
 # =============================================================================
 # PRIMERA PARTE: CONFIGURACIÓN DE PANELES
@@ -363,10 +522,11 @@ def configurar_paneles_graficos(symbol, df, estrategia, verbose=False):
 # SEGUNDA PARTE: ARMADO DEL GRÁFICO CON DISTRIBUCIÓN DE PANELES
 # =============================================================================
 
-def armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, timestamp, verbose=False):
+def armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, timestamp, verbose=False, opciones_dashboard=None):
     """
     Segunda parte: Arma el gráfico completo con la configuración de paneles,
     distribuyendo el espacio y agregando filtros agrupados.
+    :param opciones_dashboard: {'modo', 'comprimir', 'puntos', 'ventana_completa'} (por defecto las constantes del módulo)
     """
     try:
         if not paneles_config:
@@ -439,6 +599,11 @@ def armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, tim
             #             row=fila, col=1
             #         )
         
+        # Nivel de detalle: reducir el histórico antiguo de cada serie al presupuesto de puntos de su panel
+        opciones_dashboard = opciones_dashboard or opciones_dashboard_por_defecto()
+        submuestrear_figura(fig, [panel['id'] for panel in paneles_config['paneles']],
+                            opciones_dashboard['puntos'], opciones_dashboard['ventana_completa'])
+        
         # AGREGAR PANEL DE FILTROS
         agregar_panel_filtros(fig, paneles_config['filtros_comunes'], num_paneles + 1)
         
@@ -500,8 +665,8 @@ def armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, tim
         
         #nombre_archivo = f"{user_name}_grafico_interactivo_{symbol}_{estrategia}_{timestamp}.html"
         nombre_archivo = f"{user_name}_grafico_interactivo_{symbol}_{estrategia}.html"
-        ruta_archivo = f"/app/tmp/{nombre_archivo}"
-        fig.write_html(ruta_archivo)
+        ruta_archivo = os.path.join(DIRECTORIO_REPORTES, nombre_archivo)
+        escribir_dashboard_html(fig, ruta_archivo, opciones_dashboard, verbose)
         
         if verbose:
             print(f"        ✅ Gráfico interactivo generado: {symbol}")
@@ -513,6 +678,126 @@ def armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, tim
             print(f"        ❌ Error armando gráfico {symbol}: {e}")
         return None
 
+# =============================================================================
+# SALIDA HTML DE LOS DASHBOARDS
+# =============================================================================
+
+def opciones_dashboard_por_defecto():
+    """Opciones de salida de los dashboards según las constantes del módulo (sin leer reportes.info)."""
+    return {'modo': MODO_DASHBOARD, 'comprimir': COMPRIMIR_DASHBOARD,
+            'puntos': dict(PUNTOS_PANELES), 'ventana_completa': VENTANA_COMPLETA}
+
+def submuestrear_figura(fig, ids_paneles, puntos_paneles, ventana_completa=VENTANA_COMPLETA):
+    """
+    Reduce las trazas con más puntos que el presupuesto de su panel, conservando completas las últimas
+    `ventana_completa` barras: las velas se agregan en OHLC y las líneas, marcadores y barras se reducen con LTTB.
+    Una traza con fill='tonexty' usa los mismos índices que la anterior para que la banda rellenada coincida.
+    :param ids_paneles: Id del panel de cada fila del gráfico (en orden)
+    :param puntos_paneles: Diccionario {id_panel: puntos por serie} (0 o ausente = sin reducir)
+    """
+    from helpers.submuestreo import reducir_serie, reducir_velas
+
+    indices_anteriores, longitud_anterior = None, 0
+    for traza in fig.data:
+        fila = int(traza.yaxis[1:] or 1) if traza.yaxis else 1
+        puntos = puntos_paneles.get(ids_paneles[fila - 1], 0) if fila <= len(ids_paneles) else 0
+        x = traza.x
+        if not puntos or not isinstance(x, np.ndarray) or len(x) <= puntos:
+            indices_anteriores, longitud_anterior = None, 0
+            continue
+
+        if traza.type == 'candlestick':
+            indices, apertura, maximo, minimo, cierre = reducir_velas(traza.open, traza.high, traza.low, traza.close,
+                                                                       puntos, ventana_completa)
+            traza.update(x=x[indices], open=apertura, high=maximo, low=minimo, close=cierre)
+        else:
+            if getattr(traza, 'fill', None) == 'tonexty' and indices_anteriores is not None and longitud_anterior == len(x):
+                indices = indices_anteriores
+            else:
+                indices = reducir_serie(traza.y, puntos, ventana_completa)
+            traza.update(x=x[indices], y=np.asarray(traza.y)[indices])
+            # Colores por barra (volumen, histograma MACD)
+            colores = getattr(getattr(traza, 'marker', None), 'color', None)
+            if isinstance(colores, (list, tuple, np.ndarray)) and len(colores) == len(x):
+                traza.marker.color = [colores[i] for i in indices]
+        indices_anteriores, longitud_anterior = indices, len(x)
+
+def preparar_plotlyjs_compartido(comprimir=COMPRIMIR_DASHBOARD, verbose=False):
+    """
+    Escribe plotly.js (una vez por versión) en DIRECTORIO_ASSETS para que los dashboards lo referencien
+    en lugar de incluirlo. El nombre lleva la versión, así el navegador lo cachea sin riesgo de mezclar versiones.
+    :return: Ruta relativa a DIRECTORIO_REPORTES usada en el <script src> de los HTML
+    """
+    import plotly
+    from plotly.offline import get_plotlyjs
+
+    ruta_relativa = f"{DIRECTORIO_ASSETS}/plotly-{plotly.__version__}.min.js"
+    ruta_archivo = os.path.join(DIRECTORIO_REPORTES, ruta_relativa)
+    if not os.path.exists(ruta_archivo):
+        os.makedirs(os.path.dirname(ruta_archivo), exist_ok=True)
+        # Escritura atómica: otro proceso nunca ve el archivo a medias
+        temporal = f"{ruta_archivo}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+        os.replace(temporal, ruta_archivo)
+        if verbose:
+            print(f"      📦 plotly.js compartido escrito: {ruta_relativa}")
+    if comprimir and not os.path.exists(ruta_archivo + ".gz"):
+        comprimir_archivo(ruta_archivo)
+    return ruta_relativa
+
+def compactar_datos_figura(fig):
+    """
+    Reduce los datos de las trazas antes de serializar: los float64 pasan a float32 (~7 cifras significativas,
+    sin diferencia visible en el gráfico) y las fechas a milisegundos desde epoch en float64. plotly los escribe
+    como arrays binarios en base64 en lugar de listas de números y textos ISO repetidos en cada traza.
+    """
+    hay_fechas = False
+    for traza in fig.data:
+        for atributo in ('x', 'y', 'open', 'high', 'low', 'close'):
+            valores = getattr(traza, atributo, None)
+            if not isinstance(valores, np.ndarray):
+                continue
+            if np.issubdtype(valores.dtype, np.datetime64):
+                fechas = pd.DatetimeIndex(valores)
+                if fechas.tz is not None:
+                    fechas = fechas.tz_localize(None)
+                # plotly.js muestra los milisegundos como hora de reloj (igual que los textos ISO sin zona)
+                traza[atributo] = ((fechas - pd.Timestamp(0)) / pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.float64)
+                hay_fechas = True
+            elif valores.dtype == np.float64:
+                traza[atributo] = valores.astype(np.float32)
+
+    # Con números en el eje X hay que indicar que son fechas (si no, plotly usaría un eje lineal)
+    if hay_fechas:
+        fig.update_xaxes(type='date')
+
+def escribir_dashboard_html(fig, ruta_archivo, opciones_dashboard=None, verbose=False):
+    """
+    Escribe el HTML de un dashboard según el modo de salida (ver MODO_DASHBOARD) y, si se pide, su .gz.
+    """
+    opciones_dashboard = opciones_dashboard or opciones_dashboard_por_defecto()
+
+    if opciones_dashboard['modo'] == 'compartido':
+        compactar_datos_figura(fig)
+        fig.write_html(ruta_archivo, include_plotlyjs=preparar_plotlyjs_compartido(opciones_dashboard['comprimir'], verbose))
+    else:
+        fig.write_html(ruta_archivo)
+
+    if opciones_dashboard['comprimir']:
+        comprimir_archivo(ruta_archivo)
+
+def comprimir_archivo(ruta_archivo):
+    """Escribe '<ruta>.gz' junto al archivo (sin fecha en la cabecera, así el .gz solo cambia si cambia el contenido)."""
+    import gzip
+    import shutil
+
+    temporal = f"{ruta_archivo}.gz.{os.getpid()}.tmp"
+    with open(ruta_archivo, "rb") as origen, open(temporal, "wb") as destino:
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=destino, mtime=0) as comprimido:
+            shutil.copyfileobj(origen, comprimido)
+    os.replace(temporal, ruta_archivo + ".gz")
+
 def agregar_panel_filtros(fig, filtros_comunes, fila_filtros):
     """
     Agrega un panel unificado de filtros para todos los gráficos.
@@ -993,7 +1278,7 @@ def agregar_indicadores_tendencia(fig, df, verbose=False):
 # FUNCIÓN PRINCIPAL MODIFICADA
 # =============================================================================
 
-def generar_grafico_interactivo_individual(symbol, df, estrategia, user_name, timestamp, verbose=False):
+def generar_grafico_interactivo_individual(symbol, df, estrategia, user_name, timestamp, verbose=False, opciones_dashboard=None):
     """
     Función principal modificada que utiliza las dos nuevas partes.
     """
@@ -1010,7 +1295,7 @@ def generar_grafico_interactivo_individual(symbol, df, estrategia, user_name, ti
             return None
         
         # SEGUNDA PARTE: Armar gráfico con paneles
-        archivo = armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, timestamp, verbose)
+        archivo = armar_grafico_con_paneles(paneles_config, symbol, user_name, estrategia, timestamp, verbose, opciones_dashboard)
         
         return archivo
         
@@ -0,0 +1,145 @@
+import os
+import time
+import heapq
+import signal
+import threading
+from datetime import datetime, timedelta
+
+from helpers.date_utils import convertir_a_segundos
+
+
+# Frecuencia mínima entre dos ejecuciones de una misma estrategia
+FRECUENCIA_MINIMA_SEGUNDOS = 60
+
+
+
+class DaemonMotorBolsaIA:
+    """
+    Proceso de larga duración que ejecuta cada estrategia con su propia frecuencia.
+    Mantiene entre ciclos los módulos importados, la configuración de APIs, la sesión HTTP,
+    las barras descargadas y los últimos resultados, de modo que cada ciclo solo paga
+    el coste de los datos nuevos. Se detiene de forma ordenada con SIGTERM o SIGINT.
+    """
+    def __init__(self, estrategias, ejecutar_ciclo, modo_debug=False):
+        """
+        :param estrategias: Lista de estrategias a planificar
+        :param ejecutar_ciclo: Función (estrategia, **contexto) que ejecuta un ciclo completo
+        :param modo_debug: Si es True, muestra detalles del proceso
+        """
+        self.estrategias = estrategias
+        self.ejecutar_ciclo = ejecutar_ciclo
+        self.modo_debug = modo_debug
+
+        # Estado compartido entre ciclos
+        self.config_apis = None
+        self.cache_barras = {}
+        self.cache_resultados = {}
+        self._configuraciones = {}  # estrategia -> (mtime del archivo de propiedades, config)
+
+        self.ciclos = 0
+        self.errores = 0
+        self._detener = threading.Event()
+
+    def _instalar_señales(self):
+        """Registra SIGTERM/SIGINT para terminar el ciclo en curso y salir ordenadamente."""
+        signal.signal(signal.SIGTERM, self._manejar_señal)
+        signal.signal(signal.SIGINT, self._manejar_señal)
+
+    def _manejar_señal(self, signum, frame):
+        """Marca el daemon para detenerse al finalizar el ciclo en curso."""
+        print(f"\n🛑 Señal {signal.Signals(signum).name} recibida: el daemon se detendrá al terminar el ciclo en curso")
+        self._detener.set()
+
+    def detener(self):
+        """Solicita la parada del daemon."""
+        self._detener.set()
+
+    def cargar_configuracion(self, estrategia):
+        """
+        Devuelve la configuración de la estrategia, releyendo el archivo de propiedades
+        solo cuando ha cambiado desde la última lectura.
+        """
+        from ObtenerIndicesDelMercado import cargar_configuracion, RUTA_PROPERTIES
+
+        try:
+            mtime = os.path.getmtime(RUTA_PROPERTIES)
+        except OSError:
+            mtime = None
+
+        guardada = self._configuraciones.get(estrategia)
+        if guardada and guardada[0] == mtime:
+            return guardada[1]
+
+        config = cargar_configuracion(estrategia)
+        if guardada:
+            print(f"🔄 Propiedades modificadas: configuración de {estrategia} recargada")
+            # Los resultados anteriores pueden no ser válidos con los nuevos parámetros
+            self.cache_resultados.pop(estrategia, None)
+        self._configuraciones[estrategia] = (mtime, config)
+        return config
+
+    def frecuencia_segundos(self, config):
+        """Frecuencia de ejecución de la estrategia en segundos."""
+        segundos = convertir_a_segundos(config['frecuencia_daemon']) or convertir_a_segundos(config['intervalo'])
+        return max(FRECUENCIA_MINIMA_SEGUNDOS, segundos or FRECUENCIA_MINIMA_SEGUNDOS)
+
+    def _ejecutar_estrategia(self, estrategia):
+        """Ejecuta un ciclo de la estrategia con las cachés del daemon. Devuelve la frecuencia a aplicar."""
+        config = self.cargar_configuracion(estrategia)
+        inicio = time.monotonic()
+
+        self.ejecutar_ciclo(
+            estrategia,
+            config=config,
+            config_apis=self.config_apis,
+            cache_barras=self.cache_barras,
+            cache_resultados=self.cache_resultados
+        )
+
+        self.ciclos += 1
+        duracion = time.monotonic() - inicio
+        frecuencia = self.frecuencia_segundos(config)
+        proxima = datetime.now() + timedelta(seconds=frecuencia)
+        print(f"⏱️  Ciclo {estrategia} completado en {duracion:.2f}s. Próxima ejecución: {proxima.strftime('%Y-%m-%d %H:%M:%S')}")
+        return frecuencia
+
+    def ejecutar(self):
+        """
+        Bucle principal: ejecuta cada estrategia cuando vence su próxima ejecución
+        y espera (interrumpible por señal) hasta la siguiente.
+        """
+        from helpers.config_loader import cargar_configuracion_apis
+
+        self._instalar_señales()
+
+        self.config_apis = cargar_configuracion_apis(verbose=self.modo_debug)
+        if not self.config_apis:
+            print("❌ No se pudo cargar la configuración de ninguna API. El daemon no se inicia.")
+            return
+
+        print(f"🤖 Daemon iniciado (PID {os.getpid()}) para estrategias: {', '.join(self.estrategias)}")
+
+        # Cola de prioridad (próxima ejecución, orden, estrategia): todas arrancan de inmediato
+        cola = [(time.monotonic(), orden, estrategia) for orden, estrategia in enumerate(self.estrategias)]
+        heapq.heapify(cola)
+
+        while cola and not self._detener.is_set():
+            vencimiento, orden, estrategia = heapq.heappop(cola)
+
+            espera = vencimiento - time.monotonic()
+            if espera > 0 and self._detener.wait(espera):
+                break
+
+            try:
+                frecuencia = self._ejecutar_estrategia(estrategia)
+            except Exception as e:
+                # Un fallo en una estrategia no detiene el daemon: se reintenta en el siguiente turno
+                self.errores += 1
+                print(f"❌ Error en el ciclo de {estrategia}: {e}")
+                frecuencia = FRECUENCIA_MINIMA_SEGUNDOS
+
+            # Si el ciclo se retrasó, no se acumulan ejecuciones pendientes
+            siguiente = max(vencimiento + frecuencia, time.monotonic())
+            heapq.heappush(cola, (siguiente, orden, estrategia))
+
+        print(f"👋 Daemon detenido: {self.ciclos} ciclos ejecutados, {self.errores} errores")
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from helpers.date_utils import convertir_a_segundos
+
+
+COLUMNAS_PRECIO = ['Open', 'High', 'Low', 'Close']
+
+# Z-score robusto (MAD) a partir del cual un retorno se considera pico
+UMBRAL_SPIKE = 10.0
+
+# Un hueco es una separación mayor que este múltiplo del intervalo esperado
+TOLERANCIA_HUECO = 1.5
+
+
+
+def validar_calidad_dataframe(df, segundos_intervalo=None, umbral_spike=UMBRAL_SPIKE, symbol="", verbose=False):
+    """
+    Valida y limpia la serie completa de un símbolo en una sola pasada vectorizada.
+    Detecta timestamps duplicados o futuros, huecos respecto a la rejilla del intervalo,
+    precios en cero o NaN, velas OHLC inconsistentes y picos aislados.
+    :param df: DataFrame con columnas datetime, Open, High, Low, Close, Volume ordenado por fecha
+    :param segundos_intervalo: Duración esperada de cada barra en segundos (None = sin chequeo de huecos)
+    :param umbral_spike: Z-score robusto a partir del cual un retorno que revierte se considera pico
+    :param symbol: Símbolo (solo para mensajes)
+    :param verbose: Si es True, muestra detalles del proceso
+    :return: Tupla (DataFrame limpio, reporte de calidad); el reporte es None si el DataFrame es None o vacío
+    """
+    if df is None or df.empty:
+        return df, None
+
+    reporte = {
+        'registros_entrada': len(df),
+        'duplicados': 0,
+        'fechas_futuras': 0,
+        'precios_invalidos': 0,
+        'ohlc_inconsistentes': 0,
+        'spikes': 0,
+        'huecos': 0,
+        'mayor_hueco_barras': 0,
+        'filas_descartadas': 0,
+        'registros_salida': len(df)
+    }
+
+    if not df['datetime'].is_monotonic_increasing:
+        df = df.sort_values(by='datetime', kind='stable')
+
+    # 1. Timestamps duplicados: prevalece el último recibido
+    duplicados = df['datetime'].duplicated(keep='last').to_numpy()
+
+    # 2. Timestamps en el futuro (más de un día por delante), en la zona horaria de la columna si la tiene
+    limite_futuro = pd.Timestamp.now(tz=df['datetime'].dt.tz) + pd.Timedelta(days=1)
+    futuros = (df['datetime'] > limite_futuro).to_numpy()
+
+    # 3. Precios en cero, negativos o NaN (los parsers convierten None en 0)
+    precios = df[COLUMNAS_PRECIO].to_numpy(dtype=float)
+    invalidos = ~(precios > 0)
+    filas_precio_invalido = invalidos.any(axis=1)
+    close_invalido = invalidos[:, 3]
+
+    descartar = duplicados | futuros | close_invalido
+    reporte['duplicados'] = int(duplicados.sum())
+    reporte['fechas_futuras'] = int(futuros.sum())
+    reporte['precios_invalidos'] = int(filas_precio_invalido.sum())
+
+    if descartar.any():
+        df = df.loc[~descartar].copy()
+        precios = precios[~descartar]
+        invalidos = invalidos[~descartar]
+
+    # Reparar Open/High/Low inválidos a partir del Close (el Close ya es válido)
+    if invalidos.any():
+        precios = np.where(invalidos, np.nan, precios)
+        close = precios[:, 3]
+        close_anterior = np.concatenate(([close[0]], close[:-1])) if len(close) else close
+        precios[:, 0] = np.where(np.isnan(precios[:, 0]), close_anterior, precios[:, 0])
+        cuerpo_max = np.fmax(precios[:, 0], close)
+        cuerpo_min = np.fmin(precios[:, 0], close)
+        precios[:, 1] = np.where(np.isnan(precios[:, 1]), cuerpo_max, precios[:, 1])
+        precios[:, 2] = np.where(np.isnan(precios[:, 2]), cuerpo_min, precios[:, 2])
+
+    # 4. Velas inconsistentes: High debe ser el máximo y Low el mínimo de la vela
+    maximo = precios.max(axis=1)
+    minimo = precios.min(axis=1)
+    inconsistentes = (precios[:, 1] < maximo) | (precios[:, 2] > minimo)
+    reporte['ohlc_inconsistentes'] = int(inconsistentes.sum())
+    if inconsistentes.any():
+        precios[:, 1] = maximo
+        precios[:, 2] = minimo
+
+    if invalidos.any() or inconsistentes.any():
+        if not descartar.any():
+            df = df.copy()
+        df[COLUMNAS_PRECIO] = precios
+
+    # 5. Picos aislados: retorno extremo seguido de un retorno extremo de signo contrario
+    if len(df) > 3:
+        retornos = np.diff(np.log(precios[:, 3]))
+        mediana = np.median(retornos)
+        mad = np.median(np.abs(retornos - mediana))
+        if mad > 0:
+            z = 0.6745 * (retornos - mediana) / mad
+            extremo = np.abs(z) > umbral_spike
+            revierte = extremo[:-1] & extremo[1:] & (np.sign(z[:-1]) != np.sign(z[1:]))
+            # revierte[i] marca la barra i+1 como pico
+            spikes = np.concatenate(([False], revierte, [False]))
+            reporte['spikes'] = int(spikes.sum())
+            if spikes.any():
+                df = df.loc[~spikes]
+
+    # 6. Huecos respecto a la rejilla esperada (solo se reportan, no se rellenan)
+    if segundos_intervalo and len(df) > 1:
+        barras_por_salto = _barras_por_salto(df['datetime'], segundos_intervalo)
+        huecos = barras_por_salto > TOLERANCIA_HUECO
+        reporte['huecos'] = int(huecos.sum())
+        if huecos.any():
+            reporte['mayor_hueco_barras'] = int(barras_por_salto[huecos].max()) - 1
+
+    reporte['registros_salida'] = len(df)
+    reporte['filas_descartadas'] = reporte['registros_entrada'] - reporte['registros_salida']
+
+    if verbose:
+        print(f"  🧪 Calidad {symbol}: {reporte['registros_entrada']} -> {reporte['registros_salida']} registros "
+              f"(duplicados={reporte['duplicados']}, futuros={reporte['fechas_futuras']}, "
+              f"precios_invalidos={reporte['precios_invalidos']}, ohlc={reporte['ohlc_inconsistentes']}, "
+              f"spikes={reporte['spikes']}, huecos={reporte['huecos']})")
+
+    return df, reporte
+
+
+
+def _barras_por_salto(fechas, segundos_intervalo):
+    """
+    Barras de intervalo que separan cada par de fechas consecutivas, sin contar el mercado cerrado.
+    Si la serie tiene barras en fin de semana (cripto) el mercado se considera continuo y se usa la rejilla completa.
+    Si no, en datos intradía solo cuentan los saltos dentro de un mismo día (la noche y el fin de semana
+    no son huecos) y en datos diarios solo los días hábiles que faltan (los festivos sí se cuentan).
+    :return: Array con un valor por salto (1 = barras consecutivas)
+    """
+    fechas = pd.DatetimeIndex(fechas)
+    if fechas.tz is not None:
+        fechas = fechas.tz_convert('UTC').tz_localize(None)
+    valores = fechas.to_numpy()
+    saltos = np.diff(valores).astype('timedelta64[s]').astype(np.int64)
+    barras_por_salto = saltos / segundos_intervalo
+
+    if (fechas.dayofweek >= 5).any():
+        return barras_por_salto
+
+    dias = valores.astype('datetime64[D]')
+    if segundos_intervalo < 24 * 60 * 60:
+        # Cierre de sesión entre días: se trata como barras consecutivas
+        return np.where(dias[1:] == dias[:-1], barras_por_salto, 1.0)
+    if segundos_intervalo == 24 * 60 * 60:
+        # Días hábiles estrictamente entre las dos barras
+        return np.busday_count(dias[:-1] + 1, dias[1:]) + 1.0
+    return barras_por_salto
+
+
+
+def validar_calidad_dataframes(dataframes, intervalo=None, umbral_spike=UMBRAL_SPIKE, verbose=False):
+    """
+    Aplica la validación de calidad a todos los símbolos antes de calcular indicadores.
+    :param dataframes: Diccionario {symbol: DataFrame} generado por convertir_a_dataframe
+    :param intervalo: Intervalo de las barras (ej: 1h) para detectar huecos
+    :param umbral_spike: Z-score robusto para detectar picos
+    :param verbose: Si es True, muestra detalles del proceso
+    :return: Tupla (diccionario de DataFrames limpios, diccionario de reportes por símbolo)
+    """
+    segundos_intervalo = convertir_a_segundos(intervalo) if intervalo else None
+
+    dataframes_limpios = {}
+    reportes = {}
+
+    for symbol, df in dataframes.items():
+        try:
+            df_limpio, reporte = validar_calidad_dataframe(df, segundos_intervalo, umbral_spike, symbol, verbose)
+        except Exception as e:
+            # Si la validación falla, se conserva el DataFrame original
+            print(f"⚠️  Error validando calidad de {symbol}: {e}")
+            dataframes_limpios[symbol] = df
+            continue
+
+        if reporte is not None:
+            reportes[symbol] = reporte
+        if df_limpio is None or df_limpio.empty:
+            print(f"❌ {symbol} descartado: no quedan registros válidos tras la validación")
+            continue
+        dataframes_limpios[symbol] = df_limpio
+
+    return dataframes_limpios, reportes
+
+
+
+def mostrar_reporte_calidad(reportes):
+    """
+    Muestra un resumen compacto de calidad por símbolo (una línea por símbolo con incidencias).
+    """
+    con_incidencias = {
+        symbol: reporte for symbol, reporte in reportes.items()
+        if reporte['filas_descartadas'] or reporte['ohlc_inconsistentes'] or reporte['precios_invalidos'] or reporte['huecos']
+    }
+
+    if not con_incidencias:
+        print(f"✅ Calidad de datos OK para {len(reportes)} símbolos")
+        return
+
+    print(f"🧪 Calidad de datos: {len(con_incidencias)} de {len(reportes)} símbolos con incidencias")
+    for symbol, reporte in con_incidencias.items():
+        print(f"   • {symbol}: descartadas={reporte['filas_descartadas']}, duplicados={reporte['duplicados']}, "
+              f"precios_invalidos={reporte['precios_invalidos']}, ohlc={reporte['ohlc_inconsistentes']}, "
+              f"spikes={reporte['spikes']}, huecos={reporte['huecos']} (mayor: {reporte['mayor_hueco_barras']} barras)")
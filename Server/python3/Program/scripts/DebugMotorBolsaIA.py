@@ -2,11 +2,25 @@ import os
 import logging  # Agregar esta importación
 from datetime import datetime
 
+# Directorio de los resúmenes JSON de cada ejecución (uno por ejecución o ciclo del daemon)
+DIRECTORIO_RESUMENES = "/app/logs/resumenes"
+
 class DebugMotorBolsaIA:
-    def __init__(self, modo_debug=False, log_file=None):
+    def __init__(self, modo_debug=False, log_file=None, medir_memoria=None):
+        """
+        :param modo_debug: Si es True, muestra los pasos por consola
+        :param log_file: Archivo de log (por defecto /app/logs/00_MotorBolsaIA.log)
+        :param medir_memoria: Activa tracemalloc en los spans (por defecto solo en modo debug)
+        """
         self.modo_debug = modo_debug
         # Asegurar que log_file tenga un valor por defecto si es None
         self.log_file = log_file or "/app/logs/00_MotorBolsaIA.log"
+
+        # Instrumentación de etapas: los módulos del proceso la usan a través de helpers.instrumentacion
+        from helpers.instrumentacion import Instrumentacion, activar_instrumentacion
+        self.instrumentacion = Instrumentacion(medir_memoria=modo_debug if medir_memoria is None else medir_memoria)
+        activar_instrumentacion(self.instrumentacion)
+        self.perfilador = None
         
         # Configurar logging si se proporciona archivo de log
         if self.log_file:
@@ -15,12 +29,17 @@ class DebugMotorBolsaIA:
             if log_dir and not os.path.exists(log_dir):
                 os.makedirs(log_dir)
                 
-            logging.basicConfig(
-                filename=self.log_file,
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
+            # Mismo formato que logging.basicConfig, pero el archivo lo escribe un hilo en segundo plano
+            from helpers.log_asincrono import configurar_logging_asincrono
+            configurar_logging_asincrono(self.log_file, level=logging.INFO)
+
+        # Modo debug: salida por consola y log de pasos asíncronos, con niveles por módulo y muestreo de símbolos
+        if self.modo_debug:
+            from helpers.log_asincrono import configurar_trazas, activar_salida_asincrona
+            from helpers.debug_file import activar_escritura_asincrona
+            configurar_trazas()
+            activar_salida_asincrona()
+            activar_escritura_asincrona()
     
     def escribir_paso(self, numero_paso, nombre_paso, detalles=None):
         """Escribe información de un paso del proceso"""
@@ -34,6 +53,55 @@ class DebugMotorBolsaIA:
         # Escribir en archivo de log usando la función helper
         from helpers.debug_file import escribir_log, formato_paso
         escribir_log(self.log_file, formato_paso(numero_paso, nombre_paso, detalles))
+
+    def span(self, nombre, **atributos):
+        """
+        Context manager que mide una etapa: tiempo real y de CPU, pico de RSS y memoria (tracemalloc).
+        Uso: with debug.span('indicadores', symbol='AAPL') as registro: registro['filas'] = len(df)
+        """
+        return self.instrumentacion.span(nombre, **atributos)
+
+    def activar_perfilado(self, modo, etapas=None):
+        """
+        Perfila las etapas seleccionadas (cprofile, sample o tracemalloc) enganchándose a sus spans.
+        :return: True si el perfilador quedó activo
+        """
+        from helpers.perfilado import Perfilador
+        try:
+            self.perfilador = Perfilador(modo, etapas, verbose=self.modo_debug)
+        except ValueError as e:
+            self.escribir_error("activar_perfilado", str(e))
+            return False
+        self.instrumentacion.observadores.append(self.perfilador)
+        self.escribir_info(f"Perfilado {modo} activo para: {', '.join(sorted(self.perfilador.spans))}")
+        return True
+
+    def escribir_perfiles(self, etiqueta="ejecucion"):
+        """Guarda los perfiles acumulados (si el perfilado está activo). Devuelve la lista de rutas."""
+        if self.perfilador is None:
+            return []
+        return self.perfilador.escribir(etiqueta)
+
+    def registrar_metrica(self, nombre, valor):
+        """Añade un valor al resumen de la ejecución."""
+        self.instrumentacion.registrar_metrica(nombre, valor)
+
+    def escribir_resumen(self, etiqueta="ejecucion"):
+        """
+        Escribe el resumen JSON de la ejecución (etapas, latencias de proveedores y spans)
+        y vacía los registros para la siguiente ejecución.
+        :param etiqueta: Texto incluido en el nombre del archivo (p.ej. la estrategia)
+        :return: Ruta del resumen o None si hubo error
+        """
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ruta = os.path.join(DIRECTORIO_RESUMENES, f"resumen_{etiqueta}_{marca}.json")
+        resumen = self.instrumentacion.resumen()
+        ruta = self.instrumentacion.escribir_resumen(ruta, resumen=resumen)
+
+        if ruta:
+            etapas = ", ".join(f"{nombre}={datos['duracion_ms']:.0f}ms" for nombre, datos in resumen['etapas'].items() if datos['llamadas'])
+            self.escribir_info(f"Resumen de ejecución: {ruta} ({resumen['duracion_ms']:.0f} ms; {etapas})")
+        return ruta
     
     def escribir_info(self, mensaje):
         """Escribe mensaje informativo"""
@@ -1,6 +1,36 @@
+import time
 import pandas as pd
+from helpers.log_asincrono import traza_activa, registrar
 from ProcesingDataPandas import calcular_rsi, calcular_macd, calcular_media_movil, calcular_bandas_bollinger, calcular_ichimoku, calcular_williams_r, calcular_estocastico, calcular_adx, calcular_parabolic_sar
 
+def resolver_parametros_indicadores(**kwargs):
+    """
+    Resuelve los parámetros efectivos de los indicadores a partir de los kwargs de la estrategia.
+    Compartido por procesar_dataframes y el modo panel para que ambos calculen exactamente lo mismo.
+    :return: Diccionario con los parámetros de cada indicador.
+    """
+    return {
+        'rsi_periodo': kwargs.get('rsi_periodo', 14),
+        'macd_periodo_corto': kwargs.get('macd_periodo_corto', 12),
+        'macd_periodo_largo': kwargs.get('macd_periodo_largo', 26),
+        'macd_periodo_senal': kwargs.get('macd_periodo_senal', 9),
+        'media_movil_periodo': kwargs.get('media_movil_periodo', 20),
+        'bollinger_periodo': kwargs.get('bollinger_periodo', 20),
+        'bollinger_desviacion': kwargs.get('bollinger_desviacion', 2.0),
+        'estocastico_periodo': kwargs.get('estocastico_periodo', 14),
+        # Nuevos parámetros para indicadores avanzados
+        'ichimoku_conversion': kwargs.get('macd_periodo_corto', 9),
+        'ichimoku_base': kwargs.get('macd_periodo_corto', 26),
+        'ichimoku_span_b': kwargs.get('macd_periodo_corto', 52),
+        'ichimoku_displacement': kwargs.get('macd_periodo_corto', 26),
+        'williams_periodo': kwargs.get('macd_periodo_corto', 14),
+        'adx_periodo': kwargs.get('macd_periodo_corto', 14),
+        'parabolic_acceleration': kwargs.get('macd_periodo_corto', 0.02),
+        'parabolic_maximum': kwargs.get('macd_periodo_corto', 0.2)
+    }
+
+
+
 def procesar_dataframes(dataframes, verbose=False, **kwargs):
     """
     Procesa los DataFrames y calcula las métricas técnicas para cada símbolo.
@@ -11,29 +41,36 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
     """
 
     # Extraer parámetros con valores por defecto
-    rsi_periodo = kwargs.get('rsi_periodo', 14)
-    macd_periodo_corto = kwargs.get('macd_periodo_corto', 12)
-    macd_periodo_largo = kwargs.get('macd_periodo_largo', 26)
-    macd_periodo_senal = kwargs.get('macd_periodo_senal', 9)
-    media_movil_periodo = kwargs.get('media_movil_periodo', 20)
-    bollinger_periodo = kwargs.get('bollinger_periodo', 20)
-    bollinger_desviacion = kwargs.get('bollinger_desviacion', 2.0)
-    estocastico_periodo = kwargs.get('estocastico_periodo', 14)
+    parametros = resolver_parametros_indicadores(**kwargs)
+    rsi_periodo = parametros['rsi_periodo']
+    macd_periodo_corto = parametros['macd_periodo_corto']
+    macd_periodo_largo = parametros['macd_periodo_largo']
+    macd_periodo_senal = parametros['macd_periodo_senal']
+    media_movil_periodo = parametros['media_movil_periodo']
+    bollinger_periodo = parametros['bollinger_periodo']
+    bollinger_desviacion = parametros['bollinger_desviacion']
+    estocastico_periodo = parametros['estocastico_periodo']
     # Nuevos parámetros para indicadores avanzados
-    ichimoku_conversion = kwargs.get('macd_periodo_corto', 9)
-    ichimoku_base = kwargs.get('macd_periodo_corto', 26)
-    ichimoku_span_b = kwargs.get('macd_periodo_corto', 52)
-    ichimoku_displacement = kwargs.get('macd_periodo_corto', 26)
-    williams_periodo = kwargs.get('macd_periodo_corto', 14)
-    adx_periodo = kwargs.get('macd_periodo_corto', 14)
-    parabolic_acceleration = kwargs.get('macd_periodo_corto', 0.02)
-    parabolic_maximum = kwargs.get('macd_periodo_corto', 0.2)
+    ichimoku_conversion = parametros['ichimoku_conversion']
+    ichimoku_base = parametros['ichimoku_base']
+    ichimoku_span_b = parametros['ichimoku_span_b']
+    ichimoku_displacement = parametros['ichimoku_displacement']
+    williams_periodo = parametros['williams_periodo']
+    adx_periodo = parametros['adx_periodo']
+    parabolic_acceleration = parametros['parabolic_acceleration']
+    parabolic_maximum = parametros['parabolic_maximum']
     
     dataframes_procesados = {}
 
+    from helpers.metricas import DURACION_INDICADORES, FILAS_INDICADORES
+
     for symbol, df in dataframes.items():
+        inicio = time.perf_counter()
+        # Trazas detalladas solo para los símbolos muestreados y según el nivel de cada módulo
+        detalle = traza_activa('GetDataPandas', symbol, verbose)
+        detalle_calculo = traza_activa('ProcesingDataPandas', symbol, verbose)
         # Calcular RSI
-        if verbose:
+        if detalle:
             print(f"\n{'='*60}")
             print(f"📊 PROCESANDO INDICADORES TÉCNICOS PARA: {symbol}")
             print(f"{'='*60}")
@@ -47,7 +84,7 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
                 print(f"  Volume: {df['Volume'].iloc[-1]}")
                 print(f"  Fecha: {df['datetime'].iloc[-1] if 'datetime' in df.columns else df.index[-1]}")
         
-        if verbose:
+        if detalle:
             print(f"\n{'='*60}")
             print(f"📊 PROCESANDO INDICADORES TÉCNICOS PARA: {symbol}")
             print(f"{'='*60}")
@@ -63,7 +100,7 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
         # Calcular RSI con parámetros específicos
         df = calcular_rsi(df,
                           periodo=rsi_periodo,
-                          verbose=verbose,
+                          verbose=detalle_calculo,
                           symbol=symbol)
 
         # Calcular MACD con parámetros específicos
@@ -71,25 +108,25 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
                           periodo_corto=macd_periodo_corto, 
                           periodo_largo=macd_periodo_largo, 
                           periodo_senal=macd_periodo_senal, 
-                          verbose=verbose, 
+                          verbose=detalle_calculo, 
                           symbol=symbol)
 
         # Calcular Media Móvil con parámetros específicos
         df = calcular_media_movil(df, periodo=media_movil_periodo,
-                                  verbose=verbose,
+                                  verbose=detalle_calculo,
                                   symbol=symbol)
 
         # Calcular Bandas de Bollinger con parámetros específicos
         df = calcular_bandas_bollinger(df, 
                                      periodo=bollinger_periodo, 
                                      desviacion=bollinger_desviacion, 
-                                     verbose=verbose, 
+                                     verbose=detalle_calculo, 
                                      symbol=symbol)
 
         # Calcular Estocástico con parámetros específicos
         df = calcular_estocastico(df,
                                   periodo=estocastico_periodo,
-                                  verbose=verbose,
+                                  verbose=detalle_calculo,
                                   symbol=symbol)
         
         # Calcular ichimoku con parámetros específicos
@@ -98,29 +135,29 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
                                        base_period=ichimoku_base,
                                        leading_span_b_period=ichimoku_span_b,
                                        displacement=ichimoku_displacement,
-                                       verbose=verbose, symbol=symbol)
+                                       verbose=detalle_calculo, symbol=symbol)
         
         # Calcular williams_r con parámetros específicos
         df_procesado = calcular_williams_r(df,
                                            periodo=williams_periodo,
-                                           verbose=verbose,
+                                           verbose=detalle_calculo,
                                            symbol=symbol)
         
         # Calcular adx con parámetros específicos
         df_procesado = calcular_adx(df,
                                     periodo=adx_periodo,
-                                    verbose=verbose,
+                                    verbose=detalle_calculo,
                                     symbol=symbol)
         
         # Calcular parabolic_sar con parámetros específicos
         df_procesado = calcular_parabolic_sar(df,
                                             acceleration=parabolic_acceleration,
                                             maximum=parabolic_maximum,
-                                            verbose=verbose, symbol=symbol)
+                                            verbose=detalle_calculo, symbol=symbol)
 
 
 
-        if verbose:
+        if detalle:
             print(f"\n{'─'*50}")
             print(f"📋 RESUMEN FINAL - {symbol}")
             print(f"{'─'*50}")
@@ -134,8 +171,13 @@ def procesar_dataframes(dataframes, verbose=False, **kwargs):
             print(f"DataFrame final - Shape: {df.shape}")
             print(f"Columnas totales: {list(df.columns)}")
 
+        # Símbolos sin trazas detalladas: una sola línea de resumen (formateada solo si se muestra)
+        registrar('GetDataPandas', lambda: f"   📊 {symbol}: indicadores calculados ({len(df)} filas)", verbose=verbose and not detalle)
+
         # Guardar el DataFrame procesado
         dataframes_procesados[symbol] = df
+        DURACION_INDICADORES.observar(time.perf_counter() - inicio)
+        FILAS_INDICADORES.incrementar(len(df))
 
     # Resumen general de todos los símbolos
     if verbose:
@@ -1,13 +1,22 @@
 import sys
+import queue
+import threading
 from helpers.config_loader import cargar_configuracion_apis
 from helpers.date_utils import calcular_fechas, validar_intervalo_date
-from helpers.api_utils import obtener_mejores_datos, obtener_historico_mercados_hasta_hoy
+from helpers.api_utils import obtener_mejores_datos, obtener_datos_incrementales, obtener_historico_mercados_hasta_hoy
+from helpers.instrumentacion import span
+from helpers.metricas import DESCARGAS_SIMBOLO, FILAS_INGERIDAS
 
 
 
-def obtener_datos_historicos(intervalo, tiempo_atras, verbose=False, symbols=None):
+def _preparar_descarga(intervalo, tiempo_atras, verbose=False, symbols=None, config_apis=None):
+    """
+    Valida los parámetros de la descarga y carga la configuración de APIs si no se recibió.
+    :return: Configuración de APIs o None si algún parámetro no es válido
+    """
     # Cargar configuración de todas las APIs
-    config_apis = cargar_configuracion_apis(verbose=verbose)
+    if config_apis is None:
+        config_apis = cargar_configuracion_apis(verbose=verbose)
     
     # Verificar que la configuración se cargó correctamente
     if not config_apis:
@@ -59,6 +68,66 @@ def obtener_datos_historicos(intervalo, tiempo_atras, verbose=False, symbols=Non
         print(f"    🌍 Timezone: UTC")
         print(f"    🌍 APIs disponibles: {list(config_apis.keys())}")
 
+    return config_apis
+
+
+
+def _obtener_datos_symbol(symbol, intervalo, tiempo_atras, config_apis, cache_barras=None, verbose=False):
+    """
+    Descarga los datos de un símbolo (incremental si está en la caché del daemon).
+    :return: Datos en formato estándar o None si no hay datos válidos
+    """
+    with span('descarga', symbol=symbol, intervalo=intervalo) as registro:
+        # Con caché (modo daemon) solo se piden las barras posteriores a la última conocida
+        datos_symbol = None
+        clave_cache = (symbol, intervalo, tiempo_atras)
+        if cache_barras is not None and clave_cache in cache_barras:
+            datos_symbol = obtener_datos_incrementales(
+                symbol,
+                intervalo,
+                tiempo_atras,
+                config_apis,
+                cache_barras[clave_cache]['values'],
+                timezone="UTC",
+                verbose=verbose,
+                proveedor=cache_barras[clave_cache]['proveedor']
+            )
+
+        # Usar la función que prueba múltiples APIs
+        if datos_symbol is None:
+            datos_symbol = obtener_mejores_datos(
+                symbol=symbol,
+                intervalo=intervalo,
+                tiempo_atras=tiempo_atras,
+                config_apis=config_apis,
+                timezone="UTC",
+                verbose=verbose
+            )
+
+        if datos_symbol is None or 'values' not in datos_symbol or not datos_symbol['values']:
+            DESCARGAS_SIMBOLO.incrementar(intervalo=intervalo, resultado="fallo")
+            return None
+        registro['filas'] = len(datos_symbol['values'])
+        DESCARGAS_SIMBOLO.incrementar(intervalo=intervalo, resultado="ok")
+        FILAS_INGERIDAS.incrementar(len(datos_symbol['values']), intervalo=intervalo)
+
+    if cache_barras is not None:
+        cache_barras[clave_cache] = {'values': datos_symbol['values'], 'proveedor': datos_symbol.get('proveedor')}
+    return datos_symbol
+
+
+
+def obtener_datos_historicos(intervalo, tiempo_atras, verbose=False, symbols=None, config_apis=None, cache_barras=None):
+    """
+    Obtiene los datos históricos de todos los símbolos.
+    :param config_apis: Configuración de APIs ya cargada (si es None se lee de los archivos conf)
+    :param cache_barras: Diccionario {(symbol, intervalo, tiempo_atras): {'values', 'proveedor'}} del modo daemon.
+                         Si contiene el símbolo, solo se descargan las barras nuevas.
+    """
+    config_apis = _preparar_descarga(intervalo, tiempo_atras, verbose, symbols, config_apis)
+    if not config_apis:
+        return None
+
     # Obtener datos históricos
     historico_mercados_hasta_hoy = {}
     simbolos_fallidos = []
@@ -67,19 +136,10 @@ def obtener_datos_historicos(intervalo, tiempo_atras, verbose=False, symbols=Non
         if verbose:
             print(f"      🔄 Obteniendo datos para {symbol}...")
 
-        # Usar la función que prueba múltiples APIs
-        # Usar la función que prueba múltiples APIs
-        datos_symbol = obtener_mejores_datos(
-            symbol=symbol,
-            intervalo=intervalo,
-            tiempo_atras=tiempo_atras,
-            config_apis=config_apis,
-            timezone="UTC",
-            verbose=verbose
-        )
+        datos_symbol = _obtener_datos_symbol(symbol, intervalo, tiempo_atras, config_apis, cache_barras, verbose)
         
         # SOLO agregar símbolos que tengan datos válidos
-        if datos_symbol is not None and 'values' in datos_symbol and datos_symbol['values']:
+        if datos_symbol is not None:
             historico_mercados_hasta_hoy[symbol] = datos_symbol
             if verbose:
                 print(f"      ✅ Datos obtenidos para {symbol}: {len(datos_symbol['values'])} registros")
@@ -110,6 +170,53 @@ def obtener_datos_historicos(intervalo, tiempo_atras, verbose=False, symbols=Non
     return historico_mercados_hasta_hoy
 
 
+
+def obtener_datos_historicos_en_flujo(intervalo, tiempo_atras, verbose=False, symbols=None, config_apis=None, cache_barras=None):
+    """
+    Versión en flujo de obtener_datos_historicos: las descargas se hacen en un hilo en
+    segundo plano (en el mismo orden y ritmo que la versión secuencial) y cada símbolo
+    se entrega en cuanto llegan sus datos, para que el llamador procese un símbolo
+    mientras se descarga el siguiente.
+    :return: Generador de tuplas (symbol, datos) donde datos es None si el símbolo falló
+    """
+    config_apis = _preparar_descarga(intervalo, tiempo_atras, verbose, symbols, config_apis)
+    if not config_apis:
+        return
+
+    cola = queue.Queue()
+    detener = threading.Event()
+    fin = object()
+
+    def descargar():
+        try:
+            for symbol in symbols:
+                if detener.is_set():
+                    break
+                if verbose:
+                    print(f"      🔄 Obteniendo datos para {symbol}...")
+                try:
+                    datos_symbol = _obtener_datos_symbol(symbol, intervalo, tiempo_atras, config_apis, cache_barras, verbose)
+                except Exception as e:
+                    print(f"❌ Error obteniendo datos de {symbol}: {e}")
+                    datos_symbol = None
+                cola.put((symbol, datos_symbol))
+        finally:
+            cola.put(fin)
+
+    hilo = threading.Thread(target=descargar, name="descarga-mercados", daemon=True)
+    hilo.start()
+
+    try:
+        while True:
+            elemento = cola.get()
+            if elemento is fin:
+                break
+            yield elemento
+    finally:
+        # Si el consumidor abandona el flujo, no se lanzan más descargas
+        detener.set()
+
+
 '''
 # Ejecución independiente (para pruebas)
 if __name__ == "__main__":
@@ -1,8 +1,7 @@
 # NotificationLogicSender.py
 from typing import Union, Tuple, List, Dict, Any
-import json
-from pathlib import Path
 from datetime import datetime
+import time
 import pytz
 
 
@@ -12,11 +11,17 @@ def comparar_y_notificar(
     estrategia: str,
     mobile_list_notification: str,
     log_whatsapp_message: str,
-    verbose: bool = False
+    verbose: bool = False,
+    eventos=None
 ) -> Union[str, Tuple[List[str], str]]:
     """
     Compara los resultados anteriores con los actuales y prepara notificaciones si hay cambios.
+    :param eventos: DataFrame de helpers.eventos_senales.ultimos_cambios (opcional) para indicar
+                    desde cuándo se mantiene la señal de cada símbolo en el resumen
     """
+    from helpers.metricas import NOTIFICACIONES, CAMBIOS_SEÑAL
+    from helpers.estado_senales import matriz_estado, comparar_matrices, COLUMNA_DECISION
+
     if verbose:
         print(f"\n🔍 COMPARANDO RESULTADOS - Estrategia: {estrategia}")
         print(f"   📊 PASO 1 - Verificar datos anteriores:")
@@ -25,39 +30,30 @@ def comparar_y_notificar(
         mensaje = "Primera ejecución - No hay resultados anteriores para comparar"
         if verbose:
             print(f"      ❌ {mensaje}")
+        NOTIFICACIONES.incrementar(estrategia=estrategia, resultado="primera_ejecucion")
         return mensaje
 
     if verbose:
         print(f"      ✅ Resultados anteriores cargados ({len(resultados_anteriores)} símbolos)")
-        print(f"\n   📈 PASO 2 - Generar comparación completa:")
+        print(f"\n   📈 PASO 2 - Comparar señales:")
 
-    cambios = []
-    comparacion_completa = generar_comparacion_completa(resultados_anteriores, resultados_actuales, verbose)
+    # Diferencia vectorizada (símbolos × estrategias): solo las celdas que cambiaron
+    anterior = matriz_estado(resultados_anteriores)
+    actual = matriz_estado(resultados_actuales)
+    transiciones = comparar_matrices(anterior, actual)
     
     if verbose:
-        print(f"      ✅ Comparación generada para {len(comparacion_completa)} símbolos")
+        print(f"      ✅ Comparación generada para {len(actual)} símbolos × {len(actual.columnas)} estrategias")
         print(f"\n   🔄 PASO 3 - Detectar cambios significativos:")
 
-    # Verificar si hay cambios
-    hay_cambios = False
-    for mercado, datos in comparacion_completa.items():
+    # Cambios de señal y de fuerza de la señal
+    cambios = []
+    for transicion in transiciones:
+        cambio_msg = f"Cambio en {transicion['symbol']} ({transicion['columna']}): De {transicion['anterior']} a {transicion['actual']}"
+        cambios.append(cambio_msg)
         if verbose:
-            print(f"      Analizando {mercado}...")
-        
-        for indicador, valores in datos['analisis_comparativo'].items():
-            anterior = valores['anterior'].get('accion', 'N/A')
-            actual = valores['actual'].get('accion', 'N/A')
-            
-            if anterior != actual:
-                cambio_msg = f"Cambio en {mercado} ({indicador}): De {anterior} a {actual}"
-                cambios.append(cambio_msg)
-                hay_cambios = True
-                
-                if verbose:
-                    print(f"        🔄 {cambio_msg}")
-            else:
-                if verbose:
-                    print(f"        ✅ {mercado} ({indicador}): Sin cambios ({anterior})")
+            print(f"        🔄 {cambio_msg}")
+    hay_cambios = bool(cambios)
     
     if verbose:
         print(f"\n   📊 RESUMEN DE CAMBIOS:")
@@ -71,21 +67,28 @@ def comparar_y_notificar(
             print(f"      {resultado}")
         
         numeros = leer_numeros_whatsapp(mobile_list_notification)
-        registrar_en_log(log_whatsapp_message, numeros if numeros else [], resultado, list(comparacion_completa.values()), estrategia)
+        registrar_en_log(log_whatsapp_message, numeros if numeros else [], resultado, transiciones, estrategia)
+        # Sin cambios nuevos puede haber resúmenes pendientes cuya ventana ya venció
+        despachar_notificacion(numeros, [], actual, estrategia, verbose)
         
         if verbose:
             print(f"      📝 Registrado en log: {len(numeros)} números")
         
+        NOTIFICACIONES.incrementar(estrategia=estrategia, resultado="sin_cambios")
         return resultado if not numeros else (numeros, resultado)
 
     if verbose:
         print(f"\n   📨 PASO 4 - Preparar notificación con cambios:")
 
+    CAMBIOS_SEÑAL.incrementar(len(cambios), estrategia=estrategia)
+
     numeros = leer_numeros_whatsapp(mobile_list_notification)
     if not numeros:
         resultado = "No hay números configurados para enviar notificaciones."
         if verbose:
             print(f"      ❌ {resultado}")
+        despachar_notificacion([], transiciones, actual, estrategia, verbose)
+        NOTIFICACIONES.incrementar(estrategia=estrategia, resultado="sin_destinatarios")
         return resultado
     
     # Construir mensaje detallado
@@ -95,12 +98,19 @@ def comparar_y_notificar(
     for cambio in cambios:
         mensaje += f"• {cambio}\n"
     
-    # Agregar resumen de fuerzas de señal
+    # Resumen de la señal actual de los símbolos con cambios
     mensaje += "\n💪 *Resumen de señales actuales:*\n"
-    for mercado, datos in comparacion_completa.items():
-        fuerza_actual = datos['analisis_comparativo'].get('fuerza_señal', {}).get('actual', {}).get('accion', 'N/A')
-        decision_actual = datos['analisis_comparativo'].get('estrategia_combinada', {}).get('actual', {}).get('accion', 'N/A')
-        mensaje += f"• {mercado}: {decision_actual} (Fuerza: {fuerza_actual})\n"
+    posiciones = {symbol: posicion for posicion, symbol in enumerate(actual.symbols)}
+    desde_decision = {}
+    if eventos is not None and len(eventos):
+        decision = eventos[eventos['columna'] == COLUMNA_DECISION]
+        desde_decision = dict(zip(decision['symbol'], decision['fecha']))
+    for symbol in dict.fromkeys(transicion['symbol'] for transicion in transiciones):
+        estado = actual.estado_symbol(posiciones[symbol])
+        fuerza_actual = 'N/A' if estado['fuerza'] is None else f"{estado['fuerza']:.2f}"
+        decision_actual = estado['señales'].get(COLUMNA_DECISION, 'N/A')
+        vigente = f", desde {desde_decision[symbol]:%Y-%m-%d %H:%M}" if symbol in desde_decision else ""
+        mensaje += f"• {symbol}: {decision_actual} (Fuerza: {fuerza_actual}{vigente})\n"
 
     if verbose:
         print(f"      ✅ Mensaje preparado: {len(cambios)} cambios")
@@ -108,61 +118,16 @@ def comparar_y_notificar(
         print(f"      📝 Contenido del mensaje:")
         print(f"        {mensaje[:100]}...")  # Mostrar primeros 100 caracteres
 
-    registrar_en_log(log_whatsapp_message, numeros, mensaje, list(comparacion_completa.values()), estrategia)
+    registrar_en_log(log_whatsapp_message, numeros, mensaje, transiciones, estrategia)
     
     if verbose:
         print(f"      ✅ Notificación registrada en log")
-    
-    return numeros, mensaje
 
-
-
-def generar_comparacion_completa(anteriores: Dict, actuales: Dict, verbose: bool = False) -> Dict[str, Any]:
-    """
-    Genera una comparación completa de todos los mercados e indicadores.
-    """
-    if verbose:
-        print(f"      Generando comparación completa...")
-    
-    todos_mercados = set(anteriores.keys()).union(set(actuales.keys()))
-    comparacion = {}
+    # Agrupación por destinatario y envío en segundo plano: el pipeline no espera a la red
+    despachar_notificacion(numeros, transiciones, actual, estrategia, verbose)
     
-    for mercado in todos_mercados:
-        if verbose:
-            print(f"        Procesando {mercado}...")
-        
-        datos_anteriores = anteriores.get(mercado, {})
-        datos_actuales = actuales.get(mercado, {})
-        
-        comparacion[mercado] = {
-            'mercado': mercado,
-            'analisis_comparativo': {}
-        }
-        
-        # Obtener el último registro de cada DataFrame
-        if len(datos_anteriores) > 0:
-            ultimo_anterior = datos_anteriores.iloc[-1].to_dict()
-        else:
-            ultimo_anterior = {}
-            
-        if len(datos_actuales) > 0:
-            ultimo_actual = datos_actuales.iloc[-1].to_dict()
-        else:
-            ultimo_actual = {}
-        
-        # Comparar solo las columnas de estrategia
-        columnas_estrategia = [col for col in ultimo_actual.keys() if 'estrategia' in col or 'fuerza' in col]
-        
-        for col in columnas_estrategia:
-            comparacion[mercado]['analisis_comparativo'][col] = {
-                'anterior': {'accion': ultimo_anterior.get(col, 'N/A')},
-                'actual': {'accion': ultimo_actual.get(col, 'N/A')}
-            }
-    
-    if verbose:
-        print(f"      ✅ Comparación completa generada")
-    
-    return comparacion
+    NOTIFICACIONES.incrementar(estrategia=estrategia, resultado="enviada")
+    return numeros, mensaje
 
 
 
@@ -180,35 +145,104 @@ def leer_numeros_whatsapp(ruta_archivo: str) -> List[str]:
     
 
 
+def despachar_notificacion(numeros: List[str], transiciones: List[Dict[str, Any]], actual, estrategia: str, verbose: bool = False):
+    """
+    Pasa los cambios de señal por el agrupador de alertas (helpers.resumen_alertas) y encola los resúmenes
+    que ya tocan en los canales configurados (WhatsApp a los números de la lista, correo a los destinatarios
+    de [SMTP]) sin esperar al envío. Se llama en cada ejecución, también sin cambios, para enviar los
+    resúmenes cuya ventana ya venció.
+    :param actual: MatrizSeñales actual (fuerza de la señal de cada símbolo)
+    :return: Número de lotes encolados o None si no hay canales configurados
+    """
+    from helpers.cola_notificaciones import obtener_despachador
+    from helpers.resumen_alertas import obtener_agrupador, agrupar_por_mensaje
+    from helpers.estado_senales import COLUMNA_FUERZA
+    from helpers.metricas import ALERTAS_AGRUPADAS
+
+    despachador = obtener_despachador(verbose)
+    if despachador is None:
+        if verbose:
+            print(f"      ⚠️  Sin canales de envío configurados: la notificación solo queda en el log")
+        return None
+
+    destinatarios = []
+    if 'whatsapp' in despachador.canales:
+        destinatarios += [('whatsapp', numero) for numero in numeros]
+    if 'email' in despachador.canales:
+        destinatarios += [('email', correo) for correo in despachador.canales['email'].destinatarios]
+
+    # La fuerza decide la prioridad de cada cambio; sus variaciones por sí solas no se notifican
+    cambios_señal = [transicion for transicion in transiciones if transicion['columna'] != COLUMNA_FUERZA]
+    fuerzas = {symbol: None if fuerza != fuerza else fuerza for symbol, fuerza in zip(actual.symbols, actual.fuerza.tolist())}
+
+    agrupador = obtener_agrupador(verbose)
+    ahora = time.time()
+    try:
+        resumenes, contadores = agrupador.procesar(estrategia, destinatarios, cambios_señal, fuerzas, ahora=ahora)
+    except Exception as e:
+        print(f"❌ Error agrupando las alertas de {estrategia}: {e}")
+        return None
+
+    for resultado, cantidad in contadores.items():
+        if cantidad:
+            ALERTAS_AGRUPADAS.incrementar(cantidad, estrategia=estrategia, resultado=resultado)
+
+    asunto = f"Actualización de Trading ({estrategia})"
+    lotes = 0
+    for (canal, mensaje), destinos in agrupar_por_mensaje(estrategia, resumenes).items():
+        # Cada cambio pendiente se encola una sola vez, así que el resumen no pasa por la deduplicación de la
+        # cola (un texto igual a uno reciente describe cambios nuevos); los pendientes se retiran solo si se
+        # encoló, si no se reintentan en la siguiente ejecución
+        encolados = despachador.encolar(canal, destinos, mensaje, asunto, deduplicar=False)
+        if encolados is None:
+            continue
+        try:
+            agrupador.confirmar(estrategia, canal, destinos, ahora)
+        except Exception as e:
+            print(f"❌ Error confirmando las alertas encoladas de {estrategia}: {e}")
+        lotes += encolados
+
+    if verbose:
+        print(f"      📬 Alertas: {contadores['inmediata']} inmediatas, {contadores['agrupada']} agrupadas, "
+              f"{contadores['oscilacion']} oscilaciones descartadas; {len(resumenes)} resúmenes ({lotes} lotes) encolados")
+    return lotes
+
+
+
+def despachar_pendientes(estrategia: str, mobile_list_notification: str, verbose: bool = False):
+    """
+    Encola los resúmenes cuya ventana ya venció sin comparar señales (modo daemon sin barras nuevas:
+    no hay cambios que registrar, pero los pendientes de ejecuciones anteriores deben salir a tiempo).
+    :return: Número de lotes encolados o None si no hay canales configurados
+    """
+    from helpers.estado_senales import matriz_estado
+
+    numeros = leer_numeros_whatsapp(mobile_list_notification)
+    return despachar_notificacion(numeros, [], matriz_estado({}), estrategia, verbose)
+
+
+
 def registrar_en_log(log_whatsapp_message, numeros: List[str], mensaje: str, cambios: List[Dict[str, Any]], estrategia: str):
-    """Registra los detalles del mensaje enviado en un archivo de log."""
-    log_file = Path(log_whatsapp_message)
-    log_file.parent.mkdir(parents=True, exist_ok=True)
-    
+    """
+    Registra los detalles del mensaje enviado en el log de notificaciones (JSON Lines con rotación,
+    ver helpers.log_notificaciones): cada envío añade una línea en lugar de reescribir el archivo.
+    """
+    from helpers.log_notificaciones import obtener_registro
+
     tz_bogota = pytz.timezone('America/Bogota')
-    fecha_hora = datetime.now(tz_bogota).strftime('%Y-%m-%d %H:%M:%S %Z')
+    ahora = datetime.now(tz_bogota)
     
     log_entry = {
-        'fecha_hora': fecha_hora,
+        'fecha_hora': ahora.strftime('%Y-%m-%d %H:%M:%S %Z'),
+        'timestamp': ahora.timestamp(),
         'estrategia': estrategia,
         'numeros_destino': numeros,
         'mensaje': mensaje,
-        'comparacion_completa': cambios
+        'cambios': cambios
     }
     
     try:
-        if not log_file.exists():
-            with open(log_file, 'w') as f:
-                json.dump([log_entry], f, indent=4, ensure_ascii=False)
-        else:
-            with open(log_file, 'r+') as f:
-                try:
-                    data = json.load(f)
-                    data.append(log_entry)
-                    f.seek(0)
-                    json.dump(data, f, indent=4, ensure_ascii=False)
-                except json.JSONDecodeError:
-                    json.dump([log_entry], f, indent=4, ensure_ascii=False)
+        obtener_registro(log_whatsapp_message).añadir(log_entry)
     except Exception as e:
         print(f"Error al escribir en el archivo de log: {e}")
 
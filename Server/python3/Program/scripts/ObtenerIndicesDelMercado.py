@@ -5,16 +5,24 @@ import json
 import os
 from pathlib import Path
 
-# Core
-from GetDataTwelveView import obtener_datos_historicos
-from ConverterDataToPandasData import convertir_a_dataframe
-from GetDataPandas import procesar_dataframes
-from TradingLogicMarket import analizar_dataframes
+# Core: los módulos del pipeline (requests, pandas, numpy) se importan al ejecutar cada etapa,
+# así cargar la configuración o mostrar el uso no paga su coste de importación
 
 # Styles
 from styles.title_console import mostrar_titulo_estrategia
 
 
+# Ruta al archivo de propiedades en el contenedor
+RUTA_PROPERTIES = "/app/scripts/properties/TradingLogicMarket.properties"
+
+# Notificaciones: destinatarios y registro de mensajes en el contenedor
+RUTA_LISTA_NOTIFICACIONES = '/app/conf/whatsappNotificationListNumber.info'
+RUTA_LOG_NOTIFICACIONES = '/app/logs/.SenderWhatsappMessage.jsonl'
+
+# Estrategias ejecutables desde Start.py ('all' equivale a todas)
+ESTRATEGIAS_DISPONIBLES = ['corto_plazo', 'mediano_plazo', 'largo_plazo', 'agresivo', 'conservador']
+
+
 
 def cargar_configuracion(estrategia):
     """
@@ -25,11 +33,12 @@ def cargar_configuracion(estrategia):
     config = configparser.ConfigParser()
     
     # Ruta al archivo de propiedades
-    ruta_archivo = "/app/scripts/properties/TradingLogicMarket.properties"
-    # Ruta archivos temporales en contenedor.
-    ruta_archivo_temporal = f"/app/tmp/resultados_anteriores_trading_{estrategia}.tmp"
-    mobile_notification_list_file = '/app/conf/whatsappNotificationListNumber.info'  # Valor por defecto
-    whatsapp_message_log_file = '/app/logs/.SenderWhatsappMessage.log'  # Valor por defecto
+    ruta_archivo = RUTA_PROPERTIES
+    # Estado de señales de la ejecución anterior (base SQLite compartida por todas las estrategias)
+    from helpers.estado_senales import RUTA_ESTADO
+    ruta_archivo_temporal = RUTA_ESTADO
+    mobile_notification_list_file = RUTA_LISTA_NOTIFICACIONES  # Valor por defecto
+    whatsapp_message_log_file = RUTA_LOG_NOTIFICACIONES  # Valor por defecto
     
     # Leer el archivo de propiedades
     try:
@@ -82,6 +91,12 @@ def cargar_configuracion(estrategia):
         # Combinaciones estratégicas
         "combinacion_indicadores": [x.strip() for x in combinacion_indicadores.split(',')],
         "combinacion_nombres": [x.strip() for x in combinacion_nombres.split(',')],
+        # Modo compacto de memoria (float32, señales categóricas, sin descripciones)
+        "modo_compacto": config[estrategia].getboolean('modo_compacto', fallback=False),
+        # Modo panel: cálculo vectorizado de todos los símbolos a la vez (sin columnas de descripción)
+        "modo_panel": config[estrategia].getboolean('modo_panel', fallback=False),
+        # Modo daemon: cada cuánto se ejecuta la estrategia (por defecto, su intervalo)
+        "frecuencia_daemon": config[estrategia].get('frecuencia_daemon', '').strip() or config[estrategia].get('intervalo', '1h'),
         # Rutas de archivos
         "ruta_archivo_temporal": ruta_archivo_temporal,
         "mobile_notification_list_file": mobile_notification_list_file,
@@ -90,20 +105,76 @@ def cargar_configuracion(estrategia):
 
 
 
-def obtener_indices_mercado(estrategia, modo_debug=False):
+def construir_parametros(config):
+    """
+    Separa la configuración de una estrategia en parámetros de indicadores y de análisis.
+    :param config: Diccionario devuelto por cargar_configuracion
+    :return: Tupla (parametros_indicadores, parametros_analisis)
+    """
+    parametros_indicadores = {
+        'rsi_periodo': config["rsi_periodo"],
+        'macd_periodo_corto': config["macd_periodo_corto"],
+        'macd_periodo_largo': config["macd_periodo_largo"],
+        'macd_periodo_senal': config["macd_periodo_senal"],
+        'media_movil_periodo': config["media_movil_periodo"],
+        'bollinger_periodo': config["bollinger_periodo"],
+        'bollinger_desviacion': config["bollinger_desviacion"],
+        'estocastico_periodo': config["estocastico_periodo"],
+        'ichimoku_conversion': config["ichimoku_conversion"],
+        'ichimoku_base': config["ichimoku_base"],
+        'ichimoku_span_b': config["ichimoku_span_b"],
+        'ichimoku_displacement': config["ichimoku_displacement"],
+        'williams_periodo': config["williams_periodo"],
+        'adx_periodo': config["adx_periodo"],
+        'parabolic_acceleration': config["parabolic_acceleration"],
+        'parabolic_maximum': config["parabolic_maximum"]
+    }
+
+    parametros_analisis = {
+    'rsi_under': config["rsi_under"],
+    'rsi_upper': config["rsi_upper"],
+    'rsi_periodo': config["rsi_periodo"],
+    'macd_periodo_corto': config["macd_periodo_corto"],
+    'macd_periodo_largo': config["macd_periodo_largo"],
+    'macd_periodo_senal': config["macd_periodo_senal"],
+    'media_movil_periodo': config["media_movil_periodo"],
+    'bollinger_periodo': config["bollinger_periodo"],
+    'bollinger_desviacion': config["bollinger_desviacion"],
+    'estocastico_periodo': config["estocastico_periodo"],
+    'combinacion_indicadores': config["combinacion_indicadores"],
+    'combinacion_nombres': config["combinacion_nombres"],
+    'periodo_volatilidad': 20
+    }
+
+    return parametros_indicadores, parametros_analisis
+
+
+
+def obtener_indices_mercado(estrategia, modo_debug=False, config=None, config_apis=None, cache_barras=None, cache_resultados=None):
     """
     Función principal que obtiene y analiza los índices del mercado.
     
     :param estrategia: Nombre de la estrategia a utilizar
     :param modo_debug: Si es True, muestra detalles del proceso
+    :param config: Configuración ya cargada de la estrategia (modo daemon); si es None se lee el archivo de propiedades
+    :param config_apis: Configuración de APIs ya cargada (modo daemon)
+    :param cache_barras: Caché de barras descargadas entre ciclos (modo daemon)
+    :param cache_resultados: Caché {estrategia: (firmas por símbolo, resultados)}; los símbolos sin barras nuevas se reutilizan
     :return: Diccionario con los resultados del análisis técnico
+             (con 'all' o varias estrategias separadas por comas: {estrategia: resultados})
     """
+    # Varias estrategias ('all' o lista separada por comas): devuelve {estrategia: resultados}
+    estrategias = resolver_estrategias(estrategia)
+    if len(estrategias) > 1:
+        return obtener_indices_mercado_estrategias(estrategias, modo_debug)
+
     # Mostrar título de la estrategia
     mostrar_titulo_estrategia(f"Estrategia: {estrategia}")
 
     # Cargar configuración de la estrategia
     try:
-        config = cargar_configuracion(estrategia)
+        if config is None:
+            config = cargar_configuracion(estrategia)
         # Símbolos - prioridad: kwargs > properties > default
         symbols = config["symbols"]
         # Datos para la consulta de indices
@@ -132,6 +203,8 @@ def obtener_indices_mercado(estrategia, modo_debug=False):
         # Combinaciones estratégicas
         combinacion_indicadores = config["combinacion_indicadores"]
         combinacion_nombres = config["combinacion_nombres"]
+        modo_compacto = config["modo_compacto"]
+        modo_panel = config["modo_panel"]
         
     except ValueError as e:
         print(f"❌ Error de configuración: {e}")
@@ -143,38 +216,6 @@ def obtener_indices_mercado(estrategia, modo_debug=False):
     
 
 
-    # Paso 1: Obtener datos históricos
-    print("Obteniendo datos históricos...")
-    print(f"📊 Índices a obtener: {symbols}")  # NUEVO: mostrar los índices
-    
-    datos_historicos = obtener_datos_historicos(intervalo, periodo, verbose=modo_debug, symbols=symbols)
-
-    # MEJORAR EL MENSAJE DE RESULTADO
-    if datos_historicos:
-        # Filtrar símbolos que sí obtuvieron datos
-        simbolos_con_datos = [symbol for symbol, data in datos_historicos.items() if data is not None]
-        simbolos_sin_datos = [symbol for symbol in symbols if symbol not in simbolos_con_datos]
-        
-        print(f"✅ Datos históricos obtenidos para {len(simbolos_con_datos)} mercados: {simbolos_con_datos}")
-        
-        if simbolos_sin_datos:
-            print(f"⚠️  No se pudieron obtener datos para: {simbolos_sin_datos}")
-    else:
-        print("❌ No se pudieron obtener los datos históricos.")
-        return None
-    
-
-
-    # Paso 2: Convertir datos a DataFrames de pandas
-    print("Convirtiendo datos a DataFrames...")
-    dataframes = convertir_a_dataframe(datos_historicos, modo_debug)
-    print(f"Se convirtieron {len(dataframes)} DataFrames.")
-
-
-
-    # Paso 3: Procesar DataFrames y calcular métricas
-    print("\nCalculando indicadores técnicos...")
-
     if modo_debug:
         print("🔍 MODO DEBUG ACTIVADO PARA INDICADORES TÉCNICOS")
         print(f"📊 Parámetros utilizados:")
@@ -189,52 +230,131 @@ def obtener_indices_mercado(estrategia, modo_debug=False):
         print(f"  - Parabolic SAR: acc={parabolic_acceleration}, max={parabolic_maximum}")
         print(f"  - Combinación: {combinacion_indicadores}")
     
-    # funcion que calcula los valores de los indicadores.
-    indicadores_de_bolsa_caldulados = procesar_dataframes(
-        dataframes, 
-        rsi_periodo=rsi_periodo,
-        macd_periodo_corto=macd_periodo_corto,
-        macd_periodo_largo=macd_periodo_largo,
-        macd_periodo_senal=macd_periodo_senal,
-        media_movil_periodo=media_movil_periodo,
-        bollinger_periodo=bollinger_periodo,
-        bollinger_desviacion=bollinger_desviacion,
-        estocastico_periodo=estocastico_periodo,
-        ichimoku_conversion=ichimoku_conversion,
-        ichimoku_base=ichimoku_base,
-        ichimoku_span_b=ichimoku_span_b,
-        ichimoku_displacement=ichimoku_displacement,
-        williams_periodo=williams_periodo,
-        adx_periodo=adx_periodo,
-        parabolic_acceleration=parabolic_acceleration,
-        parabolic_maximum=parabolic_maximum,
-        verbose=modo_debug
-    )
-
-
-
-    # Paso 4: Aplicar lógica de trading
-    parametros_analisis = {
-    'rsi_under': rsi_under,
-    'rsi_upper': rsi_upper,
-    'rsi_periodo': rsi_periodo,
-    'macd_periodo_corto': macd_periodo_corto,
-    'macd_periodo_largo': macd_periodo_largo,
-    'macd_periodo_senal': macd_periodo_senal,
-    'media_movil_periodo': media_movil_periodo,
-    'bollinger_periodo': bollinger_periodo,
-    'bollinger_desviacion': bollinger_desviacion,
-    'estocastico_periodo': estocastico_periodo,
-    'combinacion_indicadores': combinacion_indicadores,
-    'combinacion_nombres': combinacion_nombres,
-    'periodo_volatilidad': 20
-    }
+    parametros_indicadores, parametros_analisis = construir_parametros(config)
+
+    # Core
+    from GetDataTwelveView import obtener_datos_historicos_en_flujo
+    from ConverterDataToPandasData import convertir_a_dataframe
+    from DataQualityValidator import validar_calidad_dataframes, mostrar_reporte_calidad
+    from GetDataPandas import procesar_dataframes
+    from TradingLogicMarket import analizar_dataframes
+    from helpers.instrumentacion import span
+
+    # Resultados del ciclo anterior (modo daemon) para reutilizar los símbolos sin barras nuevas
+    firma_anterior, resultados_anteriores = (cache_resultados or {}).get(estrategia, ({}, {}))
+    firma_datos = {}
 
-    resultados_trading = analizar_dataframes(
-        indicadores_de_bolsa_caldulados, 
-        verbose=modo_debug,
-        **parametros_analisis
-    )
+
+
+    # Pasos 1 a 4 en flujo: cada símbolo se convierte, valida, calcula y analiza en cuanto
+    # llegan sus datos, mientras la descarga del siguiente símbolo continúa en segundo plano
+    print("Obteniendo datos históricos...")
+    print(f"📊 Índices a obtener: {symbols}")  # NUEVO: mostrar los índices
+    if modo_panel:
+        print(f"🧮 Modo panel activado: los indicadores se calculan cuando lleguen todos los símbolos")
+
+    simbolos_con_datos = []
+    reportes_calidad = {}
+    dataframes = {}
+    resultados_trading = {}
+    resultados_nuevos = {}
+
+    for symbol, datos_symbol in obtener_datos_historicos_en_flujo(intervalo, periodo, verbose=modo_debug, symbols=symbols,
+                                                                  config_apis=config_apis, cache_barras=cache_barras):
+        if datos_symbol is None:
+            continue
+        simbolos_con_datos.append(symbol)
+        firma_datos[symbol] = calcular_firma_datos(datos_symbol)
+
+        # Sin barras nuevas desde el ciclo anterior: sus indicadores y señales no cambian
+        if not modo_panel and firma_anterior.get(symbol) == firma_datos[symbol] and symbol in resultados_anteriores:
+            resultados_trading[symbol] = resultados_anteriores[symbol]
+            continue
+
+        with span('simbolo', symbol=symbol, estrategia=estrategia) as registro_symbol:
+            registro_symbol['filas'] = len(datos_symbol['values'])
+
+            # Paso 2: Convertir a DataFrame y validar calidad de datos
+            with span('conversion', symbol=symbol) as registro:
+                df = convertir_a_dataframe({symbol: datos_symbol}, modo_debug).get(symbol)
+                registro['filas'] = 0 if df is None else len(df)
+            if df is None:
+                continue
+            with span('validacion', symbol=symbol) as registro:
+                limpios, reporte_calidad = validar_calidad_dataframes({symbol: df}, intervalo, verbose=modo_debug)
+                registro['filas'] = len(limpios[symbol]) if symbol in limpios else 0
+            reportes_calidad.update(reporte_calidad)
+            if symbol not in limpios:
+                continue
+
+            if modo_panel:
+                dataframes[symbol] = limpios[symbol]
+                continue
+
+            # Paso 3: Calcular indicadores técnicos
+            with span('indicadores', symbol=symbol) as registro:
+                indicadores_de_bolsa_caldulados = procesar_dataframes(
+                    limpios,
+                    verbose=modo_debug,
+                    **parametros_indicadores
+                )
+                registro['filas'] = sum(len(df) for df in (indicadores_de_bolsa_caldulados or {}).values())
+
+            # Paso 4: Aplicar lógica de trading
+            with span('analisis', symbol=symbol) as registro:
+                resultados_nuevos.update(analizar_dataframes(
+                    indicadores_de_bolsa_caldulados,
+                    verbose=modo_debug,
+                    **parametros_analisis
+                ))
+                registro['filas'] = registro_symbol['filas']
+
+    # MEJORAR EL MENSAJE DE RESULTADO
+    if not simbolos_con_datos:
+        print("❌ No se pudieron obtener los datos históricos.")
+        return None
+
+    simbolos_sin_datos = [symbol for symbol in symbols if symbol not in simbolos_con_datos]
+    print(f"✅ Datos históricos obtenidos para {len(simbolos_con_datos)} mercados: {simbolos_con_datos}")
+    if simbolos_sin_datos:
+        print(f"⚠️  No se pudieron obtener datos para: {simbolos_sin_datos}")
+
+    if reportes_calidad:
+        mostrar_reporte_calidad(reportes_calidad)
+
+    # Ningún símbolo con barras nuevas: se devuelve el mismo resultado del ciclo anterior
+    if firma_datos == firma_anterior and resultados_anteriores:
+        print(f"♻️  Sin barras nuevas para {estrategia}: se reutilizan los resultados del ciclo anterior")
+        return resultados_anteriores
+
+    if modo_panel and dataframes:
+        # Modo panel: indicadores y señales de todos los símbolos en una sola pasada
+        from PanelMercados import procesar_panel
+        print(f"🧮 Modo panel: {len(dataframes)} símbolos procesados a la vez")
+        with span('panel', estrategia=estrategia, simbolos=len(dataframes)) as registro:
+            resultados_nuevos = procesar_panel(
+                dataframes,
+                verbose=modo_debug,
+                **{**parametros_indicadores, **parametros_analisis}
+            )
+            registro['filas'] = sum(len(df) for df in dataframes.values())
+
+    if not resultados_nuevos and not resultados_trading:
+        print("❌ Ningún símbolo superó la validación de calidad de datos.")
+        return None
+
+    # Paso 5: Modo compacto de memoria (opcional, los resultados reutilizados ya están compactados)
+    if modo_compacto and resultados_nuevos:
+        from helpers.memory_utils import compactar_dataframes
+        with span('compactacion', estrategia=estrategia):
+            resultados_nuevos, _ = compactar_dataframes(resultados_nuevos, verbose=modo_debug)
+
+    # Mantener el orden de los símbolos de la configuración
+    resultados_trading.update(resultados_nuevos)
+    resultados_trading = {symbol: resultados_trading[symbol] for symbol in symbols if symbol in resultados_trading}
+
+    if cache_resultados is not None and resultados_trading:
+        cache_resultados[estrategia] = (firma_datos, resultados_trading)
 
     print(f"\n✅ ANÁLISIS COMPLETADO para estrategia: {estrategia}")
     print(f"   Símbolos procesados: {len(resultados_trading)}")
@@ -244,6 +364,180 @@ def obtener_indices_mercado(estrategia, modo_debug=False):
 
 
 
+def resolver_estrategias(texto):
+    """
+    Convierte el argumento de estrategia en una lista: 'all' = todas, o lista separada por comas.
+    """
+    texto = texto.strip().lower()
+    if texto == 'all':
+        return list(ESTRATEGIAS_DISPONIBLES)
+    return [estrategia.strip() for estrategia in texto.split(',') if estrategia.strip()]
+
+
+
+def obtener_indices_mercado_estrategias(estrategias, modo_debug=False):
+    """
+    Ejecuta varias estrategias en una sola pasada compartiendo el trabajo común:
+    cada (símbolo, intervalo) se descarga una sola vez con la ventana más larga pedida,
+    cada serie se valida una vez por ventana y cada conjunto distinto de parámetros de
+    indicadores se calcula una sola vez. Después se aplican las reglas de cada estrategia.
+
+    :param estrategias: Lista de estrategias
+    :param modo_debug: Si es True, muestra detalles del proceso
+    :return: Diccionario {estrategia: resultados} o None si ninguna estrategia obtuvo resultados
+    """
+    from helpers.config_loader import cargar_configuracion_apis
+    from helpers.backfill_utils import recortar_a_ventana
+    from helpers.date_utils import convertir_a_segundos
+    from GetDataTwelveView import obtener_datos_historicos
+    from ConverterDataToPandasData import convertir_a_dataframe
+    from DataQualityValidator import validar_calidad_dataframes, mostrar_reporte_calidad
+    from GetDataPandas import procesar_dataframes, resolver_parametros_indicadores
+    from TradingLogicMarket import analizar_dataframes
+    from helpers.instrumentacion import span
+
+    mostrar_titulo_estrategia(f"Estrategias: {', '.join(estrategias)}")
+
+    # Cargar la configuración de todas las estrategias
+    configs = {}
+    for estrategia in estrategias:
+        try:
+            config = cargar_configuracion(estrategia)
+        except Exception as e:
+            print(f"❌ Error de configuración en {estrategia}: {e}")
+            continue
+        config['segundos_periodo'] = convertir_a_segundos(config['periodo'])
+        if not config['segundos_periodo']:
+            print(f"❌ Periodo no válido en {estrategia}: {config['periodo']}")
+            continue
+        configs[estrategia] = config
+
+    if not configs:
+        return None
+
+    # Paso 1: unión de símbolos por intervalo, con la ventana más larga de las estrategias
+    peticiones = {}
+    for config in configs.values():
+        peticion = peticiones.setdefault(config['intervalo'], {'symbols': [], 'config': config})
+        peticion['symbols'] += [symbol for symbol in config['symbols'] if symbol not in peticion['symbols']]
+        if config['segundos_periodo'] > peticion['config']['segundos_periodo']:
+            peticion['config'] = config
+
+    config_apis = cargar_configuracion_apis(verbose=modo_debug)
+    if not config_apis:
+        print("❌ No se pudo cargar la configuración de ninguna API")
+        return None
+
+    registros = {}
+    for intervalo, peticion in peticiones.items():
+        periodo = peticion['config']['periodo']
+        print(f"📊 Descargando {len(peticion['symbols'])} símbolos a {intervalo} ({periodo}): {peticion['symbols']}")
+        datos = obtener_datos_historicos(intervalo, periodo, verbose=modo_debug, symbols=peticion['symbols'],
+                                         config_apis=config_apis) or {}
+        for symbol, datos_symbol in datos.items():
+            registros[(symbol, intervalo)] = datos_symbol['values']
+
+    descargas_separadas = sum(len(config['symbols']) for config in configs.values())
+    print(f"✅ {len(registros)} series descargadas (ejecutando las estrategias por separado serían {descargas_separadas})")
+
+    # Paso 2: conversión y validación de cada (símbolo, intervalo, periodo) una sola vez
+    series = {}
+    for estrategia, config in configs.items():
+        intervalo, periodo = config['intervalo'], config['periodo']
+        pendientes = {
+            symbol: {'values': recortar_a_ventana(registros[(symbol, intervalo)], config['segundos_periodo'])}
+            for symbol in config['symbols']
+            if (symbol, intervalo) in registros and (symbol, intervalo, periodo) not in series
+        }
+        if not pendientes:
+            continue
+        with span('conversion', intervalo=intervalo, periodo=periodo, simbolos=len(pendientes)) as registro:
+            dataframes = convertir_a_dataframe(pendientes, modo_debug)
+            registro['filas'] = sum(len(df) for df in dataframes.values())
+        with span('validacion', intervalo=intervalo, periodo=periodo) as registro:
+            dataframes, reportes_calidad = validar_calidad_dataframes(dataframes, intervalo, verbose=modo_debug)
+            registro['filas'] = sum(len(df) for df in dataframes.values())
+        mostrar_reporte_calidad(reportes_calidad)
+        for symbol, df in dataframes.items():
+            series[(symbol, intervalo, periodo)] = df
+
+    # Paso 3 y 4: indicadores por conjunto de parámetros efectivos y reglas de cada estrategia
+    indicadores = {}
+    calculos_separados = 0
+    resultados_por_estrategia = {}
+
+    for estrategia, config in configs.items():
+        intervalo, periodo = config['intervalo'], config['periodo']
+        parametros_indicadores, parametros_analisis = construir_parametros(config)
+        dataframes = {
+            symbol: series[(symbol, intervalo, periodo)]
+            for symbol in config['symbols'] if (symbol, intervalo, periodo) in series
+        }
+        if not dataframes:
+            print(f"❌ {estrategia}: ningún símbolo con datos válidos")
+            continue
+
+        print(f"\nCalculando indicadores y señales para {estrategia}...")
+
+        if config['modo_panel']:
+            from PanelMercados import procesar_panel
+            with span('panel', estrategia=estrategia, simbolos=len(dataframes)) as registro:
+                resultados_trading = procesar_panel(
+                    dataframes,
+                    verbose=modo_debug,
+                    **{**parametros_indicadores, **parametros_analisis}
+                )
+                registro['filas'] = sum(len(df) for df in dataframes.values())
+
+        else:
+            # Dos estrategias con los mismos parámetros efectivos sobre la misma serie comparten indicadores
+            clave_parametros = tuple(sorted(resolver_parametros_indicadores(**parametros_indicadores).items()))
+            calculos_separados += len(dataframes)
+            pendientes = {
+                symbol: df.copy() for symbol, df in dataframes.items()
+                if (symbol, intervalo, periodo, clave_parametros) not in indicadores
+            }
+            if pendientes:
+                with span('indicadores', estrategia=estrategia, simbolos=len(pendientes)) as registro:
+                    calculados = procesar_dataframes(pendientes, verbose=modo_debug, **parametros_indicadores)
+                    registro['filas'] = sum(len(df) for df in calculados.values())
+                for symbol, df in calculados.items():
+                    indicadores[(symbol, intervalo, periodo, clave_parametros)] = df
+
+            # analizar_dataframes trabaja sobre una copia, los indicadores compartidos no se modifican
+            with span('analisis', estrategia=estrategia, simbolos=len(dataframes)) as registro:
+                resultados_trading = analizar_dataframes(
+                    {symbol: indicadores[(symbol, intervalo, periodo, clave_parametros)] for symbol in dataframes},
+                    verbose=modo_debug,
+                    **parametros_analisis
+                )
+                registro['filas'] = sum(len(df) for df in dataframes.values())
+
+        if config['modo_compacto']:
+            from helpers.memory_utils import compactar_dataframes
+            resultados_trading, _ = compactar_dataframes(resultados_trading, verbose=modo_debug)
+
+        if resultados_trading:
+            resultados_por_estrategia[estrategia] = resultados_trading
+            print(f"✅ ANÁLISIS COMPLETADO para estrategia: {estrategia} ({len(resultados_trading)} símbolos)")
+
+    if calculos_separados:
+        print(f"\n🧮 Indicadores calculados: {len(indicadores)} series (por separado serían {calculos_separados})")
+
+    return resultados_por_estrategia or None
+
+
+
+def calcular_firma_datos(datos_symbol):
+    """
+    Firma de los datos descargados de un símbolo: número de barras y última barra (fecha, cierre y volumen).
+    Si no cambia entre dos ciclos, el análisis del símbolo produciría exactamente el mismo resultado.
+    """
+    ultimo = datos_symbol['values'][0]
+    return (len(datos_symbol['values']), ultimo.get('datetime'), ultimo.get('close'), ultimo.get('volume'))
+
+
+
 # Función de compatibilidad para mantener el funcionamiento actual
 def main(estrategia, modo_debug=False):
     """
@@ -0,0 +1,470 @@
+import numpy as np
+import pandas as pd
+
+from GetDataPandas import resolver_parametros_indicadores
+
+
+CAMPOS_PANEL = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Señales codificadas: permiten aplicar las reglas con broadcasting sobre toda la matriz
+CODIGOS_SEÑAL = {'VENTA_FUERTE': -2, 'VENTA': -1, 'HOLD': 0, 'COMPRA': 1, 'COMPRA_FUERTE': 2}
+ETIQUETAS_SEÑAL = ['VENTA_FUERTE', 'VENTA', 'HOLD', 'COMPRA', 'COMPRA_FUERTE']  # índice = código + 2
+
+COMPRA_FUERTE, COMPRA, HOLD, VENTA, VENTA_FUERTE = 2, 1, 0, -1, -2
+
+
+
+# =============================================================================
+# CONSTRUCCIÓN DEL PANEL (TIEMPO × SÍMBOLO)
+# =============================================================================
+
+def construir_panel(dataframes, verbose=False):
+    """
+    Construye un panel con una matriz 2D (tiempo × símbolo) por campo a partir de los DataFrames.
+    Las series se alinean a la derecha por posición de barra (la última fila es la barra más
+    reciente de cada símbolo) y las filas previas al inicio de cada símbolo se rellenan con NaN.
+    Las matrices se guardan en orden Fortran para que la columna de cada símbolo sea contigua.
+    :param dataframes: Diccionario {symbol: DataFrame} ordenado por fecha ascendente
+    :param verbose: Si es True, muestra detalles del proceso
+    :return: Diccionario con 'symbols', 'inicios', 'datetime', 'campos' y 'señales'
+    """
+    symbols = [symbol for symbol, df in dataframes.items() if df is not None and len(df) > 0]
+    longitudes = np.array([len(dataframes[symbol]) for symbol in symbols], dtype=np.int64)
+    filas = int(longitudes.max()) if len(longitudes) else 0
+    inicios = filas - longitudes
+
+    fechas = np.full((filas, len(symbols)), np.datetime64('NaT'), dtype='datetime64[ns]', order='F')
+    campos = {campo: np.full((filas, len(symbols)), np.nan, order='F') for campo in CAMPOS_PANEL}
+
+    for j, symbol in enumerate(symbols):
+        df = dataframes[symbol]
+        inicio = inicios[j]
+        fechas[inicio:, j] = df['datetime'].to_numpy(dtype='datetime64[ns]')
+        for campo in CAMPOS_PANEL:
+            campos[campo][inicio:, j] = df[campo].to_numpy(dtype=np.float64)
+
+    if verbose:
+        print(f"  🧮 Panel construido: {filas} barras × {len(symbols)} símbolos")
+
+    return {
+        'symbols': symbols,
+        'inicios': inicios,
+        'datetime': fechas,
+        'campos': campos,
+        'señales': {}
+    }
+
+
+
+def _mascara_relleno(panel):
+    """Matriz booleana con True en las filas de relleno previas al inicio de cada símbolo."""
+    filas = panel['datetime'].shape[0]
+    return np.arange(filas)[:, None] < panel['inicios'][None, :]
+
+
+
+# =============================================================================
+# OPERACIONES VECTORIZADAS SOBRE MATRICES
+# =============================================================================
+
+def _marco(matriz):
+    """Envuelve una matriz 2D en un DataFrame sin copiar para usar las ventanas de pandas por columna."""
+    return pd.DataFrame(matriz, copy=False)
+
+
+def _rolling(matriz, ventana, operacion):
+    """Ventana móvil por columna (mismo algoritmo y resultado que Series.rolling)."""
+    return getattr(_marco(matriz).rolling(window=ventana), operacion)().to_numpy()
+
+
+def _ewm(matriz, **kwargs):
+    """Media exponencial por columna (mismo resultado que Series.ewm(...).mean())."""
+    return _marco(matriz).ewm(**kwargs).mean().to_numpy()
+
+
+def _shift(matriz, periodos):
+    """Desplaza las filas rellenando con NaN (equivalente a Series.shift)."""
+    resultado = np.full_like(matriz, np.nan)
+    if periodos > 0:
+        resultado[periodos:] = matriz[:-periodos]
+    elif periodos < 0:
+        resultado[:periodos] = matriz[-periodos:]
+    else:
+        resultado[:] = matriz
+    return resultado
+
+
+def _select(condiciones, codigos, default=HOLD):
+    """np.select sobre códigos de señal enteros."""
+    return np.select(condiciones, codigos, default=default).astype(np.int8)
+
+
+
+# =============================================================================
+# INDICADORES SOBRE TODO EL UNIVERSO
+# =============================================================================
+
+def calcular_indicadores_panel(panel, verbose=False, **kwargs):
+    """
+    Calcula todos los indicadores técnicos una sola vez para todos los símbolos del panel.
+    Reproduce los cálculos de ProcesingDataPandas (mismos parámetros efectivos que procesar_dataframes).
+    :param panel: Panel generado por construir_panel
+    :param verbose: Si es True, muestra detalles del proceso
+    :param kwargs: Parámetros de la estrategia
+    :return: El mismo panel con los indicadores agregados a 'campos'
+    """
+    p = resolver_parametros_indicadores(**kwargs)
+    c = panel['campos']
+    close, high, low = c['Close'], c['High'], c['Low']
+    relleno = _mascara_relleno(panel)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # RSI
+        delta = close - _shift(close, 1)
+        ganancia = np.where(relleno, np.nan, np.where(delta > 0, delta, 0.0))
+        perdida = np.where(relleno, np.nan, np.where(delta < 0, -delta, 0.0))
+        rs = _rolling(ganancia, p['rsi_periodo'], 'mean') / _rolling(perdida, p['rsi_periodo'], 'mean')
+        c['RSI'] = 100 - (100 / (1 + rs))
+
+        # MACD
+        macd = (_ewm(close, span=p['macd_periodo_corto'], adjust=False)
+                - _ewm(close, span=p['macd_periodo_largo'], adjust=False))
+        macd_signal = _ewm(macd, span=p['macd_periodo_senal'], adjust=False)
+        c['MACD'] = macd
+        c['MACD_signal'] = macd_signal
+        c['MACD_hist'] = macd - macd_signal
+
+        # Media móvil
+        c['MA'] = _rolling(close, p['media_movil_periodo'], 'mean')
+
+        # Bandas de Bollinger
+        bollinger_ma = _rolling(close, p['bollinger_periodo'], 'mean')
+        std = _rolling(close, p['bollinger_periodo'], 'std')
+        c['Bollinger_MA'] = bollinger_ma
+        c['Bollinger_Upper'] = bollinger_ma + (std * p['bollinger_desviacion'])
+        c['Bollinger_Lower'] = bollinger_ma - (std * p['bollinger_desviacion'])
+
+        # Estocástico
+        lowest_low = _rolling(low, p['estocastico_periodo'], 'min')
+        highest_high = _rolling(high, p['estocastico_periodo'], 'max')
+        k = 100 * (close - lowest_low) / (highest_high - lowest_low)
+        c['%K'] = k
+        c['%D'] = _rolling(k, 3, 'mean')
+
+        # Ichimoku
+        desplazamiento = p['ichimoku_displacement']
+        conversion = (_rolling(high, p['ichimoku_conversion'], 'max') + _rolling(low, p['ichimoku_conversion'], 'min')) / 2
+        base = (_rolling(high, p['ichimoku_base'], 'max') + _rolling(low, p['ichimoku_base'], 'min')) / 2
+        c['Ichimoku_Conversion'] = conversion
+        c['Ichimoku_Base'] = base
+        c['Ichimoku_Senkou_A'] = _shift((conversion + base) / 2, desplazamiento)
+        span_b = (_rolling(high, p['ichimoku_span_b'], 'max') + _rolling(low, p['ichimoku_span_b'], 'min')) / 2
+        c['Ichimoku_Senkou_B'] = _shift(span_b, desplazamiento)
+        c['Ichimoku_Chikou'] = _shift(close, -desplazamiento)
+
+        # Williams %R
+        highest_high = _rolling(high, p['williams_periodo'], 'max')
+        lowest_low = _rolling(low, p['williams_periodo'], 'min')
+        c['Williams_R'] = ((highest_high - close) / (highest_high - lowest_low)) * -100
+
+        # ADX
+        close_prev = _shift(close, 1)
+        tr = np.fmax(np.fmax(high - low, np.abs(high - close_prev)), np.abs(low - close_prev))
+        up_move = high - _shift(high, 1)
+        down_move = _shift(low, 1) - low
+        plus_dm = np.where(relleno, np.nan, np.where((up_move > down_move) & (up_move > 0), up_move, 0.0))
+        minus_dm = np.where(relleno, np.nan, np.where((down_move > up_move) & (down_move > 0), down_move, 0.0))
+        alpha = 1 / p['adx_periodo']
+        tr_smooth = _ewm(tr, alpha=alpha, adjust=False)
+        plus_di = 100 * (_ewm(plus_dm, alpha=alpha, adjust=False) / tr_smooth)
+        minus_di = 100 * (_ewm(minus_dm, alpha=alpha, adjust=False) / tr_smooth)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+        c['ADX'] = _ewm(dx, alpha=alpha, adjust=False)
+        c['DI_Plus'] = plus_di
+        c['DI_Minus'] = minus_di
+
+        # Parabolic SAR
+        c['Parabolic_SAR'] = _parabolic_sar_panel(high, low, panel['inicios'], p['parabolic_acceleration'], p['parabolic_maximum'])
+
+    if verbose:
+        print(f"  🧮 Indicadores calculados para {len(panel['symbols'])} símbolos en una sola pasada")
+
+    return panel
+
+
+
+def _parabolic_sar_panel(high, low, inicios, acceleration, maximum):
+    """
+    Parabolic SAR para todos los símbolos a la vez: el bucle recorre el tiempo una sola vez
+    y cada paso actualiza el estado de todos los símbolos con operaciones vectorizadas.
+    """
+    filas, columnas = high.shape
+    sar = np.full((filas, columnas), np.nan, order='F')
+    if filas == 0:
+        return sar
+
+    indices = np.arange(columnas)
+    sar[inicios, indices] = low[inicios, indices]
+    sar_prev = low[inicios, indices].copy()
+    trend = np.ones(columnas)
+    ep = high[inicios, indices].copy()
+    af = np.full(columnas, float(acceleration))
+
+    for i in range(int(inicios.min()) + 1, filas):
+        activos = i > inicios
+        # Dos barras previas solo si existen para el símbolo (si no, se repite la anterior)
+        dos_previas = (i - 2) >= inicios
+        low1, high1 = low[i - 1], high[i - 1]
+        low2 = np.where(dos_previas, low[i - 2], low1)
+        high2 = np.where(dos_previas, high[i - 2], high1)
+
+        sar_provisional = sar_prev + af * (ep - sar_prev)
+        alcista = trend == 1
+        sar_i = np.where(alcista,
+                         np.minimum(np.minimum(sar_provisional, low1), low2),
+                         np.maximum(np.maximum(sar_provisional, high1), high2))
+
+        reversion_bajista = alcista & (low[i] < sar_i)
+        reversion_alcista = ~alcista & (high[i] > sar_i)
+        reversion = reversion_bajista | reversion_alcista
+        extiende = (alcista & ~reversion & (high[i] > ep)) | (~alcista & ~reversion & (low[i] < ep))
+
+        nuevo_sar = np.where(reversion_bajista, np.maximum(high[i], high1),
+                             np.where(reversion_alcista, np.minimum(low[i], low1), sar_i))
+        nuevo_trend = np.where(reversion_bajista, -1.0, np.where(reversion_alcista, 1.0, trend))
+        extremo = np.where(alcista, high[i], low[i])
+        nuevo_ep = np.where(reversion_bajista, low[i],
+                            np.where(reversion_alcista, high[i], np.where(extiende, extremo, ep)))
+        nuevo_af = np.where(reversion, float(acceleration),
+                            np.where(extiende, np.minimum(af + acceleration, maximum), af))
+
+        sar[i] = np.where(activos, nuevo_sar, sar[i])
+        sar_prev = np.where(activos, nuevo_sar, sar_prev)
+        trend = np.where(activos, nuevo_trend, trend)
+        ep = np.where(activos, nuevo_ep, ep)
+        af = np.where(activos, nuevo_af, af)
+
+    return sar
+
+
+
+# =============================================================================
+# REGLAS DE TRADING SOBRE TODO EL UNIVERSO
+# =============================================================================
+
+def analizar_panel(panel, verbose=False, **kwargs):
+    """
+    Aplica las reglas de TradingLogicMarket a todos los símbolos a la vez con señales codificadas.
+    No genera columnas de descripción (texto por fila).
+    :param panel: Panel con indicadores calculados
+    :param verbose: Si es True, muestra detalles del proceso
+    :param kwargs: Parámetros de análisis (rsi_under, rsi_upper, periodo_volatilidad, combinacion_indicadores)
+    :return: El mismo panel con valores en 'campos' y señales en 'señales'
+    """
+    rsi_under = kwargs.get('rsi_under', 14)
+    rsi_upper = kwargs.get('rsi_upper', 14)
+    periodo_volatilidad = kwargs.get('periodo_volatilidad', 20)
+    combinacion_indicadores = kwargs.get('combinacion_indicadores', ['rsi', 'macd', 'media_movil', 'bollinger', 'estocastico', 'volatilidad'])
+
+    c = panel['campos']
+    s = panel['señales']
+    close = c['Close']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # RSI
+        rsi = c['RSI']
+        s['estrategia_rsi'] = _select(
+            [rsi < rsi_under, rsi > rsi_upper, (rsi >= rsi_under) & (rsi <= 40), (rsi >= 60) & (rsi <= rsi_upper), (rsi > 40) & (rsi < 60)],
+            [COMPRA_FUERTE, VENTA_FUERTE, COMPRA, VENTA, HOLD])
+        c['estrategia_rsi_valor'] = rsi
+
+        # MACD
+        macd, macd_signal = c['MACD'], c['MACD_signal']
+        histograma = macd - macd_signal
+        c['MACD_histogram'] = histograma
+        s['estrategia_macd'] = _select(
+            [(macd > macd_signal) & (histograma > 0), (macd < macd_signal) & (histograma < 0),
+             macd > macd_signal, macd < macd_signal, macd == macd_signal],
+            [COMPRA_FUERTE, VENTA_FUERTE, COMPRA, VENTA, HOLD])
+        c['estrategia_macd_valor'] = histograma
+
+        # Media móvil
+        ma = c['MA']
+        s['estrategia_ma'] = _select([close > ma, close < ma, close == ma], [COMPRA, VENTA, HOLD])
+        c['estrategia_ma_valor'] = close - ma
+
+        # Bollinger
+        superior, inferior = c['Bollinger_Upper'], c['Bollinger_Lower']
+        posicion = (close - inferior) / (superior - inferior)
+        c['Bollinger_Position'] = posicion
+        s['estrategia_bollinger'] = _select(
+            [close > superior, close < inferior, (close <= superior) & (close >= inferior)],
+            [VENTA, COMPRA, HOLD])
+        c['estrategia_bollinger_valor'] = posicion
+
+        # Estocástico
+        k, d = c['%K'], c['%D']
+        s['estrategia_estocastico'] = _select(
+            [(k > 80) & (d > 80), (k < 20) & (d < 20), k > d, k < d],
+            [VENTA, COMPRA, COMPRA, VENTA])
+        c['estrategia_estocastico_valor'] = (k + d) / 2
+
+        # Volatilidad
+        retornos = close / _shift(close, 1) - 1
+        volatilidad = _rolling(retornos, periodo_volatilidad, 'std') * np.sqrt(252) * 100
+        close_prev = _shift(close, 1)
+        true_range = np.maximum(np.maximum(c['High'] - c['Low'], np.abs(c['High'] - close_prev)), np.abs(c['Low'] - close_prev))
+        atr = _rolling(true_range, periodo_volatilidad, 'mean')
+        atr_percent = (atr / close) * 100
+        c['Returns'] = retornos
+        c['Volatility'] = volatilidad
+        c['ATR'] = atr
+        c['ATR_Percent'] = atr_percent
+        # La media se toma por símbolo sobre toda su serie (como Series.mean)
+        volatilidad_media = np.nanmean(volatilidad, axis=0)
+        atr_percent_medio = np.nanmean(atr_percent, axis=0)
+        close_5 = _shift(close, 5)
+        s['estrategia_volatilidad'] = _select(
+            [(volatilidad > volatilidad_media * 1.5) & (close > close_5),
+             (volatilidad > volatilidad_media * 1.5) & (close < close_5),
+             volatilidad < volatilidad_media * 0.7,
+             atr_percent > atr_percent_medio],
+            [COMPRA, VENTA, HOLD, COMPRA])
+        c['estrategia_volatilidad_valor'] = volatilidad
+
+        # Ichimoku
+        senkou_a, senkou_b = c['Ichimoku_Senkou_A'], c['Ichimoku_Senkou_B']
+        conversion, base = c['Ichimoku_Conversion'], c['Ichimoku_Base']
+        arriba = (close > senkou_a) & (close > senkou_b)
+        abajo = (close < senkou_a) & (close < senkou_b)
+        s['estrategia_ichimoku'] = _select(
+            [arriba & (conversion > base), abajo & (conversion < base), arriba, abajo],
+            [COMPRA_FUERTE, VENTA_FUERTE, COMPRA, VENTA])
+        c['estrategia_ichimoku_valor'] = conversion - base
+
+        # Williams %R
+        williams = c['Williams_R']
+        williams_prev = _shift(williams, 1)
+        s['estrategia_williams'] = _select(
+            [williams < -80, williams > -20, (williams < -50) & (williams > williams_prev), (williams > -50) & (williams < williams_prev)],
+            [COMPRA_FUERTE, VENTA_FUERTE, COMPRA, VENTA])
+        c['estrategia_williams_valor'] = williams
+
+        # ADX
+        adx, di_plus, di_minus = c['ADX'], c['DI_Plus'], c['DI_Minus']
+        s['estrategia_adx'] = _select(
+            [(adx > 25) & (di_plus > di_minus), (adx > 25) & (di_plus < di_minus),
+             (adx > 20) & (di_plus > di_minus), (adx > 20) & (di_plus < di_minus)],
+            [COMPRA_FUERTE, VENTA_FUERTE, COMPRA, VENTA])
+        c['estrategia_adx_valor'] = adx
+
+        # Parabolic SAR
+        sar = c['Parabolic_SAR']
+        s['estrategia_parabolic_sar'] = _select([close > sar, close < sar], [COMPRA, VENTA])
+        c['estrategia_parabolic_sar_valor'] = close - sar
+
+    # Estrategia mayoritaria y fuerza (mismas reglas que calcular_estrategia_mayoritaria)
+    estrategias = [s[f'estrategia_{indicador}'] for indicador in combinacion_indicadores if f'estrategia_{indicador}' in s]
+    total = len(estrategias)
+    if total:
+        codigos = np.stack(estrategias)
+        compras_fuertes = 2 * (codigos == COMPRA_FUERTE).sum(axis=0)
+        ventas_fuertes = 2 * (codigos == VENTA_FUERTE).sum(axis=0)
+        total_compras = compras_fuertes + (codigos == COMPRA).sum(axis=0)
+        total_ventas = ventas_fuertes + (codigos == VENTA).sum(axis=0)
+        gana_compra = (total_compras > total_ventas) & (total_compras >= total * 0.4)
+        gana_venta = (total_ventas > total_compras) & (total_ventas >= total * 0.4)
+        s['estrategia_mayoritaria'] = _select(
+            [gana_compra & (compras_fuertes >= total * 0.3), gana_compra,
+             gana_venta & (ventas_fuertes >= total * 0.3), gana_venta],
+            [COMPRA_FUERTE, COMPRA, VENTA_FUERTE, VENTA])
+        c['fuerza_señal'] = codigos.sum(axis=0, dtype=np.float64) / (total * 2)
+    else:
+        s['estrategia_mayoritaria'] = np.zeros_like(close, dtype=np.int8)
+        c['fuerza_señal'] = np.zeros_like(close)
+
+    if verbose:
+        print(f"  🧮 Reglas de trading aplicadas a {len(panel['symbols'])} símbolos ({total} estrategias en el consenso)")
+
+    return panel
+
+
+
+# =============================================================================
+# VISTAS POR SÍMBOLO
+# =============================================================================
+
+# Orden de columnas igual al de la ruta por símbolo (sin descripciones)
+ORDEN_COLUMNAS = [
+    'datetime', 'Open', 'High', 'Low', 'Close', 'Volume',
+    'RSI', 'MACD', 'MACD_signal', 'MACD_hist', 'MA', 'Bollinger_MA', 'Bollinger_Upper', 'Bollinger_Lower',
+    '%K', '%D', 'Ichimoku_Conversion', 'Ichimoku_Base', 'Ichimoku_Senkou_A', 'Ichimoku_Senkou_B', 'Ichimoku_Chikou',
+    'Williams_R', 'ADX', 'DI_Plus', 'DI_Minus', 'Parabolic_SAR',
+    'estrategia_rsi', 'estrategia_rsi_valor',
+    'MACD_histogram', 'estrategia_macd', 'estrategia_macd_valor',
+    'estrategia_ma', 'estrategia_ma_valor',
+    'Bollinger_Position', 'estrategia_bollinger', 'estrategia_bollinger_valor',
+    'estrategia_estocastico', 'estrategia_estocastico_valor',
+    'Returns', 'Volatility', 'ATR', 'ATR_Percent', 'estrategia_volatilidad', 'estrategia_volatilidad_valor',
+    'estrategia_ichimoku', 'estrategia_ichimoku_valor',
+    'estrategia_williams', 'estrategia_williams_valor',
+    'estrategia_adx', 'estrategia_adx_valor',
+    'estrategia_parabolic_sar', 'estrategia_parabolic_sar_valor',
+    'estrategia_mayoritaria', 'fuerza_señal'
+]
+
+
+
+def extraer_dataframes_panel(panel):
+    """
+    Genera el diccionario {symbol: DataFrame} esperado por el resto del pipeline.
+    Las columnas numéricas son vistas (sin copia) de las matrices del panel y las
+    señales se exponen como categóricas a partir de sus códigos.
+    """
+    campos = panel['campos']
+    señales = panel['señales']
+    columnas = [col for col in ORDEN_COLUMNAS if col == 'datetime' or col in campos or col in señales]
+    dataframes = {}
+
+    for j, symbol in enumerate(panel['symbols']):
+        inicio = panel['inicios'][j]
+        fechas = panel['datetime'][inicio:, j]
+        datos = {}
+        for columna in columnas:
+            if columna == 'datetime':
+                datos[columna] = fechas
+            elif columna in señales:
+                datos[columna] = pd.Categorical.from_codes(señales[columna][inicio:, j] + 2, categories=ETIQUETAS_SEÑAL)
+            else:
+                datos[columna] = campos[columna][inicio:, j]
+        dataframes[symbol] = pd.DataFrame(datos, index=pd.DatetimeIndex(fechas), copy=False)
+
+    return dataframes
+
+
+
+def procesar_panel(dataframes, verbose=False, **kwargs):
+    """
+    Modo panel: indicadores y reglas de trading calculados una sola vez para todo el universo.
+    Equivale a procesar_dataframes + analizar_dataframes pero sin bucles por símbolo.
+    :param dataframes: Diccionario {symbol: DataFrame} validado
+    :param verbose: Si es True, muestra detalles del proceso
+    :param kwargs: Parámetros de indicadores y de análisis de la estrategia
+    :return: Diccionario {symbol: DataFrame} con indicadores y señales
+    """
+    from TradingLogicMarket import mostrar_ultimos_registros
+
+    panel = construir_panel(dataframes, verbose)
+    if not panel['symbols']:
+        return {}
+
+    calcular_indicadores_panel(panel, verbose, **kwargs)
+    analizar_panel(panel, verbose, **kwargs)
+    resultados = extraer_dataframes_panel(panel)
+
+    combinacion_indicadores = kwargs.get('combinacion_indicadores', ['rsi', 'macd', 'media_movil', 'bollinger', 'estocastico', 'volatilidad'])
+    combinacion_nombres = kwargs.get('combinacion_nombres', ['Default_Strategy'])
+    for symbol, df in resultados.items():
+        mostrar_ultimos_registros(symbol, df, combinacion_indicadores, combinacion_nombres)
+
+    return resultados
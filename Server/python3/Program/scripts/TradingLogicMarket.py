@@ -1,7 +1,9 @@
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import pytz
+from helpers.log_asincrono import traza_activa
 
 
 
@@ -31,9 +33,13 @@ def analizar_dataframes(dataframes, verbose=False, **kwargs):
     combinacion_indicadores = kwargs.get('combinacion_indicadores', ['rsi', 'macd', 'media_movil', 'bollinger', 'estocastico', 'volatilidad'])
     combinacion_nombres = kwargs.get('combinacion_nombres', ['Default_Strategy'])
 
+    from helpers.metricas import DURACION_ANALISIS, SEÑALES_GENERADAS
     
     for symbol, df in dataframes.items():
-        if verbose:
+        inicio = time.perf_counter()
+        # Trazas detalladas solo para los símbolos muestreados (helpers.log_asincrono)
+        detalle = traza_activa('TradingLogicMarket', symbol, verbose)
+        if detalle:
             print(f"\n{'='*80}")
             print(f"🎯 ANÁLISIS TÉCNICO COMPLETO PARA: {symbol}")
             print(f"{'='*80}")
@@ -73,21 +79,24 @@ def analizar_dataframes(dataframes, verbose=False, **kwargs):
             df_analizado = analizar_estrategia_parabolic_sar(df_analizado, verbose)
         '''
         # calcular analisis de todos los indices
-        df_analizado = analizar_estrategia_rsi(df_analizado, rsi_under, rsi_upper, rsi_periodo, verbose)
-        df_analizado = analizar_estrategia_macd(df_analizado, macd_periodo_corto, macd_periodo_largo, macd_periodo_senal, verbose)
-        df_analizado = analizar_estrategia_media_movil(df_analizado, media_movil_periodo, verbose)
-        df_analizado = analizar_estrategia_bollinger(df_analizado, bollinger_periodo, bollinger_desviacion, verbose)
-        df_analizado = analizar_estrategia_estocastico(df_analizado, estocastico_periodo, verbose)
-        df_analizado = analizar_estrategia_volatilidad(df_analizado, periodo_volatilidad, verbose)
-        df_analizado = analizar_estrategia_ichimoku(df_analizado, verbose)
-        df_analizado = analizar_estrategia_williams(df_analizado, estocastico_periodo, verbose)
-        df_analizado = analizar_estrategia_adx(df_analizado, 14, verbose)
-        df_analizado = analizar_estrategia_parabolic_sar(df_analizado, verbose)
+        df_analizado = analizar_estrategia_rsi(df_analizado, rsi_under, rsi_upper, rsi_periodo, detalle)
+        df_analizado = analizar_estrategia_macd(df_analizado, macd_periodo_corto, macd_periodo_largo, macd_periodo_senal, detalle)
+        df_analizado = analizar_estrategia_media_movil(df_analizado, media_movil_periodo, detalle)
+        df_analizado = analizar_estrategia_bollinger(df_analizado, bollinger_periodo, bollinger_desviacion, detalle)
+        df_analizado = analizar_estrategia_estocastico(df_analizado, estocastico_periodo, detalle)
+        df_analizado = analizar_estrategia_volatilidad(df_analizado, periodo_volatilidad, detalle)
+        df_analizado = analizar_estrategia_ichimoku(df_analizado, detalle)
+        df_analizado = analizar_estrategia_williams(df_analizado, estocastico_periodo, detalle)
+        df_analizado = analizar_estrategia_adx(df_analizado, 14, detalle)
+        df_analizado = analizar_estrategia_parabolic_sar(df_analizado, detalle)
 
         # Calcular Estrategia mayoritaria
         df_analizado = calcular_estrategia_mayoritaria(df_analizado, combinacion_indicadores)
         
         resultados[symbol] = df_analizado
+        DURACION_ANALISIS.observar(time.perf_counter() - inicio)
+        if len(df_analizado) > 0:
+            SEÑALES_GENERADAS.incrementar(senal=df_analizado['estrategia_mayoritaria'].iloc[-1])
         
         # Mostrar tabla de últimos registros (SIEMPRE se muestra)
         mostrar_ultimos_registros(symbol, df_analizado, combinacion_indicadores, combinacion_nombres)
@@ -0,0 +1,541 @@
+"""
+benchmark_indicadores.py
+Micro-benchmarks y pruebas de paridad numérica de los indicadores de ProcesingDataPandas.
+
+Uso (desde Server/python3/Program):
+    python scripts/benchmarks/benchmark_indicadores.py [--barras=1000,10000,100000,1000000] [--barras-paridad=5000]
+                                                       [--solo-paridad] [--guardar-baseline] [--umbral=0.25]
+
+1. Paridad: cada calcular_* se compara con una implementación de referencia en NumPy escrita a partir de la
+   definición del indicador y, si backtrader está instalado, con sus indicadores equivalentes. Después cada
+   motor de MOTORES (procesar_dataframes, modo panel y cualquier motor optimizado que se registre) debe
+   reproducir exactamente las columnas de calcular_*. Cualquier diferencia termina con código 1.
+2. Rendimiento: tiempo y barras/s de cada indicador y de cada motor para cada longitud de serie,
+   con comparación frente a la baseline guardada (mismo umbral que benchmark_pipeline).
+"""
+
+import os
+import sys
+import time
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+DIRECTORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_SCRIPTS = os.path.dirname(DIRECTORIO_BENCHMARKS)
+if DIRECTORIO_SCRIPTS not in sys.path:
+    sys.path.insert(0, DIRECTORIO_SCRIPTS)
+
+from datos_sinteticos import generar_dataframe_ohlcv
+from benchmark_pipeline import cargar_baseline, guardar_baseline, UMBRAL_REGRESION
+from GetDataPandas import resolver_parametros_indicadores
+import ProcesingDataPandas as P
+
+
+RUTA_BASELINE = os.path.join(DIRECTORIO_BENCHMARKS, "baselines", "indicadores.json")
+
+LONGITUDES = [1_000, 10_000, 100_000, 1_000_000]
+BARRAS_PARIDAD = 5_000
+
+# Regímenes con los que se comprueba la paridad (las señales dependen del comportamiento en cada uno)
+REGIMENES_PARIDAD = ['tranquilo', 'volatil', 'tendencia', 'crisis']
+
+# Intervalo de 1 minuto: 1M de barras caben en el rango de fechas de pandas
+INTERVALO = "1min"
+
+# Tiempo mínimo medido por indicador y longitud (se repite hasta alcanzarlo, como timeit)
+TIEMPO_MINIMO_S = 0.2
+REPETICIONES_MAXIMAS = 5
+
+# Tolerancias: los motores deben coincidir con calcular_* casi bit a bit; las referencias
+# independientes pueden diferir en el orden de las operaciones de coma flotante
+TOLERANCIA_MOTOR = {'rtol': 1e-9, 'atol': 1e-9}
+TOLERANCIA_REFERENCIA = {'rtol': 1e-7, 'atol': 1e-7}
+
+# Parámetros efectivos por defecto (los mismos que resuelve procesar_dataframes)
+PARAMETROS = resolver_parametros_indicadores()
+
+# Indicador -> (función, argumentos, columnas que genera)
+INDICADORES = {
+    'rsi': (P.calcular_rsi, {'periodo': PARAMETROS['rsi_periodo']}, ['RSI']),
+    'macd': (P.calcular_macd, {'periodo_corto': PARAMETROS['macd_periodo_corto'], 'periodo_largo': PARAMETROS['macd_periodo_largo'],
+                               'periodo_senal': PARAMETROS['macd_periodo_senal']}, ['MACD', 'MACD_signal', 'MACD_hist']),
+    'media_movil': (P.calcular_media_movil, {'periodo': PARAMETROS['media_movil_periodo']}, ['MA']),
+    'bollinger': (P.calcular_bandas_bollinger, {'periodo': PARAMETROS['bollinger_periodo'], 'desviacion': PARAMETROS['bollinger_desviacion']},
+                  ['Bollinger_MA', 'Bollinger_Upper', 'Bollinger_Lower']),
+    'estocastico': (P.calcular_estocastico, {'periodo': PARAMETROS['estocastico_periodo']}, ['%K', '%D']),
+    'ichimoku': (P.calcular_ichimoku, {'conversion_period': PARAMETROS['ichimoku_conversion'], 'base_period': PARAMETROS['ichimoku_base'],
+                                       'leading_span_b_period': PARAMETROS['ichimoku_span_b'], 'displacement': PARAMETROS['ichimoku_displacement']},
+                 ['Ichimoku_Conversion', 'Ichimoku_Base', 'Ichimoku_Senkou_A', 'Ichimoku_Senkou_B', 'Ichimoku_Chikou']),
+    'williams': (P.calcular_williams_r, {'periodo': PARAMETROS['williams_periodo']}, ['Williams_R']),
+    'adx': (P.calcular_adx, {'periodo': PARAMETROS['adx_periodo']}, ['ADX', 'DI_Plus', 'DI_Minus']),
+    'parabolic_sar': (P.calcular_parabolic_sar, {'acceleration': PARAMETROS['parabolic_acceleration'], 'maximum': PARAMETROS['parabolic_maximum']},
+                      ['Parabolic_SAR']),
+}
+
+COLUMNAS_INDICADORES = [columna for _, _, columnas in INDICADORES.values() for columna in columnas]
+
+
+
+# =============================================================================
+# DATOS DE PRUEBA
+# =============================================================================
+
+def generar_serie(barras, regimen="normal", semilla=0, con_tramo_plano=False):
+    """
+    Serie OHLCV sintética para los benchmarks.
+    :param con_tramo_plano: Inserta 40 barras sin movimiento (máximo = mínimo = cierre) para
+                            ejercitar las divisiones 0/0 de RSI, estocástico, Williams %R y ADX
+    """
+    # convertir_a_segundos informa por consola de cada conversión
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        df = generar_dataframe_ohlcv(f"IND_{regimen}", INTERVALO, barras, regimen, semilla)
+    if con_tramo_plano and barras > 200:
+        tramo = slice(barras // 2, barras // 2 + 40)
+        precio = df['Close'].iloc[barras // 2 - 1]
+        for columna in ['Open', 'High', 'Low', 'Close']:
+            df.iloc[tramo, df.columns.get_loc(columna)] = precio
+    return df
+
+
+
+# =============================================================================
+# REFERENCIAS EN NUMPY (A PARTIR DE LA DEFINICIÓN DE CADA INDICADOR)
+# =============================================================================
+
+def _ventanas(x, ventana, funcion, bloque=65536):
+    """
+    Aplica funcion(axis=1) sobre ventanas deslizantes completas (NaN en las primeras ventana-1 posiciones).
+    Se procesa por bloques para no materializar una matriz de N x ventana en series largas.
+    """
+    resultado = np.full(len(x), np.nan)
+    for inicio in range(ventana - 1, len(x), bloque):
+        fin = min(inicio + bloque, len(x))
+        vistas = np.lib.stride_tricks.sliding_window_view(x[inicio - ventana + 1:fin], ventana)
+        resultado[inicio:fin] = funcion(vistas, axis=1)
+    return resultado
+
+
+def _desplazar(x, periodos):
+    """x desplazado 'periodos' posiciones (positivo = hacia el futuro), rellenando con NaN."""
+    resultado = np.full(len(x), np.nan)
+    if periodos >= 0:
+        resultado[periodos:] = x[:len(x) - periodos]
+    else:
+        resultado[:periodos] = x[-periodos:]
+    return resultado
+
+
+def _media_exponencial(x, alpha):
+    """EMA recursiva y[t] = alpha * x[t] + (1 - alpha) * y[t-1], iniciada en el primer valor válido."""
+    resultado = np.full(len(x), np.nan)
+    validos = np.flatnonzero(~np.isnan(x))
+    if len(validos) == 0:
+        return resultado
+    anterior = x[validos[0]]
+    resultado[validos[0]] = anterior
+    for i in range(validos[0] + 1, len(x)):
+        if not np.isnan(x[i]):
+            anterior = alpha * x[i] + (1 - alpha) * anterior
+        resultado[i] = anterior
+    return resultado
+
+
+def _parabolic_sar(high, low, acceleration, maximum):
+    """Parabolic SAR de Wilder: el SAR avanza hacia el punto extremo y se invierte al ser perforado."""
+    sar = np.zeros(len(high))
+    if len(high) == 0:
+        return sar
+    alcista, extremo, factor = True, high[0], acceleration
+    sar[0] = low[0]
+    for i in range(1, len(high)):
+        previo = sar[i - 1] + factor * (extremo - sar[i - 1])
+        # El SAR no puede invadir el rango de las dos barras anteriores
+        if alcista:
+            previo = min(previo, low[i - 1], low[i - 2] if i >= 2 else low[i - 1])
+        else:
+            previo = max(previo, high[i - 1], high[i - 2] if i >= 2 else high[i - 1])
+
+        if alcista and low[i] < previo:
+            alcista, previo, extremo, factor = False, max(high[i], high[i - 1]), low[i], acceleration
+        elif not alcista and high[i] > previo:
+            alcista, previo, extremo, factor = True, min(low[i], low[i - 1]), high[i], acceleration
+        elif alcista and high[i] > extremo:
+            extremo, factor = high[i], min(factor + acceleration, maximum)
+        elif not alcista and low[i] < extremo:
+            extremo, factor = low[i], min(factor + acceleration, maximum)
+        sar[i] = previo
+    return sar
+
+
+def referencias_numpy(df, p=PARAMETROS):
+    """
+    Calcula todos los indicadores con NumPy a partir de su definición, sin pandas.
+    :return: Diccionario {columna: array}
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    r = {}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # RSI (medias simples de ganancias y pérdidas; la primera diferencia cuenta como 0)
+        delta = np.concatenate(([0.0], np.diff(close)))
+        rs = _ventanas(np.maximum(delta, 0), p['rsi_periodo'], np.mean) / _ventanas(np.maximum(-delta, 0), p['rsi_periodo'], np.mean)
+        r['RSI'] = 100 - 100 / (1 + rs)
+
+        # MACD
+        macd = _media_exponencial(close, 2 / (p['macd_periodo_corto'] + 1)) - _media_exponencial(close, 2 / (p['macd_periodo_largo'] + 1))
+        r['MACD'] = macd
+        r['MACD_signal'] = _media_exponencial(macd, 2 / (p['macd_periodo_senal'] + 1))
+        r['MACD_hist'] = macd - r['MACD_signal']
+
+        # Media móvil y Bollinger (desviación típica muestral, ddof=1)
+        r['MA'] = _ventanas(close, p['media_movil_periodo'], np.mean)
+        media = _ventanas(close, p['bollinger_periodo'], np.mean)
+        desviacion = _ventanas(close, p['bollinger_periodo'], lambda v, axis: np.std(v, axis=axis, ddof=1))
+        r['Bollinger_MA'] = media
+        r['Bollinger_Upper'] = media + p['bollinger_desviacion'] * desviacion
+        r['Bollinger_Lower'] = media - p['bollinger_desviacion'] * desviacion
+
+        # Estocástico rápido (%D = media de 3 de %K)
+        minimo = _ventanas(low, p['estocastico_periodo'], np.min)
+        maximo = _ventanas(high, p['estocastico_periodo'], np.max)
+        r['%K'] = 100 * (close - minimo) / (maximo - minimo)
+        r['%D'] = _ventanas(r['%K'], 3, np.mean)
+
+        # Ichimoku
+        punto_medio = lambda n: (_ventanas(high, n, np.max) + _ventanas(low, n, np.min)) / 2
+        r['Ichimoku_Conversion'] = punto_medio(p['ichimoku_conversion'])
+        r['Ichimoku_Base'] = punto_medio(p['ichimoku_base'])
+        r['Ichimoku_Senkou_A'] = _desplazar((r['Ichimoku_Conversion'] + r['Ichimoku_Base']) / 2, p['ichimoku_displacement'])
+        r['Ichimoku_Senkou_B'] = _desplazar(punto_medio(p['ichimoku_span_b']), p['ichimoku_displacement'])
+        r['Ichimoku_Chikou'] = _desplazar(close, -p['ichimoku_displacement'])
+
+        # Williams %R
+        maximo = _ventanas(high, p['williams_periodo'], np.max)
+        minimo = _ventanas(low, p['williams_periodo'], np.min)
+        r['Williams_R'] = -100 * (maximo - close) / (maximo - minimo)
+
+        # ADX con suavizado de Wilder (alpha = 1/periodo)
+        close_previo = _desplazar(close, 1)
+        rango_verdadero = np.fmax(high - low, np.fmax(np.abs(high - close_previo), np.abs(low - close_previo)))
+        subida = np.nan_to_num(high - _desplazar(high, 1))
+        bajada = np.nan_to_num(_desplazar(low, 1) - low)
+        dm_mas = np.where((subida > bajada) & (subida > 0), subida, 0.0)
+        dm_menos = np.where((bajada > subida) & (bajada > 0), bajada, 0.0)
+        alpha = 1 / p['adx_periodo']
+        rango_suavizado = _media_exponencial(rango_verdadero, alpha)
+        r['DI_Plus'] = 100 * _media_exponencial(dm_mas, alpha) / rango_suavizado
+        r['DI_Minus'] = 100 * _media_exponencial(dm_menos, alpha) / rango_suavizado
+        dx = 100 * np.abs(r['DI_Plus'] - r['DI_Minus']) / (r['DI_Plus'] + r['DI_Minus'])
+        r['ADX'] = _media_exponencial(dx, alpha)
+
+        r['Parabolic_SAR'] = _parabolic_sar(high, low, p['parabolic_acceleration'], p['parabolic_maximum'])
+
+    return r
+
+
+
+# =============================================================================
+# REFERENCIAS CON BACKTRADER (OPCIONAL)
+# =============================================================================
+
+# Columna -> (fábrica del indicador de backtrader, línea, barras de calentamiento antes de comparar).
+# Las medias exponenciales de backtrader se inician con una media simple y no con el primer valor,
+# por eso MACD y ADX solo se comparan cuando la diferencia inicial se ha extinguido.
+def _fabricas_backtrader(bt, p=PARAMETROS):
+    calentamiento_ema = 20 * max(p['macd_periodo_largo'], p['adx_periodo'])
+    return {
+        'RSI': (lambda d: bt.indicators.RSI_SMA(d, period=p['rsi_periodo']), 'rsi', 0),
+        'MACD': (lambda d: bt.indicators.MACDHisto(d, period_me1=p['macd_periodo_corto'], period_me2=p['macd_periodo_largo'],
+                                                   period_signal=p['macd_periodo_senal']), 'macd', calentamiento_ema),
+        'MACD_signal': ('MACD', 'signal', calentamiento_ema),
+        'MACD_hist': ('MACD', 'histo', calentamiento_ema),
+        'MA': (lambda d: bt.indicators.SMA(d, period=p['media_movil_periodo']), 'sma', 0),
+        'Bollinger_MA': (lambda d: bt.indicators.BollingerBands(d, period=p['bollinger_periodo'], devfactor=p['bollinger_desviacion']), 'mid', 0),
+        '%K': (lambda d: bt.indicators.StochasticFast(d, period=p['estocastico_periodo'], period_dfast=3), 'percK', 0),
+        '%D': ('%K', 'percD', 0),
+        'Ichimoku_Conversion': (lambda d: bt.indicators.Ichimoku(d, tenkan=p['ichimoku_conversion'], kijun=p['ichimoku_base'],
+                                                                 senkou=p['ichimoku_span_b'], senkou_lead=p['ichimoku_displacement'],
+                                                                 chikou=p['ichimoku_displacement']), 'tenkan_sen', 0),
+        'Ichimoku_Base': ('Ichimoku_Conversion', 'kijun_sen', 0),
+        'Williams_R': (lambda d: bt.indicators.WilliamsR(d, period=p['williams_periodo']), 'percR', 0),
+        'ADX': (lambda d: bt.indicators.DirectionalMovementIndex(d, period=p['adx_periodo']), 'adx', calentamiento_ema),
+        'DI_Plus': ('ADX', 'plusDI', calentamiento_ema),
+        'DI_Minus': ('ADX', 'minusDI', calentamiento_ema),
+    }
+
+
+def referencias_backtrader(df, p=PARAMETROS):
+    """
+    Calcula con backtrader los indicadores equivalentes a los de ProcesingDataPandas.
+    Las bandas de Bollinger de backtrader usan la desviación típica poblacional, así que solo se compara
+    su media; el Parabolic SAR de backtrader arranca la tendencia de otra forma y tampoco se compara.
+    :return: Diccionario {columna: (array, barras de calentamiento)} o None si backtrader no está instalado
+    """
+    try:
+        import backtrader as bt
+    except ImportError:
+        return None
+
+    from ConverterDataToPandasData import convertir_a_backtrader
+
+    fabricas = _fabricas_backtrader(bt, p)
+
+    class EstrategiaReferencia(bt.Strategy):
+        def __init__(self):
+            self.referencias = {columna: fabrica(self.data) for columna, (fabrica, _, _) in fabricas.items() if callable(fabrica)}
+
+    cerebro = bt.Cerebro(stdstats=False, runonce=True, preload=True)
+    cerebro.adddata(bt.feeds.PandasData(dataname=convertir_a_backtrader(df)))
+    cerebro.addstrategy(EstrategiaReferencia)
+    estrategia = cerebro.run()[0]
+
+    resultado = {}
+    for columna, (fabrica, linea, calentamiento) in fabricas.items():
+        indicador = estrategia.referencias[columna if callable(fabrica) else fabrica]
+        valores = np.asarray(getattr(indicador.lines, linea).array, dtype=np.float64)[:len(df)]
+        resultado[columna] = (valores, calentamiento)
+    return resultado
+
+
+
+# =============================================================================
+# MOTORES DE CÁLCULO
+# =============================================================================
+
+def motor_funciones(df):
+    """Referencia de los motores: cada calcular_* aplicado en el orden de procesar_dataframes."""
+    df = df.copy()
+    for funcion, argumentos, _ in INDICADORES.values():
+        df = funcion(df, **argumentos)
+    return df
+
+
+def motor_procesar_dataframes(df):
+    """Pipeline por símbolo (GetDataPandas.procesar_dataframes)."""
+    from GetDataPandas import procesar_dataframes
+    return procesar_dataframes({'IND': df.copy()})['IND']
+
+
+def motor_panel(df):
+    """Modo panel (PanelMercados): indicadores de todos los símbolos en matrices tiempo x símbolo."""
+    from PanelMercados import construir_panel, calcular_indicadores_panel
+    panel = calcular_indicadores_panel(construir_panel({'IND': df}))
+    return pd.DataFrame({columna: panel['campos'][columna][:, 0] for columna in COLUMNAS_INDICADORES}, index=df.index)
+
+
+def motor_panel_desalineado(df):
+    """
+    Modo panel con símbolos de distinta longitud: la serie de prueba es la más corta del panel,
+    así se comprueba que el relleno previo al inicio de cada símbolo no contamina sus indicadores.
+    """
+    from PanelMercados import construir_panel, calcular_indicadores_panel
+    mas_larga = pd.concat([df.iloc[:len(df) // 3], df])
+    panel = calcular_indicadores_panel(construir_panel({'LARGA': mas_larga, 'IND': df}))
+    inicio = panel['inicios'][1]
+    return pd.DataFrame({columna: panel['campos'][columna][inicio:, 1] for columna in COLUMNAS_INDICADORES}, index=df.index)
+
+
+# Motores que deben reproducir exactamente calcular_*: un motor o kernel optimizado nuevo se registra aquí
+MOTORES = {
+    'procesar_dataframes': motor_procesar_dataframes,
+    'panel': motor_panel,
+    'panel_desalineado': motor_panel_desalineado,
+}
+
+
+
+# =============================================================================
+# PARIDAD
+# =============================================================================
+
+def comparar_series(esperado, obtenido, rtol, atol, desde=0):
+    """
+    Compara dos series numéricas: mismas posiciones NaN y valores dentro de la tolerancia.
+    La tolerancia absoluta se escala con la magnitud de la serie (precios de 1 a 10.000).
+    :return: Tupla (correcto, texto con la primera discrepancia o error máximo)
+    """
+    esperado = np.asarray(esperado, dtype=np.float64)[desde:]
+    obtenido = np.asarray(obtenido, dtype=np.float64)[desde:]
+    if esperado.shape != obtenido.shape:
+        return False, f"longitud {len(obtenido)} != {len(esperado)}"
+
+    escala = np.nanmax(np.abs(esperado)) if np.isfinite(esperado).any() else 1.0
+    iguales = np.isclose(obtenido, esperado, rtol=rtol, atol=atol * max(escala, 1.0), equal_nan=True)
+    if not iguales.all():
+        posicion = int(np.flatnonzero(~iguales)[0])
+        return False, (f"{int((~iguales).sum())} discrepancias, primera en la barra {posicion + desde}: "
+                       f"{obtenido[posicion]!r} frente a {esperado[posicion]!r}")
+
+    finitos = np.isfinite(esperado) & np.isfinite(obtenido)
+    error = float(np.max(np.abs(obtenido[finitos] - esperado[finitos]) / np.maximum(np.abs(esperado[finitos]), 1e-12))) if finitos.any() else 0.0
+    return True, f"error relativo máx {error:.1e}"
+
+
+def comprobar_paridad(barras=BARRAS_PARIDAD, verbose=True):
+    """
+    Ejecuta todas las comprobaciones de paridad en varios regímenes de volatilidad.
+    :return: Lista de fallos (textos); vacía si todo coincide
+    """
+    fallos = []
+    backtrader_disponible = True
+
+    for regimen in REGIMENES_PARIDAD:
+        df = generar_serie(barras, regimen, con_tramo_plano=True)
+        esperado = motor_funciones(df)
+        comprobaciones = []
+
+        # calcular_* frente a las referencias en NumPy
+        for columna, valores in referencias_numpy(df).items():
+            comprobaciones.append((f"numpy/{columna}", valores, esperado[columna], TOLERANCIA_REFERENCIA, 0))
+
+        # calcular_* frente a backtrader
+        referencias = referencias_backtrader(df) if backtrader_disponible else None
+        if referencias is None:
+            backtrader_disponible = False
+        else:
+            for columna, (valores, calentamiento) in referencias.items():
+                comprobaciones.append((f"backtrader/{columna}", valores, esperado[columna], TOLERANCIA_REFERENCIA, calentamiento))
+
+        # Motores frente a calcular_*
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            salidas = {nombre: motor(df) for nombre, motor in MOTORES.items()}
+        for nombre, salida in salidas.items():
+            for columna in COLUMNAS_INDICADORES:
+                if columna not in salida:
+                    fallos.append(f"{regimen}: el motor {nombre} no genera la columna {columna}")
+                    continue
+                comprobaciones.append((f"{nombre}/{columna}", esperado[columna], salida[columna], TOLERANCIA_MOTOR, 0))
+
+        for nombre, referencia, obtenido, tolerancia, desde in comprobaciones:
+            correcto, detalle = comparar_series(referencia, obtenido, desde=desde, **tolerancia)
+            if not correcto:
+                fallos.append(f"{regimen}: {nombre}: {detalle}")
+
+        if verbose:
+            errores_regimen = sum(1 for fallo in fallos if fallo.startswith(f"{regimen}:"))
+            icono = "✅" if not errores_regimen else "❌"
+            print(f"   {icono} Régimen {regimen:<10} {len(comprobaciones)} comprobaciones, {errores_regimen} fallos")
+
+    if verbose and not backtrader_disponible:
+        print("   ⚠️  backtrader no está instalado: se omite la paridad con backtrader")
+    return fallos
+
+
+
+# =============================================================================
+# RENDIMIENTO
+# =============================================================================
+
+def medir(funcion, preparar):
+    """
+    Mejor tiempo de varias ejecuciones (hasta acumular TIEMPO_MINIMO_S o REPETICIONES_MAXIMAS).
+    :param preparar: Función que devuelve el argumento de cada ejecución (fuera de la medida)
+    """
+    tiempos = []
+    while len(tiempos) < REPETICIONES_MAXIMAS and (not tiempos or sum(tiempos) < TIEMPO_MINIMO_S):
+        argumento = preparar()
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def medir_rendimiento(longitudes=LONGITUDES):
+    """
+    Tiempo de cada indicador y de cada motor completo para cada longitud de serie.
+    :return: Diccionario {longitud: {nombre: {'segundos', 'barras_s'}}}
+    """
+    resultados = {}
+    motores = {'funciones': motor_funciones, 'procesar_dataframes': motor_procesar_dataframes, 'panel': motor_panel}
+    for barras in longitudes:
+        df = generar_serie(barras)
+        medidas = {}
+        for indicador, (funcion, argumentos, _) in INDICADORES.items():
+            medidas[indicador] = medir(lambda d: funcion(d, **argumentos), df.copy)
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            for nombre, motor in motores.items():
+                medidas[f"motor:{nombre}"] = medir(motor, lambda: df)
+        resultados[str(barras)] = {
+            nombre: {'segundos': round(segundos, 6), 'barras_s': round(barras / segundos, 1)}
+            for nombre, segundos in medidas.items()
+        }
+    return resultados
+
+
+def mostrar_rendimiento(resultados, baseline=None, umbral=UMBRAL_REGRESION):
+    """
+    Tabla de barras/s (nombre x longitud) con la variación frente a la baseline.
+    :return: Lista de regresiones detectadas
+    """
+    longitudes = list(resultados)
+    print(f"\n   {'Barras/s':<28}" + "".join(f"{int(n):>20,}" for n in longitudes))
+    regresiones = []
+    for nombre in resultados[longitudes[0]]:
+        celdas = []
+        for longitud in longitudes:
+            medida = resultados[longitud][nombre]
+            referencia = ((baseline or {}).get(longitud) or {}).get(nombre)
+            variacion = ""
+            if referencia:
+                cambio = medida['barras_s'] / referencia['barras_s'] - 1
+                variacion = f" ({cambio:+.0%})"
+                if cambio < -umbral:
+                    regresiones.append(f"{nombre} con {int(longitud):,} barras: {medida['barras_s']:,.0f} barras/s "
+                                       f"frente a {referencia['barras_s']:,.0f} ({cambio:+.0%})")
+            celdas.append(f"{medida['barras_s']:,.0f}{variacion}")
+        print(f"   {nombre:<28}" + "".join(f"{celda:>20}" for celda in celdas))
+    return regresiones
+
+
+
+def main(argumentos):
+    opciones = {'longitudes': LONGITUDES, 'barras_paridad': BARRAS_PARIDAD, 'solo_paridad': False,
+                'guardar': False, 'umbral': UMBRAL_REGRESION}
+    for argumento in argumentos:
+        if argumento.startswith('--barras='):
+            opciones['longitudes'] = [int(valor) for valor in argumento.split('=', 1)[1].split(',') if valor]
+        elif argumento.startswith('--barras-paridad='):
+            opciones['barras_paridad'] = int(argumento.split('=', 1)[1])
+        elif argumento == '--solo-paridad':
+            opciones['solo_paridad'] = True
+        elif argumento == '--guardar-baseline':
+            opciones['guardar'] = True
+        elif argumento.startswith('--umbral='):
+            opciones['umbral'] = float(argumento.split('=', 1)[1])
+        else:
+            print(f"❌ Argumento no válido: {argumento}")
+            return 2
+
+    print(f"\n🔬 PARIDAD NUMÉRICA ({opciones['barras_paridad']:,} barras por régimen)")
+    fallos = comprobar_paridad(opciones['barras_paridad'])
+    if fallos:
+        print(f"\n❌ {len(fallos)} comprobaciones de paridad fallidas:")
+        for fallo in fallos[:50]:
+            print(f"   - {fallo}")
+        return 1
+    if opciones['solo_paridad']:
+        return 0
+
+    print(f"\n⏱️  RENDIMIENTO POR INDICADOR Y MOTOR")
+    resultados = medir_rendimiento(opciones['longitudes'])
+    baseline = None if opciones['guardar'] else cargar_baseline(RUTA_BASELINE)
+    regresiones = mostrar_rendimiento(resultados, (baseline or {}).get('escenarios'), opciones['umbral'])
+
+    if opciones['guardar']:
+        guardar_baseline(resultados, RUTA_BASELINE)
+        return 0
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones superan el umbral del {opciones['umbral']:.0%}:")
+        for regresion in regresiones:
+            print(f"   - {regresion}")
+        return 1
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,301 @@
+"""
+benchmark_pipeline.py
+Benchmark de extremo a extremo del pipeline sin red: proveedor sintético -> conversión -> validación ->
+indicadores -> análisis -> reportes -> comparación de notificaciones.
+
+Uso (desde Server/python3/Program):
+    python scripts/benchmarks/benchmark_pipeline.py [escenario|all] [--guardar-baseline] [--umbral=0.25] [--repeticiones=3]
+
+Muestra barras/s, símbolos/s y memoria pico por etapa. Con --guardar-baseline guarda los resultados
+como referencia; sin él compara con la referencia guardada y termina con código 1 si el rendimiento
+empeora más que el umbral (0.25 = 25 % menos barras/s o 25 % más memoria pico).
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+DIRECTORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_SCRIPTS = os.path.dirname(DIRECTORIO_BENCHMARKS)
+if DIRECTORIO_SCRIPTS not in sys.path:
+    sys.path.insert(0, DIRECTORIO_SCRIPTS)
+
+from datos_sinteticos import ProveedorSintetico, simbolos_sinteticos
+
+
+RUTA_PROPERTIES_LOCAL = os.path.join(DIRECTORIO_SCRIPTS, "properties", "TradingLogicMarket.properties")
+RUTA_BASELINE = os.path.join(DIRECTORIO_BENCHMARKS, "baselines", "pipeline.json")
+
+# Escenarios: número de símbolos, barras por símbolo, intervalo y régimen de volatilidad
+ESCENARIOS = {
+    'pequeño': {'simbolos': 4, 'barras': 300, 'intervalo': '1h', 'regimen': 'normal'},
+    'mediano': {'simbolos': 10, 'barras': 1000, 'intervalo': '1h', 'regimen': 'volatil'},
+    'grande': {'simbolos': 25, 'barras': 2000, 'intervalo': '4h', 'regimen': 'crisis'},
+}
+
+ETAPAS = ['proveedor', 'conversion', 'validacion', 'indicadores', 'analisis', 'reportes', 'notificaciones']
+
+# Estrategia cuyos parámetros de indicadores y análisis se usan en el benchmark
+ESTRATEGIA_BENCHMARK = 'corto_plazo'
+
+UMBRAL_REGRESION = 0.25
+REPETICIONES = 3
+
+
+
+def cargar_parametros(estrategia=ESTRATEGIA_BENCHMARK):
+    """
+    Lee los parámetros de la estrategia del archivo de propiedades del repositorio (no del contenedor).
+    :return: Tupla (parametros_indicadores, parametros_analisis)
+    """
+    import ObtenerIndicesDelMercado
+
+    ObtenerIndicesDelMercado.RUTA_PROPERTIES = RUTA_PROPERTIES_LOCAL
+    config = ObtenerIndicesDelMercado.cargar_configuracion(estrategia)
+    return ObtenerIndicesDelMercado.construir_parametros(config)
+
+
+
+def ejecutar_etapas(escenario, parametros, directorio_temporal, memoria=False):
+    """
+    Ejecuta una pasada completa del pipeline y mide el tiempo de cada etapa.
+    :param memoria: Si es True, mide además el pico de memoria de cada etapa (tracemalloc debe estar activo)
+    :return: Tupla (diccionario {etapa: segundos}, diccionario {etapa: memoria_pico_kb}, número de símbolos con resultados)
+    """
+    from ConverterDataToPandasData import convertir_a_dataframe
+    from DataQualityValidator import validar_calidad_dataframes
+    from GetDataPandas import procesar_dataframes
+    from TradingLogicMarket import analizar_dataframes
+    from NotificationLogicSender import comparar_y_notificar
+    import CreateReportExcelAndDashboard
+
+    parametros_indicadores, parametros_analisis = parametros
+    symbols = simbolos_sinteticos(escenario['simbolos'])
+    proveedor = ProveedorSintetico(escenario['regimen'])
+    tiempos = {}
+    picos = {}
+
+    @contextlib.contextmanager
+    def medir(etapa):
+        if memoria:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        yield
+        tiempos[etapa] = time.perf_counter() - inicio
+        if memoria:
+            picos[etapa] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+
+    # Las etapas imprimen por consola aun sin verbose: su salida no forma parte de la medida
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        with medir('proveedor'):
+            datos = proveedor.obtener_datos_historicos(escenario['intervalo'], escenario['barras'], symbols)
+        with medir('conversion'):
+            dataframes = convertir_a_dataframe(datos)
+        with medir('validacion'):
+            limpios, _ = validar_calidad_dataframes(dataframes, escenario['intervalo'])
+        with medir('indicadores'):
+            indicadores = procesar_dataframes(limpios, **parametros_indicadores)
+        with medir('analisis'):
+            resultados = analizar_dataframes(indicadores, **parametros_analisis)
+
+        CreateReportExcelAndDashboard.DIRECTORIO_REPORTES = directorio_temporal
+        with medir('reportes'):
+            CreateReportExcelAndDashboard.generar_reporte_excel_dashboard(resultados, ESTRATEGIA_BENCHMARK, "benchmark")
+
+        # Ejecución anterior simulada: los mismos símbolos sin la última barra
+        anteriores = {symbol: df.iloc[:-1] for symbol, df in resultados.items()}
+        lista_moviles = os.path.join(directorio_temporal, "numeros.info")
+        with open(lista_moviles, "w") as f:
+            f.write("+570000000000\n")
+        log_mensajes = os.path.join(directorio_temporal, f"mensajes_{time.monotonic_ns()}.log")
+        with medir('notificaciones'):
+            comparar_y_notificar(anteriores, resultados, ESTRATEGIA_BENCHMARK, lista_moviles, log_mensajes)
+
+    return tiempos, picos, len(resultados)
+
+
+
+def medir_escenario(nombre, escenario, parametros, repeticiones=REPETICIONES):
+    """
+    Mide un escenario: mejor tiempo de 'repeticiones' pasadas sin tracemalloc y una pasada
+    adicional con tracemalloc para la memoria pico de cada etapa.
+    :return: Diccionario {etapa: {'segundos', 'barras_s', 'simbolos_s', 'memoria_pico_kb'}}
+    """
+    directorio_temporal = tempfile.mkdtemp(prefix=f"benchmark_{nombre}_")
+    barras_totales = escenario['simbolos'] * escenario['barras']
+    try:
+        # Pasada de calentamiento: importaciones y cachés de pandas fuera de la medida
+        ejecutar_etapas(escenario, parametros, directorio_temporal)
+
+        mejores = {}
+        for _ in range(repeticiones):
+            gc.collect()
+            tiempos, _, simbolos_ok = ejecutar_etapas(escenario, parametros, directorio_temporal)
+            for etapa, segundos in tiempos.items():
+                mejores[etapa] = min(segundos, mejores.get(etapa, segundos))
+
+        # tracemalloc ralentiza cada asignación: la memoria se mide en una pasada aparte
+        tracemalloc.start()
+        try:
+            _, memoria, _ = ejecutar_etapas(escenario, parametros, directorio_temporal, memoria=True)
+        finally:
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(directorio_temporal, ignore_errors=True)
+
+    if simbolos_ok != escenario['simbolos']:
+        print(f"⚠️  {nombre}: solo {simbolos_ok} de {escenario['simbolos']} símbolos llegaron al final del pipeline")
+
+    return {
+        etapa: {
+            'segundos': round(mejores[etapa], 6),
+            'barras_s': round(barras_totales / mejores[etapa], 1) if mejores[etapa] > 0 else None,
+            'simbolos_s': round(escenario['simbolos'] / mejores[etapa], 2) if mejores[etapa] > 0 else None,
+            'memoria_pico_kb': memoria.get(etapa)
+        }
+        for etapa in ETAPAS if etapa in mejores
+    }
+
+
+
+def mostrar_resultados(nombre, escenario, resultados, baseline=None, umbral=UMBRAL_REGRESION):
+    """
+    Muestra la tabla de un escenario y, si hay baseline, la variación frente a ella.
+    :return: Lista de regresiones detectadas (textos)
+    """
+    print(f"\n{'=' * 90}")
+    print(f"⏱️  ESCENARIO {nombre}: {escenario['simbolos']} símbolos x {escenario['barras']} barras "
+          f"({escenario['intervalo']}, régimen {escenario['regimen']})")
+    print(f"{'=' * 90}")
+    print(f"   {'Etapa':<16} {'Tiempo':>10} {'Barras/s':>13} {'Símbolos/s':>11} {'Memoria pico':>14} {'vs baseline':>12}")
+
+    regresiones = []
+    for etapa, medida in resultados.items():
+        referencia = (baseline or {}).get(etapa)
+        comparacion = ""
+        if referencia and referencia.get('barras_s') and medida['barras_s']:
+            variacion = medida['barras_s'] / referencia['barras_s'] - 1
+            comparacion = f"{variacion:+.0%}"
+            if variacion < -umbral:
+                regresiones.append(f"{nombre}/{etapa}: {medida['barras_s']:.0f} barras/s frente a {referencia['barras_s']:.0f} ({variacion:+.0%})")
+            if referencia.get('memoria_pico_kb') and medida['memoria_pico_kb']:
+                variacion_memoria = medida['memoria_pico_kb'] / referencia['memoria_pico_kb'] - 1
+                if variacion_memoria > umbral:
+                    regresiones.append(f"{nombre}/{etapa}: memoria pico {medida['memoria_pico_kb']:.0f} KB frente a "
+                                       f"{referencia['memoria_pico_kb']:.0f} KB ({variacion_memoria:+.0%})")
+
+        memoria = f"{medida['memoria_pico_kb']:.0f} KB" if medida['memoria_pico_kb'] is not None else "N/A"
+        print(f"   {etapa:<16} {medida['segundos'] * 1000:>7.1f} ms {medida['barras_s'] or 0:>13,.0f} "
+              f"{medida['simbolos_s'] or 0:>11,.1f} {memoria:>14} {comparacion:>12}")
+
+    total = sum(m['segundos'] for m in resultados.values())
+    barras = escenario['simbolos'] * escenario['barras']
+    print(f"   {'TOTAL':<16} {total * 1000:>7.1f} ms {barras / total:>13,.0f} {escenario['simbolos'] / total:>11,.1f}")
+    return regresiones
+
+
+
+def entorno_actual():
+    """Versiones relevantes para interpretar una baseline (las medidas solo son comparables en la misma máquina)."""
+    import numpy
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'maquina': platform.node(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+
+def cargar_baseline(ruta=RUTA_BASELINE):
+    """:return: Contenido de la baseline o None si no existe"""
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"❌ Error leyendo la baseline {ruta}: {e}")
+        return None
+
+
+
+def guardar_baseline(resultados, ruta=RUTA_BASELINE):
+    """Guarda los resultados como baseline, conservando los escenarios que no se han vuelto a medir."""
+    contenido = cargar_baseline(ruta) or {'escenarios': {}}
+    contenido['escenarios'].update(resultados)
+    contenido['entorno'] = entorno_actual()
+    contenido['fecha'] = datetime.now().isoformat(timespec='seconds')
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(contenido, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    print(f"\n💾 Baseline guardada en {ruta}")
+
+
+
+def main(argumentos):
+    opciones = {'guardar': False, 'umbral': UMBRAL_REGRESION, 'repeticiones': REPETICIONES}
+    nombres = []
+    for argumento in argumentos:
+        if argumento == '--guardar-baseline':
+            opciones['guardar'] = True
+        elif argumento.startswith('--umbral='):
+            opciones['umbral'] = float(argumento.split('=', 1)[1])
+        elif argumento.startswith('--repeticiones='):
+            opciones['repeticiones'] = max(1, int(argumento.split('=', 1)[1]))
+        elif argumento == 'all':
+            nombres.extend(ESCENARIOS)
+        elif argumento in ESCENARIOS:
+            nombres.append(argumento)
+        else:
+            print(f"❌ Argumento no válido: {argumento}")
+            print(f"   Escenarios disponibles: {', '.join(ESCENARIOS)}, all")
+            return 2
+    nombres = nombres or ['pequeño', 'mediano']
+
+    parametros = cargar_parametros()
+    baseline = None if opciones['guardar'] else cargar_baseline()
+    if baseline:
+        if baseline.get('entorno') != entorno_actual():
+            print(f"⚠️  La baseline se generó en otro entorno: {baseline.get('entorno')}")
+    elif not opciones['guardar']:
+        print(f"ℹ️  No hay baseline en {RUTA_BASELINE}: ejecute con --guardar-baseline para crearla")
+
+    resultados = {}
+    regresiones = []
+    for nombre in nombres:
+        resultados[nombre] = medir_escenario(nombre, ESCENARIOS[nombre], parametros, opciones['repeticiones'])
+        referencia = (baseline or {}).get('escenarios', {}).get(nombre)
+        regresiones.extend(mostrar_resultados(nombre, ESCENARIOS[nombre], resultados[nombre], referencia, opciones['umbral']))
+
+    if opciones['guardar']:
+        guardar_baseline(resultados)
+        return 0
+
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones superan el umbral del {opciones['umbral']:.0%}:")
+        for regresion in regresiones:
+            print(f"   - {regresion}")
+        return 1
+
+    if baseline:
+        print(f"\n✅ Sin regresiones respecto a la baseline (umbral {opciones['umbral']:.0%})")
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,115 @@
+import zlib
+import numpy as np
+import pandas as pd
+
+from helpers.date_utils import convertir_a_segundos
+
+
+# Régimen de volatilidad: (volatilidad por barra, deriva por barra, probabilidad de salto, tamaño del salto)
+REGIMENES = {
+    'tranquilo': (0.004, 0.0001, 0.0, 0.0),
+    'normal': (0.01, 0.0002, 0.002, 0.03),
+    'volatil': (0.03, 0.0, 0.01, 0.08),
+    'tendencia': (0.008, 0.002, 0.001, 0.02),
+    'crisis': (0.05, -0.003, 0.03, 0.15),
+}
+
+# Fecha de la última barra: fija para que los datos no dependan del día en que se ejecuta
+FECHA_FIN = pd.Timestamp("2024-01-02 00:00:00")
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+
+
+def _generar_series(symbol, intervalo, barras, regimen, semilla):
+    """
+    Genera las series OHLCV sintéticas deterministas (mismo símbolo, régimen y semilla => mismos datos).
+    :return: Tupla (fechas, apertura, maximo, minimo, cierre, volumen) en orden cronológico
+    """
+    if regimen not in REGIMENES:
+        raise ValueError(f"Régimen no válido: {regimen}. Disponibles: {', '.join(REGIMENES)}")
+    volatilidad, deriva, prob_salto, salto = REGIMENES[regimen]
+
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}|{intervalo}|{regimen}|{semilla}".encode("utf-8")))
+    retornos = rng.normal(deriva, volatilidad, barras)
+    saltos = rng.random(barras) < prob_salto
+    retornos[saltos] += rng.choice([-1.0, 1.0], saltos.sum()) * salto
+
+    precio_inicial = 10 ** rng.uniform(0, 4)
+    cierre = precio_inicial * np.exp(np.cumsum(retornos))
+    apertura = np.concatenate(([precio_inicial], cierre[:-1]))
+    rango = np.abs(rng.normal(0, volatilidad, barras)) * cierre
+    maximo = np.maximum(apertura, cierre) + rango * rng.random(barras)
+    minimo = np.minimum(apertura, cierre) - rango * rng.random(barras)
+    volumen = rng.lognormal(12, 1 + volatilidad * 10, barras).astype(np.int64)
+
+    fechas = pd.date_range(end=FECHA_FIN, periods=barras, freq=pd.Timedelta(seconds=convertir_a_segundos(intervalo)))
+    return fechas, apertura, maximo, minimo, cierre, volumen
+
+
+
+def generar_ohlcv(symbol, intervalo="1h", barras=1000, regimen="normal", semilla=0):
+    """
+    Genera barras OHLCV sintéticas con el formato de respuesta de los proveedores.
+    :param symbol: Símbolo (forma parte de la semilla)
+    :param intervalo: Intervalo de las barras (ej: 1h, 4h, 1day)
+    :param barras: Número de barras
+    :param regimen: Régimen de volatilidad de REGIMENES
+    :return: Lista de registros en el formato de los proveedores (del más reciente al más antiguo)
+    """
+    fechas, apertura, maximo, minimo, cierre, volumen = _generar_series(symbol, intervalo, barras, regimen, semilla)
+    fechas_texto = fechas.strftime(FORMATO_FECHA)
+
+    # Mismo orden que Twelve Data: la barra más reciente primero
+    return [
+        {'datetime': fechas_texto[i], 'open': float(apertura[i]), 'high': float(maximo[i]),
+         'low': float(minimo[i]), 'close': float(cierre[i]), 'volume': int(volumen[i])}
+        for i in range(barras - 1, -1, -1)
+    ]
+
+
+
+def generar_dataframe_ohlcv(symbol, intervalo="1h", barras=1000, regimen="normal", semilla=0):
+    """
+    Genera las mismas barras que generar_ohlcv directamente como DataFrame, con el formato
+    de convertir_a_dataframe (columna e índice datetime, orden ascendente). Evita crear
+    millones de diccionarios en los benchmarks de series largas.
+    """
+    fechas, apertura, maximo, minimo, cierre, volumen = _generar_series(symbol, intervalo, barras, regimen, semilla)
+    return pd.DataFrame({
+        'datetime': fechas,
+        'Open': apertura,
+        'High': maximo,
+        'Low': minimo,
+        'Close': cierre,
+        'Volume': volumen.astype(np.float64)
+    }, index=fechas)
+
+
+
+class ProveedorSintetico:
+    """
+    Proveedor falso con la misma salida que GetDataTwelveView.obtener_datos_historicos,
+    para ejecutar el pipeline sin red ni claves de API.
+    """
+    def __init__(self, regimen="normal", semilla=0):
+        self.regimen = regimen
+        self.semilla = semilla
+
+    def obtener_datos_historicos(self, intervalo, barras, symbols):
+        """
+        :return: Diccionario {symbol: {'meta': ..., 'values': registros, 'status': 'ok'}}
+        """
+        return {
+            symbol: {
+                'meta': {'symbol': symbol, 'interval': intervalo, 'proveedor': 'Sintético', 'regimen': self.regimen},
+                'values': generar_ohlcv(symbol, intervalo, barras, self.regimen, self.semilla),
+                'status': 'ok'
+            }
+            for symbol in symbols
+        }
+
+
+def simbolos_sinteticos(cantidad):
+    """Nombres de símbolos ficticios: SYN000, SYN001, ..."""
+    return [f"SYN{i:03d}" for i in range(cantidad)]
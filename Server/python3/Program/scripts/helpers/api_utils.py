@@ -3,13 +3,63 @@ import time
 from datetime import datetime, timedelta
 import pytz
 import urllib.parse
+import threading
 
 
+# Sesión HTTP compartida por todo el proceso (reutiliza conexiones keep-alive)
+_sesion_http = None
+_lock_sesion_http = threading.Lock()
 
-def obtener_datos_twelvedata(url_base_path, symbol, api_key, interval, start_date=None, end_date=None, timezone="UTC", verbose=False):
+
+
+def obtener_sesion_http():
+    """
+    Devuelve la sesión HTTP compartida, creándola en el primer uso.
+    En modo daemon evita el handshake TCP/TLS en cada consulta a las APIs.
+    """
+    global _sesion_http
+    with _lock_sesion_http:
+        if _sesion_http is None:
+            _sesion_http = requests.Session()
+        return _sesion_http
+
+
+
+def _consultar_proveedor(proveedor, symbol, url, headers):
+    """
+    Hace la petición GET al proveedor con la sesión compartida y registra su latencia
+    en la instrumentación activa (helpers.instrumentacion).
+    """
+    from helpers.instrumentacion import registrar_latencia
+    from helpers.metricas import PETICIONES_PROVEEDOR, LATENCIA_PROVEEDOR
+
+    inicio = time.perf_counter()
+    try:
+        response = obtener_sesion_http().get(url, headers=headers, timeout=30)
+    except Exception:
+        duracion = time.perf_counter() - inicio
+        registrar_latencia(proveedor, duracion, False, symbol=symbol)
+        PETICIONES_PROVEEDOR.incrementar(proveedor=proveedor, resultado="error_red")
+        LATENCIA_PROVEEDOR.observar(duracion, proveedor=proveedor)
+        raise
+    duracion = time.perf_counter() - inicio
+    registrar_latencia(proveedor, duracion, response.ok, symbol=symbol, status=response.status_code)
+    PETICIONES_PROVEEDOR.incrementar(proveedor=proveedor, resultado="ok" if response.ok else f"http_{response.status_code}")
+    LATENCIA_PROVEEDOR.observar(duracion, proveedor=proveedor)
+    return response
+
+
+
+def obtener_datos_twelvedata(url_base_path, symbol, api_key, interval, start_date=None, end_date=None, timezone="UTC", verbose=False, outputsize=None, validar_retraso=True):
     """
     Obtiene datos de Twelve Data API con soporte para timezone
+    :param outputsize: Número máximo de registros a solicitar (None = valor por defecto de la API)
+    :param validar_retraso: Si es False no se alerta por datos antiguos (chunks históricos de backfill)
     """
+    from helpers.backfill_utils import obtener_limitador
+
+    # Todas las peticiones a Twelve Data del proceso comparten el límite por minuto
+    obtener_limitador('twelvedata').esperar()
     timestamp = int(time.time())
     
     # Construir URL base
@@ -19,6 +69,8 @@ def obtener_datos_twelvedata(url_base_path, symbol, api_key, interval, start_dat
         url += f"&start_date={start_date}"
     if end_date:
         url += f"&end_date={end_date}"
+    if outputsize:
+        url += f"&outputsize={outputsize}"
     
     if verbose:
         print(f"    🌐 Consultando Twelve Data para {symbol}: {url.replace(api_key, 'API_KEY_REDACTED').replace(str(timestamp), 'TIMESTAMP_REDACTED')}")
@@ -32,7 +84,7 @@ def obtener_datos_twelvedata(url_base_path, symbol, api_key, interval, start_dat
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = _consultar_proveedor("Twelve Data", symbol, url, headers)
         
         if verbose:
             print(f"    📥 Respuesta recibida para {symbol} - Status: {response.status_code}")
@@ -40,7 +92,7 @@ def obtener_datos_twelvedata(url_base_path, symbol, api_key, interval, start_dat
         data = response.json()
         
         # Validar respuesta
-        validated_data = _validar_respuesta_api(data, symbol, "Twelve Data", verbose)
+        validated_data = _validar_respuesta_api(data, symbol, "Twelve Data", verbose, validar_retraso=validar_retraso)
         if validated_data:
             # Procesar con el nuevo formateo (similar a Yahoo)
             processed_data = _procesar_respuesta_twelve_data(validated_data, symbol, verbose)
@@ -82,7 +134,7 @@ def obtener_datos_alpha_vantage(symbol, api_key, interval, tiempo_atras=None, ti
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = _consultar_proveedor("Alpha Vantage", symbol, url, headers)
 
         if verbose:
             print(f"    📥 Respuesta Alpha Vantage para {symbol} - Status: {response.status_code}")
@@ -131,7 +183,7 @@ def obtener_datos_yahoo_finance(symbol, interval, tiempo_atras=None, timezone="U
             'Accept': 'application/json'
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = _consultar_proveedor("Yahoo Finance", symbol, url, headers)
 
         if verbose:
             print(f"    📥 Respuesta Yahoo Finance para {symbol} - Status: {response.status_code}")
@@ -172,10 +224,8 @@ def _procesar_respuesta_twelve_data(data, symbol, verbose=False):
                 'volume': int(registro['volume']) if registro['volume'] is not None else 0
             })
         
-        # Ordenar por fecha (más reciente primero)
+        # Twelve Data ya entrega la barra más reciente primero: sin ordenar (el conversor detecta el orden)
         if values:
-            values.sort(key=lambda x: x['datetime'], reverse=True)
-            
             if verbose:
                 print(f"    ✅ Twelve Data - Procesados {len(values)} registros para {symbol}")
                 
@@ -333,10 +383,8 @@ def _procesar_respuesta_alpha_vantage(data, interval, verbose=False):
                     print(f"    ⚠️  Alpha Vantage - Campo faltante en {datetime_str}: {e}")
                 continue
         
-        # Ordenar por fecha (más reciente primero)
+        # La serie de Alpha Vantage ya viene de la más reciente a la más antigua: sin ordenar
         if values:
-            values.sort(key=lambda x: x['datetime'], reverse=True)
-            
             if verbose:
                 print(f"    🔄 Alpha Vantage - Convertido de {time_zone} a UTC")
                 print(f"    ✅ Alpha Vantage - Procesados {processed_count} registros válidos de {len(time_series)} totales")
@@ -379,8 +427,11 @@ def _procesar_respuesta_yahoo(data, symbol, verbose=False):
         timezone = meta.get('timezone', 'UTC')
         gmt_offset = meta.get('gmtoffset', 0)  # Offset en segundos (-18000 = -5 horas para EST)
         
+        # Yahoo entrega las barras de la más antigua a la más reciente: se recorren al revés para devolver
+        # la más reciente primero (formato de los proveedores) sin ordenar
         values = []
-        for i, timestamp in enumerate(timestamps):
+        for i in range(len(timestamps) - 1, -1, -1):
+            timestamp = timestamps[i]
             # CORRECCIÓN: Ajustar el timestamp restando el offset para convertirlo a UTC
             # Yahoo timestamps están en hora local del exchange, necesitamos convertirlos a UTC
             timestamp_utc = timestamp - gmt_offset
@@ -399,10 +450,7 @@ def _procesar_respuesta_yahoo(data, symbol, verbose=False):
                 'volume': int(quotes['volume'][i]) if quotes['volume'][i] is not None else 0
             })
         
-        # Ordenar por fecha (más reciente primero)
         if values:
-            values.sort(key=lambda x: x['datetime'], reverse=True)
-            
             if verbose:
                 print(f"    🌍 Yahoo Finance - Timezone original: {timezone} (offset: {gmt_offset})")
                 print(f"    🔄 Convertido a UTC para {symbol}")
@@ -421,7 +469,7 @@ def _procesar_respuesta_yahoo(data, symbol, verbose=False):
 
 
 
-def _validar_respuesta_api(data, symbol, api_name, verbose=False):
+def _validar_respuesta_api(data, symbol, api_name, verbose=False, validar_retraso=True):
     """Valida la respuesta de cualquier API y convierte timezone si es necesario"""
     if not data or "values" not in data:
         if verbose:
@@ -454,7 +502,7 @@ def _validar_respuesta_api(data, symbol, api_name, verbose=False):
             diferencia = fecha_actual - fecha_primer_dt
             horas_retraso = diferencia.total_seconds() / 3600
             
-            if horas_retraso > 24:  # Más de 24 horas de retraso
+            if validar_retraso and horas_retraso > 24:  # Más de 24 horas de retraso
                 print(f"    ⚠️  ALERTA: {api_name} tiene {horas_retraso:.1f} horas de retraso para {symbol}")
                 print(f"    ⚠️  Último dato: {fecha_primer} vs Actual: {fecha_actual.strftime('%Y-%m-%d %H:%M:%S')}")
                 # No retornar None, solo mostrar advertencia
@@ -567,20 +615,38 @@ def obtener_mejores_datos(symbol, intervalo, tiempo_atras, config_apis, timezone
     
     # Twelve Data
     if 'twelvedata' in config_apis:
-        # Calcular fechas para Twelve Data
-        from helpers.date_utils import calcular_fechas
-        start_date, end_date = calcular_fechas(tiempo_atras, timezone=timezone)
-
-        datos_td = obtener_datos_twelvedata(
-            config_apis['twelvedata']['url_base_path'],
-            symbol,
-            config_apis['twelvedata']['api_key'],
-            intervalo,
-            start_date=start_date,
-            end_date=end_date,
-            timezone=timezone,
-            verbose=verbose
-        )
+        from helpers.backfill_utils import requiere_backfill, ejecutar_backfill
+        config_td = config_apis['twelvedata']
+
+        if requiere_backfill(intervalo, tiempo_atras, 'twelvedata', config_td.get('max_registros')):
+            # La ventana excede una sola respuesta: backfill por chunks en paralelo
+            datos_td = ejecutar_backfill(
+                config_td['url_base_path'],
+                symbol,
+                config_td['api_key'],
+                intervalo,
+                tiempo_atras,
+                timezone=timezone,
+                max_registros=config_td.get('max_registros'),
+                peticiones_por_minuto=config_td.get('peticiones_por_minuto'),
+                max_hilos=config_td.get('backfill_hilos', 4),
+                verbose=verbose
+            )
+        else:
+            # Calcular fechas para Twelve Data
+            from helpers.date_utils import calcular_fechas
+            start_date, end_date = calcular_fechas(tiempo_atras, timezone=timezone)
+
+            datos_td = obtener_datos_twelvedata(
+                config_td['url_base_path'],
+                symbol,
+                config_td['api_key'],
+                intervalo,
+                start_date=start_date,
+                end_date=end_date,
+                timezone=timezone,
+                verbose=verbose
+            )
         if datos_td:
             registros_td = len(datos_td['values'])
             todos_datos.append(('Twelve Data', datos_td))
@@ -629,6 +695,9 @@ def obtener_mejores_datos(symbol, intervalo, tiempo_atras, config_apis, timezone
                 print(f"       • {info}")
             print(f"    🏆 Mejor fuente seleccionada: {mejor_fuente} con {registros_mejor} registros")
         
+        # Cada proveedor tiene su convención de símbolos, zona horaria y alineación de barras:
+        # la caché del daemon guarda la fuente para actualizar solo con el mismo proveedor
+        mejores_datos['proveedor'] = mejor_fuente
         return mejores_datos
     
     if verbose:
@@ -637,6 +706,61 @@ def obtener_mejores_datos(symbol, intervalo, tiempo_atras, config_apis, timezone
 
 
 
+def obtener_datos_incrementales(symbol, intervalo, tiempo_atras, config_apis, registros_cache, timezone="UTC", verbose=False,
+                                proveedor="Twelve Data"):
+    """
+    Actualiza una serie ya descargada pidiendo a Twelve Data solo las barras posteriores
+    a la última barra en caché (con un pequeño solapamiento para corregir la barra abierta).
+    Solo se actualiza una caché que vino de Twelve Data: las de Yahoo Finance o Alpha Vantage usan otro
+    símbolo, zona horaria y alineación de barras, así que para ellas se hace la descarga completa.
+    :param registros_cache: Registros en caché (formato estándar, del más reciente al más antiguo)
+    :param proveedor: Proveedor del que vienen los registros en caché
+    :return: Diccionario {'values': [...], 'proveedor': 'Twelve Data'} fusionado y recortado a la ventana,
+             o None si no se pudo actualizar (el llamador debe hacer la descarga completa)
+    """
+    if 'twelvedata' not in config_apis or not registros_cache or proveedor != "Twelve Data":
+        return None
+
+    from helpers.backfill_utils import fusionar_registros, recortar_a_ventana, BARRAS_SOLAPAMIENTO, MAX_REGISTROS_PROVEEDOR
+    from helpers.date_utils import convertir_a_segundos
+
+    segundos_intervalo = convertir_a_segundos(intervalo)
+    segundos_ventana = convertir_a_segundos(tiempo_atras)
+    if not segundos_intervalo or not segundos_ventana:
+        return None
+
+    try:
+        ultima_barra = datetime.fromisoformat(registros_cache[0]['datetime'])
+    except (KeyError, ValueError):
+        return None
+
+    inicio = ultima_barra - timedelta(seconds=segundos_intervalo * BARRAS_SOLAPAMIENTO)
+    config_td = config_apis['twelvedata']
+    datos_nuevos = obtener_datos_twelvedata(
+        config_td['url_base_path'],
+        symbol,
+        config_td['api_key'],
+        intervalo,
+        start_date=urllib.parse.quote(inicio.strftime("%Y-%m-%dT%H:%M")),
+        timezone=timezone,
+        verbose=verbose,
+        outputsize=config_td.get('max_registros') or MAX_REGISTROS_PROVEEDOR['twelvedata']
+    )
+    if not datos_nuevos or not datos_nuevos.get('values'):
+        return None
+
+    # Descartar las barras que ya quedaron fuera de la ventana de la estrategia
+    values = recortar_a_ventana(fusionar_registros(registros_cache, datos_nuevos['values']), segundos_ventana)
+
+    if verbose:
+        barras_nuevas = len(values) - len(recortar_a_ventana(registros_cache, segundos_ventana))
+        print(f"    ♻️  {symbol}: actualización incremental con {len(datos_nuevos['values'])} registros descargados "
+              f"({max(barras_nuevas, 0)} barras nuevas, {len(values)} en la ventana)")
+
+    return {'values': values, 'proveedor': "Twelve Data"}
+
+
+
 # Función de compatibilidad hacia atrás
 def obtener_historico_mercados_hasta_hoy(url_base_path, symbol, api_key, interval, start_date=None, end_date=None, verbose=False, timezone="UTC"):
     """
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import threading
+import urllib.parse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pytz
+
+from helpers.date_utils import convertir_a_segundos
+
+
+# Máximo de registros que devuelve cada proveedor en una sola respuesta
+MAX_REGISTROS_PROVEEDOR = {
+    'twelvedata': 5000  # outputsize máximo de Twelve Data
+}
+
+# Peticiones por minuto permitidas por proveedor (plan gratuito Twelve Data = 8)
+PETICIONES_POR_MINUTO_PROVEEDOR = {
+    'twelvedata': 8
+}
+
+# Directorio del almacén local de backfill en el contenedor
+DIRECTORIO_BACKFILL = "/app/tmp/backfill"
+
+# Barras de solapamiento entre chunks consecutivos (se eliminan al fusionar)
+BARRAS_SOLAPAMIENTO = 5
+
+# Un limitador por proveedor para todo el proceso (backfill, descargas normales e incrementales)
+_limitadores = {}
+_bloqueo_limitadores = threading.Lock()
+
+
+
+class LimitadorTasa:
+    """
+    Limitador de tasa compartido entre hilos (ventana deslizante de 60 segundos).
+    """
+    def __init__(self, peticiones_por_minuto):
+        self.peticiones_por_minuto = max(1, int(peticiones_por_minuto))
+        self._marcas = []
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya cupo para una nueva petición."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._marcas = [marca for marca in self._marcas if ahora - marca < 60]
+                if len(self._marcas) < self.peticiones_por_minuto:
+                    self._marcas.append(ahora)
+                    return
+                espera = 60 - (ahora - self._marcas[0])
+            time.sleep(max(espera, 0.05))
+
+
+
+def obtener_limitador(proveedor='twelvedata', peticiones_por_minuto=None):
+    """
+    Limitador de tasa compartido por todas las peticiones del proveedor en el proceso.
+    Al crearlo se usa el límite de la configuración (twelvedata.info) o el del proveedor;
+    si se indica peticiones_por_minuto, se ajusta el límite del limitador existente.
+    """
+    with _bloqueo_limitadores:
+        limitador = _limitadores.get(proveedor)
+        if limitador is None:
+            if peticiones_por_minuto is None and proveedor == 'twelvedata':
+                from helpers.config_loader import cargar_limites_twelvedata
+
+                peticiones_por_minuto = cargar_limites_twelvedata().get('peticiones_por_minuto')
+            limitador = _limitadores[proveedor] = LimitadorTasa(
+                peticiones_por_minuto or PETICIONES_POR_MINUTO_PROVEEDOR.get(proveedor, 60))
+        elif peticiones_por_minuto:
+            with limitador._lock:
+                limitador.peticiones_por_minuto = max(1, int(peticiones_por_minuto))
+        return limitador
+
+
+
+def estimar_registros(intervalo, tiempo_atras):
+    """
+    Estima cuántas barras de 'intervalo' caben en la ventana 'tiempo_atras'.
+    :return: Número estimado de registros o None si algún valor no es válido.
+    """
+    segundos_intervalo = convertir_a_segundos(intervalo)
+    segundos_ventana = convertir_a_segundos(tiempo_atras)
+    if not segundos_intervalo or not segundos_ventana:
+        return None
+    return segundos_ventana // segundos_intervalo
+
+
+
+def requiere_backfill(intervalo, tiempo_atras, proveedor='twelvedata', max_registros=None):
+    """
+    Indica si la ventana solicitada excede lo que el proveedor entrega en una sola respuesta.
+    """
+    max_registros = max_registros or MAX_REGISTROS_PROVEEDOR.get(proveedor)
+    registros = estimar_registros(intervalo, tiempo_atras)
+    if not max_registros or registros is None:
+        return False
+    return registros > max_registros
+
+
+
+def calcular_ventanas_backfill(fecha_inicio, fecha_fin, intervalo, max_registros, solapamiento=BARRAS_SOLAPAMIENTO):
+    """
+    Divide [fecha_inicio, fecha_fin] en ventanas del tamaño de una respuesta del proveedor.
+    Las ventanas se alinean a una rejilla fija (múltiplos del tamaño del chunk desde epoch),
+    de modo que las mismas ventanas se repiten entre ejecuciones y pueden reanudarse.
+    :return: Lista de tuplas (inicio, fin, completa) ordenadas de la más reciente a la más antigua.
+    """
+    segundos_intervalo = convertir_a_segundos(intervalo)
+    if not segundos_intervalo:
+        return []
+
+    # El chunk se deja un margen por debajo del máximo para absorber el solapamiento
+    segundos_chunk = segundos_intervalo * max(1, max_registros - solapamiento)
+    segundos_solapamiento = segundos_intervalo * solapamiento
+
+    tz = fecha_inicio.tzinfo or pytz.UTC
+    epoch = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+    inicio_rejilla = int((fecha_inicio - epoch).total_seconds()) // segundos_chunk * segundos_chunk
+
+    ventanas = []
+    cursor = inicio_rejilla
+    fin_segundos = (fecha_fin - epoch).total_seconds()
+    while cursor < fin_segundos:
+        inicio = (epoch + timedelta(seconds=cursor)).astimezone(tz)
+        fin = (epoch + timedelta(seconds=cursor + segundos_chunk + segundos_solapamiento)).astimezone(tz)
+        # Una ventana está completa cuando termina antes del momento de la consulta
+        completa = fin <= fecha_fin
+        ventanas.append((inicio, min(fin, fecha_fin), completa))
+        cursor += segundos_chunk
+
+    ventanas.reverse()
+    return ventanas
+
+
+
+def fusionar_registros(*listas_registros):
+    """
+    Fusiona varias listas de registros eliminando duplicados por 'datetime'.
+    Ante duplicados prevalece la lista posterior (dato más reciente).
+    :return: Lista ordenada de la más reciente a la más antigua (formato de los proveedores).
+    """
+    por_fecha = {}
+    for registros in listas_registros:
+        for registro in registros or []:
+            por_fecha[registro['datetime']] = registro
+    return [por_fecha[fecha] for fecha in sorted(por_fecha, reverse=True)]
+
+
+
+def recortar_a_ventana(registros, segundos_ventana, fecha_fin=None):
+    """
+    Descarta los registros anteriores al inicio de la ventana [fecha_fin - segundos_ventana, fecha_fin].
+    La comparación se hace sobre el texto de 'datetime' (también válido para barras diarias sin hora).
+    :return: Lista de registros dentro de la ventana, en el mismo orden.
+    """
+    fecha_fin = fecha_fin or datetime.now(pytz.UTC)
+    limite = (fecha_fin - timedelta(seconds=segundos_ventana)).strftime('%Y-%m-%d %H:%M:%S')
+    return [registro for registro in registros if registro['datetime'] >= limite[:len(registro['datetime'])]]
+
+
+
+def _ruta_almacen(directorio, symbol, intervalo):
+    """Directorio del almacén local para un símbolo e intervalo."""
+    nombre = f"{symbol}_{intervalo}".replace('/', '-')
+    return os.path.join(directorio, nombre)
+
+
+
+def _nombre_chunk(inicio, fin):
+    """Nombre de archivo estable para una ventana de backfill."""
+    return f"chunk_{inicio.strftime('%Y%m%d%H%M')}_{fin.strftime('%Y%m%d%H%M')}.json"
+
+
+
+def _escribir_json_atomico(ruta, datos):
+    """Escribe un archivo JSON de forma atómica (archivo temporal + os.replace)."""
+    ruta_temporal = f"{ruta}.tmp"
+    with open(ruta_temporal, 'w') as f:
+        json.dump(datos, f)
+    os.replace(ruta_temporal, ruta)
+
+
+
+def _leer_json(ruta):
+    """Lee un archivo JSON del almacén, devolviendo None si no existe o está corrupto."""
+    try:
+        with open(ruta, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+
+def ejecutar_backfill(url_base_path, symbol, api_key, intervalo, tiempo_atras, timezone="UTC",
+                      max_registros=None, peticiones_por_minuto=None, max_hilos=4,
+                      directorio=DIRECTORIO_BACKFILL, verbose=False):
+    """
+    Obtiene una ventana histórica larga de Twelve Data dividiéndola en chunks del tamaño
+    máximo de respuesta, descargándolos en paralelo dentro del límite de peticiones,
+    eliminando solapamientos y guardando el resultado en el almacén local.
+
+    Los chunks cerrados se guardan individualmente, por lo que una ejecución interrumpida
+    se reanuda descargando solo las ventanas que faltan.
+
+    :param url_base_path: URL base de Twelve Data
+    :param symbol: Símbolo a consultar
+    :param api_key: API key de Twelve Data
+    :param intervalo: Intervalo de las barras (ej: 1h)
+    :param tiempo_atras: Ventana histórica a cubrir (ej: 5year)
+    :param timezone: Timezone de la consulta
+    :param max_registros: Registros máximos por respuesta (por defecto el del proveedor)
+    :param peticiones_por_minuto: Límite de peticiones por minuto del limitador compartido (None = configuración)
+    :param max_hilos: Número de descargas concurrentes
+    :param directorio: Directorio raíz del almacén local
+    :param verbose: Si es True, muestra detalles del proceso
+    :return: Diccionario {'values': [...]} en formato estándar o None si no se obtuvo nada
+    """
+    from helpers.api_utils import obtener_datos_twelvedata
+
+    max_registros = max_registros or MAX_REGISTROS_PROVEEDOR['twelvedata']
+    # Cada chunk pasa por obtener_datos_twelvedata, que espera en el limitador compartido del proveedor
+    obtener_limitador('twelvedata', peticiones_por_minuto)
+
+    segundos_ventana = convertir_a_segundos(tiempo_atras)
+    if not segundos_ventana:
+        return None
+
+    try:
+        tz = pytz.timezone(timezone)
+    except Exception:
+        tz = pytz.UTC
+
+    fecha_fin = datetime.now(tz)
+    fecha_inicio = fecha_fin - timedelta(seconds=segundos_ventana)
+    ventanas = calcular_ventanas_backfill(fecha_inicio, fecha_fin, intervalo, max_registros)
+
+    ruta_almacen = _ruta_almacen(directorio, symbol, intervalo)
+    os.makedirs(ruta_almacen, exist_ok=True)
+
+    if verbose:
+        print(f"    🧩 Backfill {symbol} ({intervalo}, {tiempo_atras}): {len(ventanas)} chunks de hasta {max_registros} registros")
+        print(f"    📁 Almacén local: {ruta_almacen}")
+
+    # Reanudar: cargar los chunks cerrados que ya están en el almacén
+    registros_por_chunk = {}
+    pendientes = []
+    for inicio, fin, completa in ventanas:
+        ruta_chunk = os.path.join(ruta_almacen, _nombre_chunk(inicio, fin))
+        if completa:
+            guardado = _leer_json(ruta_chunk)
+            if guardado is not None:
+                registros_por_chunk[(inicio, fin)] = guardado.get('values', [])
+                continue
+        pendientes.append((inicio, fin, completa, ruta_chunk))
+
+    if verbose:
+        print(f"    ♻️  Chunks reutilizados del almacén: {len(registros_por_chunk)}, pendientes: {len(pendientes)}")
+
+    def descargar_chunk(inicio, fin):
+        return obtener_datos_twelvedata(
+            url_base_path,
+            symbol,
+            api_key,
+            intervalo,
+            start_date=urllib.parse.quote(inicio.strftime("%Y-%m-%dT%H:%M")),
+            end_date=urllib.parse.quote(fin.strftime("%Y-%m-%dT%H:%M")),
+            timezone=timezone,
+            verbose=verbose,
+            outputsize=max_registros,
+            validar_retraso=False
+        )
+
+    chunks_fallidos = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_hilos)) as executor:
+        futuros = {
+            executor.submit(descargar_chunk, inicio, fin): (inicio, fin, completa, ruta_chunk)
+            for inicio, fin, completa, ruta_chunk in pendientes
+        }
+        for futuro in as_completed(futuros):
+            inicio, fin, completa, ruta_chunk = futuros[futuro]
+            try:
+                datos_chunk = futuro.result()
+            except Exception as e:
+                datos_chunk = None
+                if verbose:
+                    print(f"    ❌ Error en chunk {inicio} - {fin} de {symbol}: {e}")
+
+            if not datos_chunk or not datos_chunk.get('values'):
+                chunks_fallidos += 1
+                continue
+
+            registros_por_chunk[(inicio, fin)] = datos_chunk['values']
+            # Solo se persisten ventanas cerradas; la ventana abierta se vuelve a pedir siempre
+            if completa:
+                _escribir_json_atomico(ruta_chunk, {'values': datos_chunk['values']})
+
+            if verbose:
+                print(f"    ✅ Chunk {inicio.strftime('%Y-%m-%d %H:%M')} - {fin.strftime('%Y-%m-%d %H:%M')}: {len(datos_chunk['values'])} registros")
+
+    if not registros_por_chunk:
+        if verbose:
+            print(f"    ❌ Backfill sin datos para {symbol}")
+        return None
+
+    # Fusionar de la ventana más antigua a la más reciente para que prevalezca el dato nuevo
+    orden = sorted(registros_por_chunk)
+    values = fusionar_registros(*(registros_por_chunk[clave] for clave in orden))
+
+    # Recortar al inicio real de la ventana (la rejilla puede empezar antes)
+    values = recortar_a_ventana(values, segundos_ventana, fecha_fin)
+
+    _escribir_json_atomico(os.path.join(ruta_almacen, "consolidado.json"), {'values': values})
+
+    if chunks_fallidos:
+        print(f"    ⚠️  Backfill {symbol}: {chunks_fallidos} chunks sin datos, se reintentarán en la próxima ejecución")
+    if verbose:
+        print(f"    🎯 Backfill {symbol} completado: {len(values)} registros únicos")
+
+    return {'values': values}
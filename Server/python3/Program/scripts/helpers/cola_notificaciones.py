@@ -0,0 +1,505 @@
+import os
+import json
+import time
+import atexit
+import random
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# Cola persistente de notificaciones pendientes (sobrevive a reinicios y caídas del proceso)
+RUTA_COLA = "/app/tmp/cola_notificaciones.sqlite"
+
+# Una misma alerta (canal, destinatarios, asunto y mensaje) solo se encola una vez por ventana
+VENTANA_DEDUPLICACION = 15 * 60
+
+# Destinatarios por envío: un lote es una fila de la cola y se reintenta de forma independiente
+TAMAÑO_LOTE = 50
+
+# Reintentos con espera exponencial (con variación aleatoria) entre ESPERA_BASE y ESPERA_MAXIMA
+REINTENTOS_MAXIMOS = 6
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 30 * 60
+
+# Tiempo que un lote reservado queda bloqueado; si el proceso muere, otro trabajador lo retoma al vencer
+RESERVA_SEGUNDOS = 5 * 60
+
+# Los lotes enviados o fallidos se conservan este tiempo para deduplicar y consultar
+RETENCION_SEGUNDOS = 7 * 24 * 60 * 60
+
+# Espera máxima al terminar el proceso para vaciar la cola (lo que quede se envía en la siguiente ejecución)
+ESPERA_SALIDA = 15
+
+ASUNTO_DEFECTO = "Alertas MotorBolsaIA"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS notificaciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    canal TEXT NOT NULL,
+    destinatarios TEXT NOT NULL,
+    asunto TEXT,
+    mensaje TEXT NOT NULL,
+    huella TEXT NOT NULL,
+    creado REAL NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notificaciones_cola ON notificaciones (canal, estado, proximo_intento);
+CREATE INDEX IF NOT EXISTS idx_notificaciones_huella ON notificaciones (huella, creado);
+"""
+
+_despachador = None
+_bloqueo_despachador = threading.Lock()
+
+
+
+class ErrorEnvioPermanente(Exception):
+    """Rechazo definitivo del servidor (destinatario o credenciales inválidas): el lote no se reintenta."""
+
+
+
+class ColaNotificaciones:
+    """
+    Cola persistente en SQLite compartida por todos los procesos (ejecuciones manuales y daemon).
+    Cada fila es un lote de destinatarios de un canal; las operaciones son transacciones cortas,
+    así encolar desde el pipeline no espera a ningún envío.
+    """
+    def __init__(self, ruta=RUTA_COLA, ventana_deduplicacion=VENTANA_DEDUPLICACION, tamaño_lote=TAMAÑO_LOTE,
+                 reintentos_maximos=REINTENTOS_MAXIMOS, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA):
+        self.ruta = ruta
+        self.ventana_deduplicacion = ventana_deduplicacion
+        self.tamaño_lote = tamaño_lote
+        self.reintentos_maximos = reintentos_maximos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+    @contextmanager
+    def _transaccion(self, modo="IMMEDIATE"):
+        """Conexión corta con el esquema creado; todo lo ejecutado dentro forma una transacción."""
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.executescript(_ESQUEMA)
+            conexion.execute(f"BEGIN {modo}")
+            try:
+                yield conexion
+                conexion.execute("COMMIT")
+            except Exception:
+                conexion.execute("ROLLBACK")
+                raise
+        finally:
+            conexion.close()
+
+    def encolar(self, canal, destinatarios, mensaje, asunto=None, deduplicar=True):
+        """
+        Añade una notificación dividida en lotes de destinatarios.
+        :param deduplicar: False si el llamador ya garantiza que cada envío es nuevo (resúmenes de alertas)
+        :return: Número de lotes encolados (0 si la misma alerta ya se encoló dentro de la ventana)
+        """
+        destinatarios = sorted(set(destinatarios))
+        if not destinatarios:
+            return 0
+        huella = hashlib.sha256("\0".join([canal, asunto or "", mensaje, ",".join(destinatarios)]).encode("utf-8")).hexdigest()
+        ahora = time.time()
+        lotes = [destinatarios[i:i + self.tamaño_lote] for i in range(0, len(destinatarios), self.tamaño_lote)]
+
+        # Comprobación e inserción en la misma transacción: dos procesos no pueden encolar el duplicado a la vez
+        with self._transaccion() as conexion:
+            duplicada = conexion.execute(
+                "SELECT 1 FROM notificaciones WHERE huella = ? AND creado >= ? AND estado != 'fallida' LIMIT 1",
+                (huella, ahora - self.ventana_deduplicacion)).fetchone()
+            if duplicada and deduplicar:
+                return 0
+            conexion.executemany(
+                "INSERT INTO notificaciones (canal, destinatarios, asunto, mensaje, huella, creado, proximo_intento) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(canal, json.dumps(lote), asunto, mensaje, huella, ahora, ahora) for lote in lotes])
+        return len(lotes)
+
+    def reservar(self, canal, limite=10):
+        """
+        Reserva los lotes vencidos de un canal (pendientes o con la reserva caducada).
+        :return: Lista de diccionarios {'id', 'destinatarios', 'asunto', 'mensaje', 'intentos'}
+        """
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            filas = conexion.execute(
+                "SELECT id, destinatarios, asunto, mensaje, intentos FROM notificaciones "
+                "WHERE canal = ? AND estado IN ('pendiente', 'enviando') AND proximo_intento <= ? "
+                "ORDER BY proximo_intento, id LIMIT ?", (canal, ahora, limite)).fetchall()
+            conexion.executemany(
+                "UPDATE notificaciones SET estado = 'enviando', proximo_intento = ? WHERE id = ?",
+                [(ahora + RESERVA_SEGUNDOS, fila[0]) for fila in filas])
+        return [{'id': id_, 'destinatarios': json.loads(destinatarios), 'asunto': asunto, 'mensaje': mensaje, 'intentos': intentos}
+                for id_, destinatarios, asunto, mensaje, intentos in filas]
+
+    def completar(self, id_):
+        """Marca un lote como enviado."""
+        with self._transaccion() as conexion:
+            conexion.execute("UPDATE notificaciones SET estado = 'enviada', intentos = intentos + 1, error = NULL WHERE id = ?", (id_,))
+
+    def fallar(self, id_, error, permanente=False):
+        """
+        Registra un intento fallido: el lote vuelve a la cola con espera exponencial
+        o queda como 'fallida' si el error es permanente o se agotaron los reintentos.
+        :return: 'reintento' o 'fallida'
+        """
+        with self._transaccion() as conexion:
+            fila = conexion.execute("SELECT intentos FROM notificaciones WHERE id = ?", (id_,)).fetchone()
+            intentos = (fila[0] if fila else 0) + 1
+            if permanente or intentos >= self.reintentos_maximos:
+                conexion.execute("UPDATE notificaciones SET estado = 'fallida', intentos = ?, error = ? WHERE id = ?",
+                                 (intentos, str(error), id_))
+                return 'fallida'
+            espera = min(self.espera_maxima, self.espera_base * 2 ** (intentos - 1)) * random.uniform(0.5, 1.5)
+            conexion.execute("UPDATE notificaciones SET estado = 'pendiente', intentos = ?, error = ?, proximo_intento = ? WHERE id = ?",
+                             (intentos, str(error), time.time() + espera, id_))
+            return 'reintento'
+
+    def pendientes(self, canales=None):
+        """Lotes por enviar ahora (vencidos o en envío), sin contar los que esperan un reintento."""
+        consulta = "SELECT COUNT(*) FROM notificaciones WHERE (estado = 'enviando' OR (estado = 'pendiente' AND proximo_intento <= ?))"
+        parametros = [time.time()]
+        if canales is not None:
+            consulta += f" AND canal IN ({','.join('?' * len(canales))})"
+            parametros += list(canales)
+        with self._transaccion("DEFERRED") as conexion:
+            return conexion.execute(consulta, parametros).fetchone()[0]
+
+    def resumen(self):
+        """Número de lotes por canal y estado: {canal: {estado: n}}."""
+        with self._transaccion("DEFERRED") as conexion:
+            filas = conexion.execute("SELECT canal, estado, COUNT(*) FROM notificaciones GROUP BY canal, estado").fetchall()
+        resumen = {}
+        for canal, estado, cantidad in filas:
+            resumen.setdefault(canal, {})[estado] = cantidad
+        return resumen
+
+    def purgar(self, retencion=RETENCION_SEGUNDOS):
+        """Elimina los lotes enviados o fallidos más antiguos que la retención. Devuelve cuántos se eliminaron."""
+        with self._transaccion() as conexion:
+            return conexion.execute("DELETE FROM notificaciones WHERE estado IN ('enviada', 'fallida') AND creado < ?",
+                                    (time.time() - retencion,)).rowcount
+
+
+
+class CanalSMTP:
+    """
+    Envío por correo reutilizando una sola conexión SMTP autenticada para todos los lotes
+    (antes cada alerta abría, autenticaba y cerraba su propia conexión). Cada lote es un único
+    mensaje con los destinatarios en el sobre, sin exponerlos en las cabeceras.
+    """
+    nombre = 'email'
+
+    def __init__(self, host, puerto=587, remitente=None, usuario=None, contraseña=None, starttls=True, timeout=30,
+                 destinatarios=None):
+        self.host = host
+        self.puerto = puerto
+        self.remitente = remitente or usuario
+        self.usuario = usuario
+        self.contraseña = contraseña
+        self.starttls = starttls
+        self.timeout = timeout
+        self.destinatarios = destinatarios or []  # destinatarios por defecto de las alertas
+        self._servidor = None
+
+    def _conectar(self):
+        import smtplib
+
+        if self._servidor is None:
+            servidor = smtplib.SMTP(self.host, self.puerto, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    servidor.starttls()
+                if self.usuario:
+                    servidor.login(self.usuario, self.contraseña or "")
+            except Exception:
+                servidor.close()
+                raise
+            self._servidor = servidor
+        return self._servidor
+
+    def enviar(self, destinatarios, mensaje, asunto=None):
+        import smtplib
+        from email.message import EmailMessage
+
+        correo = EmailMessage()
+        correo['Subject'] = asunto or ASUNTO_DEFECTO
+        correo['From'] = self.remitente
+        correo['To'] = self.remitente
+        correo.set_content(mensaje)
+
+        reutilizada = self._servidor is not None
+        try:
+            rechazados = self._conectar().send_message(correo, from_addr=self.remitente, to_addrs=destinatarios)
+        except smtplib.SMTPServerDisconnected:
+            # El servidor cerró la conexión inactiva: se reconecta una vez
+            self.cerrar()
+            if not reutilizada:
+                raise
+            rechazados = self._conectar().send_message(correo, from_addr=self.remitente, to_addrs=destinatarios)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError) as e:
+            raise ErrorEnvioPermanente(str(e))
+
+        if rechazados:
+            print(f"⚠️  Destinatarios rechazados por el servidor SMTP: {', '.join(rechazados)}")
+
+    def cerrar(self):
+        if self._servidor is not None:
+            try:
+                self._servidor.quit()
+            except Exception:
+                self._servidor.close()
+            self._servidor = None
+
+
+
+class CanalHTTP:
+    """
+    Envío a una pasarela HTTP tipo WhatsApp: un POST JSON {'destinatarios', 'mensaje', 'asunto'}
+    por lote sobre una conexión keep-alive. 429 y 5xx se reintentan; el resto de 4xx son permanentes.
+    """
+    nombre = 'whatsapp'
+
+    def __init__(self, url, token=None, timeout=30):
+        from urllib.parse import urlsplit
+
+        partes = urlsplit(url)
+        self.https = partes.scheme == 'https'
+        self.host = partes.hostname
+        self.puerto = partes.port
+        self.ruta = (partes.path or "/") + (f"?{partes.query}" if partes.query else "")
+        self.token = token
+        self.timeout = timeout
+        self._conexion = None
+
+    def _conectar(self):
+        import http.client
+
+        if self._conexion is None:
+            clase = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conexion = clase(self.host, self.puerto, timeout=self.timeout)
+        return self._conexion
+
+    def _post(self, cuerpo, cabeceras):
+        conexion = self._conectar()
+        conexion.request("POST", self.ruta, body=cuerpo, headers=cabeceras)
+        respuesta = conexion.getresponse()
+        # Leer la respuesta completa es necesario para reutilizar la conexión
+        return respuesta.status, respuesta.read()
+
+    def enviar(self, destinatarios, mensaje, asunto=None):
+        import http.client
+
+        cuerpo = json.dumps({'destinatarios': destinatarios, 'mensaje': mensaje, 'asunto': asunto}, ensure_ascii=False).encode("utf-8")
+        cabeceras = {'Content-Type': 'application/json; charset=utf-8'}
+        if self.token:
+            cabeceras['Authorization'] = f"Bearer {self.token}"
+
+        reutilizada = self._conexion is not None
+        try:
+            estado, contenido = self._post(cuerpo, cabeceras)
+        except (http.client.HTTPException, ConnectionError):
+            # Conexión keep-alive cerrada por el servidor: se reconecta una vez
+            self.cerrar()
+            if not reutilizada:
+                raise
+            estado, contenido = self._post(cuerpo, cabeceras)
+
+        if 200 <= estado < 300:
+            return
+        detalle = f"HTTP {estado}: {contenido[:200].decode('utf-8', 'replace')}"
+        if estado == 429 or estado >= 500:
+            raise RuntimeError(detalle)
+        raise ErrorEnvioPermanente(detalle)
+
+    def cerrar(self):
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+
+
+class DespachadorNotificaciones:
+    """
+    Trabajadores en segundo plano (un hilo por canal) que vacían la cola persistente.
+    Cada hilo mantiene abierta la conexión de su canal mientras haya envíos y la cierra
+    tras un periodo de inactividad; encolar solo despierta al trabajador (avisar).
+    """
+    def __init__(self, cola, canales, intervalo_sondeo=5.0, inactividad_maxima=60.0, verbose=False):
+        """
+        :param cola: ColaNotificaciones
+        :param canales: Diccionario {nombre: canal} (CanalSMTP, CanalHTTP u objeto con enviar/cerrar)
+        :param intervalo_sondeo: Segundos entre revisiones de la cola sin avisos (reintentos vencidos)
+        :param inactividad_maxima: Segundos sin envíos tras los que se cierra la conexión del canal
+        """
+        self.cola = cola
+        self.canales = canales
+        self.intervalo_sondeo = intervalo_sondeo
+        self.inactividad_maxima = inactividad_maxima
+        self.verbose = verbose
+        self._avisos = {nombre: threading.Event() for nombre in canales}
+        self._detener = threading.Event()
+        self._hilos = []
+
+    def iniciar(self):
+        """Arranca un hilo trabajador por canal (idempotente)."""
+        if self._hilos:
+            return self
+        for nombre, canal in self.canales.items():
+            hilo = threading.Thread(target=self._trabajar, args=(nombre, canal), name=f"notificaciones-{nombre}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        return self
+
+    def avisar(self, canal=None):
+        """Despierta al trabajador del canal (o a todos) para que revise la cola."""
+        for nombre, aviso in self._avisos.items():
+            if canal is None or nombre == canal:
+                aviso.set()
+
+    def encolar(self, canal, destinatarios, mensaje, asunto=None, deduplicar=True):
+        """
+        Encola una notificación y despierta al trabajador del canal. No espera al envío.
+        :param deduplicar: Descartar la notificación si la misma ya se encoló dentro de la ventana
+        :return: Número de lotes encolados o None si el canal no está configurado o hubo error
+        """
+        from helpers.metricas import ENVIOS_NOTIFICACION
+
+        if canal not in self.canales:
+            print(f"⚠️  Canal de notificación no configurado: {canal}")
+            return None
+        try:
+            lotes = self.cola.encolar(canal, destinatarios, mensaje, asunto, deduplicar=deduplicar)
+        except Exception as e:
+            print(f"❌ Error al encolar la notificación ({canal}): {e}")
+            return None
+
+        if lotes:
+            self.avisar(canal)
+        else:
+            ENVIOS_NOTIFICACION.incrementar(canal=canal, resultado="duplicada")
+        if self.verbose:
+            print(f"📬 Notificación {canal}: {lotes} lotes encolados" if lotes else f"📭 Notificación {canal} duplicada: no se encola")
+        return lotes
+
+    def _trabajar(self, nombre, canal):
+        """Bucle de un canal: reserva lotes vencidos, los envía con la misma conexión y registra el resultado."""
+        from helpers.metricas import ENVIOS_NOTIFICACION
+
+        ultimo_envio = None
+        while not self._detener.is_set():
+            try:
+                lotes = self.cola.reservar(nombre)
+            except Exception as e:
+                print(f"❌ Error leyendo la cola de notificaciones ({nombre}): {e}")
+                lotes = []
+
+            if not lotes:
+                if ultimo_envio is not None and time.monotonic() - ultimo_envio > self.inactividad_maxima:
+                    canal.cerrar()
+                    ultimo_envio = None
+                self._avisos[nombre].wait(self.intervalo_sondeo)
+                self._avisos[nombre].clear()
+                continue
+
+            for lote in lotes:
+                try:
+                    canal.enviar(lote['destinatarios'], lote['mensaje'], lote['asunto'])
+                    self.cola.completar(lote['id'])
+                    resultado = "enviada"
+                except ErrorEnvioPermanente as e:
+                    resultado = self.cola.fallar(lote['id'], e, permanente=True)
+                    print(f"❌ Notificación {nombre} rechazada: {e}")
+                except Exception as e:
+                    canal.cerrar()
+                    resultado = self.cola.fallar(lote['id'], e)
+                    print(f"⚠️  Error enviando notificación {nombre} ({resultado}): {e}")
+                ENVIOS_NOTIFICACION.incrementar(canal=nombre, resultado=resultado)
+                if self.verbose and resultado == "enviada":
+                    print(f"📤 Notificación {nombre} enviada a {len(lote['destinatarios'])} destinatarios")
+            ultimo_envio = time.monotonic()
+
+        canal.cerrar()
+
+    def vaciar(self, timeout=ESPERA_SALIDA):
+        """
+        Espera a que se envíen los lotes vencidos de los canales del despachador (no los que esperan un reintento).
+        :return: True si la cola quedó vacía antes del timeout
+        """
+        limite = time.monotonic() + timeout
+        self.avisar()
+        while time.monotonic() < limite:
+            try:
+                if self.cola.pendientes(list(self.canales)) == 0:
+                    return True
+            except Exception as e:
+                print(f"❌ Error consultando la cola de notificaciones: {e}")
+                return False
+            time.sleep(0.05)
+        return False
+
+    def detener(self, timeout=ESPERA_SALIDA):
+        """Vacía la cola (hasta timeout), detiene los trabajadores y cierra las conexiones."""
+        vacia = self.vaciar(timeout) if self._hilos else True
+        self._detener.set()
+        self.avisar()
+        for hilo in self._hilos:
+            hilo.join(timeout=max(1.0, timeout))
+        self._hilos = []
+        if not vacia:
+            print("⚠️  Quedan notificaciones pendientes: se enviarán en la siguiente ejecución")
+        return vacia
+
+
+
+def crear_canales(configuracion):
+    """Instancia los canales configurados (cargar_configuracion_notificaciones)."""
+    canales = {}
+    if configuracion.get('email', {}).get('host'):
+        canales['email'] = CanalSMTP(**configuracion['email'])
+    if configuracion.get('whatsapp', {}).get('url'):
+        canales['whatsapp'] = CanalHTTP(**configuracion['whatsapp'])
+    return canales
+
+
+
+def obtener_despachador(verbose=False):
+    """
+    Despachador del proceso (creado y arrancado en el primer uso) con los canales de
+    notificaciones.info. Al terminar el proceso se espera hasta ESPERA_SALIDA segundos
+    a que se envíe lo encolado; el resto queda en la cola persistente.
+    :return: DespachadorNotificaciones o None si no hay ningún canal configurado
+    """
+    global _despachador
+
+    with _bloqueo_despachador:
+        if _despachador is None:
+            from helpers.config_loader import cargar_configuracion_notificaciones
+
+            configuracion = cargar_configuracion_notificaciones(verbose=verbose)
+            canales = crear_canales(configuracion)
+            if not canales:
+                return None
+
+            opciones_cola = configuracion.get('cola', {})
+            cola = ColaNotificaciones(
+                ventana_deduplicacion=opciones_cola.get('ventana_deduplicacion', VENTANA_DEDUPLICACION),
+                tamaño_lote=opciones_cola.get('tamano_lote', TAMAÑO_LOTE),
+                reintentos_maximos=opciones_cola.get('reintentos_maximos', REINTENTOS_MAXIMOS)
+            )
+            try:
+                cola.purgar()
+            except Exception as e:
+                print(f"❌ Error purgando la cola de notificaciones: {e}")
+            _despachador = DespachadorNotificaciones(cola, canales, verbose=verbose).iniciar()
+            atexit.register(_despachador.detener)
+        return _despachador
@@ -89,6 +89,141 @@ def cargar_configuracion_alpha_vantage(verbose=False):
 
 
 
+def cargar_limites_twelvedata(verbose=False):
+    """
+    Carga los límites opcionales de Twelve Data usados por el backfill desde twelvedata.info
+    (max_registros_por_peticion, peticiones_por_minuto, backfill_hilos).
+    """
+    CONFIG_TWELVEDATA = os.path.join(os.path.dirname(__file__), "../../conf/twelvedata.info")
+
+    config_twelvedata = configparser.ConfigParser()
+    config_twelvedata.read(CONFIG_TWELVEDATA)
+
+    opciones = {
+        'max_registros_por_peticion': 'max_registros',
+        'peticiones_por_minuto': 'peticiones_por_minuto',
+        'backfill_hilos': 'backfill_hilos'
+    }
+
+    limites = {}
+    for opcion, clave in opciones.items():
+        try:
+            limites[clave] = config_twelvedata.getint("TwelveData", opcion)
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            continue
+        except ValueError as e:
+            if verbose:
+                print(f"    ⚠️  Valor inválido para '{opcion}' en twelvedata.info: {e}")
+
+    if verbose and limites:
+        print(f"    ✅ Límites Twelve Data cargados: {limites}")
+
+    return limites
+
+
+
+def cargar_opciones_reportes(verbose=False):
+    """
+    Carga las opciones opcionales de generación de reportes desde reportes.info, sección [Reportes]
+    (procesos: número de procesos para los artefactos por símbolo, 0 = uno por núcleo, 1 = en serie;
+    modo_dashboard: 'compartido' o 'autonomo'; comprimir_dashboard: yes/no; ventana_completa y
+    puntos_<panel>: barras recientes sin reducir y puntos por serie de cada panel de los gráficos).
+    """
+    CONFIG_REPORTES = os.path.join(os.path.dirname(__file__), "../../conf/reportes.info")
+
+    config_reportes = configparser.ConfigParser()
+    config_reportes.read(CONFIG_REPORTES)
+
+    lectores = {
+        'procesos': config_reportes.getint,
+        'modo_dashboard': config_reportes.get,
+        'comprimir_dashboard': config_reportes.getboolean,
+        'ventana_completa': config_reportes.getint
+    }
+    if config_reportes.has_section("Reportes"):
+        lectores.update({opcion: config_reportes.getint for opcion in config_reportes.options("Reportes")
+                         if opcion.startswith("puntos_")})
+
+    opciones = {}
+    for opcion, leer in lectores.items():
+        try:
+            opciones[opcion] = leer("Reportes", opcion)
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            continue
+        except ValueError as e:
+            if verbose:
+                print(f"    ⚠️  Valor inválido para '{opcion}' en reportes.info: {e}")
+
+    if verbose and opciones:
+        print(f"    ✅ Opciones de reportes cargadas: {opciones}")
+
+    return opciones
+
+
+
+def cargar_configuracion_notificaciones(verbose=False):
+    """
+    Carga los canales de envío de notificaciones desde notificaciones.info (secciones [SMTP] y [WhatsApp])
+    y sus credenciales desde .snoitcennoc.info, más las opciones de la cola ([Cola]) y de la agrupación
+    de alertas ([Resumen]). Los canales sin sección no se configuran.
+    :return: Diccionario {canal: opciones} (vacío si no hay ningún canal configurado)
+    """
+    CONFIG_NOTIFICACIONES = os.path.join(os.path.dirname(__file__), "../../conf/notificaciones.info")
+    CONFIG_SNOITCENNOC = os.path.join(os.path.dirname(__file__), "../../conf/.snoitcennoc.info")
+
+    config_notificaciones = configparser.ConfigParser()
+    config_notificaciones.read(CONFIG_NOTIFICACIONES)
+
+    config_snoitcennoc = configparser.ConfigParser()
+    config_snoitcennoc.read(CONFIG_SNOITCENNOC)
+
+    def credencial(seccion, opcion):
+        encriptada = config_snoitcennoc.get(seccion, opcion, fallback=None)
+        return base64.b64decode(encriptada).decode("utf-8") if encriptada else None
+
+    canales = {}
+    try:
+        if config_notificaciones.has_section("SMTP"):
+            smtp = config_notificaciones["SMTP"]
+            canales['email'] = {
+                'host': smtp.get("host"),
+                'puerto': smtp.getint("puerto", 587),
+                'starttls': smtp.getboolean("starttls", True),
+                'usuario': smtp.get("usuario"),
+                'contraseña': credencial("SMTP", "password"),
+                'remitente': smtp.get("remitente", smtp.get("usuario")),
+                'destinatarios': [d.strip() for d in smtp.get("destinatarios", "").split(",") if d.strip()]
+            }
+
+        if config_notificaciones.has_section("WhatsApp"):
+            canales['whatsapp'] = {
+                'url': config_notificaciones.get("WhatsApp", "url"),
+                'token': credencial("WhatsApp", "token")
+            }
+
+        # Agrupación de alertas: ventana[.estrategia[.destinatario]], fuerza_inmediata[...], fuerza_minima[...]
+        if config_notificaciones.has_section("Resumen"):
+            canales['resumen'] = {clave: float(valor) for clave, valor in config_notificaciones["Resumen"].items()}
+
+        if config_notificaciones.has_section("Cola"):
+            cola = config_notificaciones["Cola"]
+            canales['cola'] = {
+                clave: cola.getint(clave)
+                for clave in ('ventana_deduplicacion', 'reintentos_maximos', 'tamano_lote')
+                if clave in cola
+            }
+    except (configparser.Error, ValueError) as e:
+        print(f"❌ Configuración de notificaciones inválida en notificaciones.info: {e}")
+        return {}
+
+    if verbose:
+        configurados = [canal for canal in canales if canal not in ('cola', 'resumen')]
+        print(f"    {'✅' if configurados else '⚠️ '} Canales de notificación: {', '.join(configurados) or 'ninguno'}")
+
+    return canales
+
+
+
 def cargar_configuracion_apis(verbose=False):
     """
     Carga configuración para todas las APIs disponibles
@@ -103,6 +238,7 @@ def cargar_configuracion_apis(verbose=False):
             'url_base_path': url_base_path,
             'api_key': api_key
         }
+        config_apis['twelvedata'].update(cargar_limites_twelvedata(verbose=verbose))
         if verbose:
             print("    ✅ Configuración Twelve Data cargada")
     
@@ -1,10 +1,18 @@
 import os
-
-import os
+import atexit
+import threading
 from datetime import datetime
 
+
+# Archivos de log abiertos (se reutilizan en lugar de reabrir el archivo en cada escritura)
+_archivos_log = {}
+_bloqueo_log = threading.Lock()
+# En modo debug las escrituras se encolan y las hace un hilo (helpers.log_asincrono)
+_escritura_asincrona = False
+
 def limpiar_log(log_file):
     """Borra el archivo de log si existe y lo crea vacío. Si el directorio no existe, lo crea."""
+    cerrar_log(log_file)
     log_dir = os.path.dirname(log_file)
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
@@ -14,10 +22,42 @@ def limpiar_log(log_file):
         f.write("")
     os.chmod(log_file, 0o666)  # Establecer permisos rw-rw-rw-
 
+def _obtener_archivo_log(log_file):
+    """Devuelve el archivo de log abierto en modo append con buffer de línea, abriéndolo la primera vez."""
+    archivo = _archivos_log.get(log_file)
+    if archivo is None or archivo.closed:
+        archivo = open(log_file, "a", buffering=1)
+        if _escritura_asincrona:
+            from helpers.log_asincrono import EscritorAsincrono
+            archivo = EscritorAsincrono(archivo, nombre=f"log-{os.path.basename(log_file)}")
+        _archivos_log[log_file] = archivo
+    return archivo
+
+def activar_escritura_asincrona():
+    """Las siguientes escrituras de escribir_log se encolan y las vuelca un hilo en segundo plano."""
+    global _escritura_asincrona
+    cerrar_log()
+    _escritura_asincrona = True
+
 def escribir_log(log_file, mensaje):
-    """Escribe un mensaje en el archivo de log."""
-    with open(log_file, "a") as f:
-        f.write(mensaje + "\n")
+    """Escribe un mensaje en el archivo de log (cada línea se vuelca al disco al escribirse)."""
+    with _bloqueo_log:
+        _obtener_archivo_log(log_file).write(mensaje + "\n")
+
+def cerrar_log(log_file=None):
+    """Cierra el archivo de log indicado o, si es None, todos los abiertos."""
+    with _bloqueo_log:
+        rutas = [log_file] if log_file else list(_archivos_log)
+        for ruta in rutas:
+            archivo = _archivos_log.pop(ruta, None)
+            if archivo is not None and not archivo.closed:
+                archivo.close()
+                # Con escritura asíncrona, close() vacía la cola; el archivo real se cierra después
+                destino = getattr(archivo, 'destino', None)
+                if destino is not None:
+                    destino.close()
+
+atexit.register(cerrar_log)
 
 def formato_paso(numero_paso, nombre_paso, detalles=None):
     """Formatea la información de un paso para el log"""
@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+
+# Estado de la última ejecución de cada estrategia (una base SQLite compartida, una fila por símbolo)
+RUTA_ESTADO = "/app/tmp/estado_senales.sqlite"
+
+# Mismos códigos que PanelMercados: las señales se guardan como un byte por estrategia (código + 2)
+CODIGOS_SEÑAL = {'VENTA_FUERTE': -2, 'VENTA': -1, 'HOLD': 0, 'COMPRA': 1, 'COMPRA_FUERTE': 2}
+ETIQUETAS_SEÑAL = {codigo: etiqueta for etiqueta, codigo in CODIGOS_SEÑAL.items()}
+CODIGO_DESCONOCIDO = 255
+ETIQUETA_DESCONOCIDA = 'N/A'
+
+# Etiquetas en orden de código: la posición de cada etiqueta es su byte (código + 2)
+ETIQUETAS_ORDENADAS = [ETIQUETAS_SEÑAL[codigo] for codigo in sorted(ETIQUETAS_SEÑAL)]
+
+COLUMNA_FUERZA = 'fuerza_señal'
+COLUMNA_DECISION = 'estrategia_mayoritaria'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado_senales (
+    estrategia TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    fecha TEXT,
+    senales BLOB NOT NULL,
+    fuerza REAL,
+    PRIMARY KEY (estrategia, symbol)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS columnas_senal (
+    estrategia TEXT PRIMARY KEY,
+    columnas TEXT NOT NULL,
+    actualizado REAL NOT NULL
+);
+"""
+
+
+
+def es_columna_señal(columna):
+    """Columnas con la señal de cada estrategia (no sus valores ni descripciones)."""
+    return columna.startswith('estrategia_') and not columna.endswith(('_valor', '_descripcion'))
+
+
+
+def estado_symbol(df):
+    """
+    Extrae el estado de la última barra de un DataFrame de resultados sin recorrer su histórico.
+    :param df: DataFrame analizado (columnas estrategia_* y fuerza_señal)
+    :return: Diccionario {'fecha', 'señales': {columna: etiqueta}, 'fuerza'} o None si está vacío
+    """
+    if df is None or len(df) == 0:
+        return None
+
+    señales = {}
+    for columna in df.columns:
+        if es_columna_señal(columna):
+            valor = df[columna].iat[-1]
+            señales[columna] = valor if valor in CODIGOS_SEÑAL else ETIQUETA_DESCONOCIDA
+
+    fuerza = None
+    if COLUMNA_FUERZA in df.columns:
+        fuerza = df[COLUMNA_FUERZA].iat[-1]
+        fuerza = None if fuerza != fuerza else float(fuerza)  # NaN -> None
+
+    fecha = df['datetime'].iat[-1] if 'datetime' in df.columns else df.index[-1]
+    return {'fecha': str(fecha), 'señales': señales, 'fuerza': fuerza}
+
+
+
+def extraer_estado(resultados_trading):
+    """
+    Estado compacto de todos los símbolos de una estrategia (solo su última barra).
+    :param resultados_trading: Diccionario {symbol: DataFrame}
+    :return: Diccionario {symbol: estado}
+    """
+    return extraer_matriz(resultados_trading).estado()
+
+
+
+class MatrizSeñales:
+    """
+    Estado de una estrategia como matriz (símbolos × columnas de señal) de bytes: código de señal + 2,
+    o CODIGO_DESCONOCIDO si falta. Es la misma codificación que se guarda en SQLite, así cargar,
+    comparar y guardar no convierten celda a celda entre etiquetas y diccionarios.
+    """
+    def __init__(self, symbols, columnas, codigos, fuerza, fechas):
+        """
+        :param symbols: Lista de símbolos (filas)
+        :param columnas: Lista de columnas de señal (columnas)
+        :param codigos: np.ndarray uint8 de forma (símbolos, columnas)
+        :param fuerza: np.ndarray float64 con la fuerza de la señal de cada símbolo (NaN si no hay)
+        :param fechas: Lista con la fecha de la última barra de cada símbolo
+        """
+        self.symbols = list(symbols)
+        self.columnas = list(columnas)
+        self.codigos = codigos
+        self.fuerza = fuerza
+        self.fechas = list(fechas)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def estado_symbol(self, posicion):
+        """Estado de la fila 'posicion' con el formato de estado_symbol."""
+        fuerza = self.fuerza[posicion]
+        return {
+            'fecha': self.fechas[posicion],
+            'señales': {columna: _etiqueta(codigo) for columna, codigo in zip(self.columnas, self.codigos[posicion].tolist())},
+            'fuerza': None if fuerza != fuerza else float(fuerza)
+        }
+
+    def estado(self):
+        """Estado como diccionario {symbol: estado} (formato de extraer_estado)."""
+        return {symbol: self.estado_symbol(posicion) for posicion, symbol in enumerate(self.symbols)}
+
+
+
+def _etiqueta(codigo):
+    return ETIQUETAS_ORDENADAS[codigo] if codigo < len(ETIQUETAS_ORDENADAS) else ETIQUETA_DESCONOCIDA
+
+
+
+def etiquetas_codigos(codigos):
+    """Etiquetas (array object) de un array de bytes; inversa vectorizada de codigos_etiquetas."""
+    import numpy as np
+
+    tabla = np.array(ETIQUETAS_ORDENADAS + [ETIQUETA_DESCONOCIDA] * (256 - len(ETIQUETAS_ORDENADAS)), dtype=object)
+    return tabla[np.asarray(codigos, dtype=np.uint8)]
+
+
+
+def codigos_etiquetas(etiquetas):
+    """Bytes de un array de etiquetas (cualquier forma); lo que no es una señal válida -> CODIGO_DESCONOCIDO."""
+    import numpy as np
+    import pandas as pd
+
+    codigos = pd.Categorical(etiquetas.ravel(), categories=ETIQUETAS_ORDENADAS).codes
+    return np.where(codigos < 0, CODIGO_DESCONOCIDO, codigos).astype(np.uint8).reshape(etiquetas.shape)
+
+
+
+def extraer_matriz(resultados_trading):
+    """
+    Matriz de señales de la última barra de cada símbolo. Por DataFrame solo se lee una fila
+    (iloc[-1]); las posiciones de las columnas se calculan una vez por estructura de columnas.
+    :param resultados_trading: Diccionario {symbol: DataFrame}
+    :return: MatrizSeñales
+    """
+    import numpy as np
+
+    dataframes = [(symbol, df) for symbol, df in (resultados_trading or {}).items() if df is not None and len(df) > 0]
+
+    estructuras = {}
+    for _, df in dataframes:
+        clave = tuple(df.columns)
+        if clave not in estructuras:
+            estructuras[clave] = [columna for columna in clave if es_columna_señal(columna)]
+    columnas = sorted({columna for señales in estructuras.values() for columna in señales})
+
+    # Posiciones de las señales, la fuerza y la fecha en la fila de cada estructura de columnas
+    for clave, señales in estructuras.items():
+        posicion = {columna: i for i, columna in enumerate(clave)}
+        destino = [columnas.index(columna) for columna in señales]
+        estructuras[clave] = (destino, [posicion[columna] for columna in señales],
+                              posicion.get(COLUMNA_FUERZA), posicion.get('datetime'))
+
+    etiquetas = np.full((len(dataframes), len(columnas)), None, dtype=object)
+    fuerza = np.full(len(dataframes), np.nan)
+    fechas = []
+    for fila, (_, df) in enumerate(dataframes):
+        destino, origen, posicion_fuerza, posicion_fecha = estructuras[tuple(df.columns)]
+        valores = df.iloc[-1].to_numpy()
+        etiquetas[fila, destino] = valores[origen]
+        if posicion_fuerza is not None:
+            fuerza[fila] = _a_float(valores[posicion_fuerza])
+        fechas.append(str(valores[posicion_fecha] if posicion_fecha is not None else df.index[-1]))
+
+    return MatrizSeñales([symbol for symbol, _ in dataframes], columnas, codigos_etiquetas(etiquetas), fuerza, fechas)
+
+
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+
+def matriz_estado(datos):
+    """
+    MatrizSeñales a partir de cualquiera de los formatos de estado: una MatrizSeñales,
+    un diccionario {symbol: estado} o un diccionario {symbol: DataFrame}.
+    """
+    import numpy as np
+
+    if isinstance(datos, MatrizSeñales):
+        return datos
+    datos = datos or {}
+    if not all(isinstance(valor, dict) for valor in datos.values()):
+        return extraer_matriz(datos)
+
+    columnas = sorted({columna for estado in datos.values() for columna in estado['señales']})
+    codigos = np.frombuffer(b"".join(_codificar(estado['señales'], columnas) for estado in datos.values()), dtype=np.uint8)
+    fuerza = np.array([np.nan if estado.get('fuerza') is None else estado['fuerza'] for estado in datos.values()], dtype=np.float64)
+    return MatrizSeñales(datos.keys(), columnas, codigos.reshape(len(datos), len(columnas)).copy(), fuerza,
+                         [estado.get('fecha') for estado in datos.values()])
+
+
+
+def comparar_matrices(anterior, actual):
+    """
+    Diferencia vectorizada entre el estado anterior y el actual de una estrategia. Se alinean
+    símbolos y columnas por nombre y solo se generan las celdas que cambiaron. Un símbolo o columna
+    nueva cuenta como cambio desde 'N/A'; los símbolos que ya no están se ignoran.
+    :param anterior: MatrizSeñales (o formato aceptado por matriz_estado) de la ejecución anterior
+    :param actual: MatrizSeñales (o formato aceptado por matriz_estado) de la ejecución actual
+    :return: Lista de transiciones {'symbol', 'columna', 'anterior', 'actual'} ordenadas por símbolo;
+             la fuerza de la señal aparece con columna COLUMNA_FUERZA y valores numéricos (None si falta)
+    """
+    import numpy as np
+    import pandas as pd
+
+    anterior, actual = matriz_estado(anterior), matriz_estado(actual)
+
+    filas = pd.Index(anterior.symbols).get_indexer(actual.symbols)
+    columnas = pd.Index(anterior.columnas).get_indexer(actual.columnas)
+    filas_comunes, columnas_comunes = filas >= 0, columnas >= 0
+
+    previos = np.full(actual.codigos.shape, CODIGO_DESCONOCIDO, dtype=np.uint8)
+    previos[np.ix_(filas_comunes, columnas_comunes)] = anterior.codigos[np.ix_(filas[filas_comunes], columnas[columnas_comunes])]
+    fila_cambio, columna_cambio = np.nonzero(previos != actual.codigos)
+
+    fuerza_previa = np.full(len(actual), np.nan)
+    fuerza_previa[filas_comunes] = anterior.fuerza[filas[filas_comunes]]
+    fuerza_cambio = ~((fuerza_previa == actual.fuerza) | (np.isnan(fuerza_previa) & np.isnan(actual.fuerza)))
+    # Símbolo nuevo: la fuerza pasa de 'N/A' a su valor
+    fuerza_cambio |= ~filas_comunes
+
+    transiciones = [
+        {'symbol': actual.symbols[fila], 'columna': actual.columnas[columna],
+         'anterior': _etiqueta(previo), 'actual': _etiqueta(codigo)}
+        for fila, columna, previo, codigo in zip(fila_cambio.tolist(), columna_cambio.tolist(),
+                                                 previos[fila_cambio, columna_cambio].tolist(),
+                                                 actual.codigos[fila_cambio, columna_cambio].tolist())
+    ]
+    for fila in np.flatnonzero(fuerza_cambio).tolist():
+        transiciones.append({
+            'symbol': actual.symbols[fila], 'columna': COLUMNA_FUERZA,
+            'anterior': ETIQUETA_DESCONOCIDA if filas[fila] < 0 else _float_o_none(fuerza_previa[fila]),
+            'actual': _float_o_none(actual.fuerza[fila])
+        })
+
+    orden = {symbol: posicion for posicion, symbol in enumerate(actual.symbols)}
+    transiciones.sort(key=lambda transicion: orden[transicion['symbol']])
+    return transiciones
+
+
+
+def _float_o_none(valor):
+    return None if valor != valor else float(valor)
+
+
+
+@contextmanager
+def _conectar(ruta):
+    """Abre la base de estado (creando el esquema si no existe) y la cierra al terminar."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    try:
+        # WAL: los lectores no bloquean al escritor y una caída no deja la base a medio escribir
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript(_ESQUEMA)
+        yield conexion
+    finally:
+        conexion.close()
+
+
+
+def _codificar(señales, columnas):
+    """Un byte por columna de señal, en el orden de 'columnas'."""
+    return bytes(CODIGOS_SEÑAL[señales[columna]] + 2 if señales.get(columna) in CODIGOS_SEÑAL else CODIGO_DESCONOCIDO
+                 for columna in columnas)
+
+
+
+def guardar_estado(estrategia, estado, ruta=RUTA_ESTADO, verbose=False, symbols_configurados=None):
+    """
+    Actualiza de forma atómica (una sola transacción) el estado guardado de una estrategia.
+    Solo se sustituyen los símbolos de esta ejecución: un símbolo que no se pudo descargar conserva su
+    último estado (si se borrara, la siguiente ejecución lo vería como nuevo y notificaría N/A→X en todas
+    sus columnas). Se borran únicamente los símbolos que ya no están configurados.
+    :param estado: MatrizSeñales o diccionario {symbol: estado} generado por extraer_estado
+    :param symbols_configurados: Símbolos configurados de la estrategia (None = no se borra ninguno)
+    :return: Número de símbolos guardados o None si hubo error
+    """
+    import numpy as np
+
+    matriz = matriz_estado(estado)
+    columnas = matriz.columnas
+    filas = [(estrategia, symbol, fecha, matriz.codigos[posicion].tobytes(), _float_o_none(matriz.fuerza[posicion]))
+             for posicion, (symbol, fecha) in enumerate(zip(matriz.symbols, matriz.fechas))]
+
+    try:
+        with _conectar(ruta) as conexion:
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila_columnas = conexion.execute("SELECT columnas FROM columnas_senal WHERE estrategia = ?", (estrategia,)).fetchone()
+                columnas_anteriores = json.loads(fila_columnas[0]) if fila_columnas else columnas
+                actuales = set(matriz.symbols)
+                conservados = {symbol: senales for symbol, senales in conexion.execute(
+                    "SELECT symbol, senales FROM estado_senales WHERE estrategia = ?", (estrategia,)) if symbol not in actuales}
+
+                if symbols_configurados is not None:
+                    obsoletos = [symbol for symbol in conservados if symbol not in set(symbols_configurados)]
+                    conexion.executemany("DELETE FROM estado_senales WHERE estrategia = ? AND symbol = ?",
+                                         [(estrategia, symbol) for symbol in obsoletos])
+                    for symbol in obsoletos:
+                        del conservados[symbol]
+
+                # Los bytes se interpretan con las columnas de la estrategia: si cambiaron, se recodifican
+                # los símbolos conservados (las columnas nuevas quedan como desconocidas)
+                if columnas_anteriores != columnas and conservados:
+                    posiciones = np.array([columnas_anteriores.index(c) if c in columnas_anteriores else -1 for c in columnas],
+                                          dtype=np.int64)
+                    existentes = posiciones >= 0
+                    recodificados = []
+                    for symbol, senales in conservados.items():
+                        codigos = np.full(len(columnas), CODIGO_DESCONOCIDO, dtype=np.uint8)
+                        codigos[existentes] = np.frombuffer(senales, dtype=np.uint8)[posiciones[existentes]]
+                        recodificados.append((codigos.tobytes(), estrategia, symbol))
+                    conexion.executemany("UPDATE estado_senales SET senales = ? WHERE estrategia = ? AND symbol = ?",
+                                         recodificados)
+
+                conexion.executemany("INSERT OR REPLACE INTO estado_senales VALUES (?, ?, ?, ?, ?)", filas)
+                conexion.execute("INSERT OR REPLACE INTO columnas_senal VALUES (?, ?, ?)",
+                                 (estrategia, json.dumps(columnas, ensure_ascii=False), time.time()))
+                conexion.execute("COMMIT")
+            except Exception:
+                conexion.execute("ROLLBACK")
+                raise
+    except Exception as e:
+        print(f"❌ Error al guardar el estado de señales de {estrategia}: {e}")
+        return None
+
+    if verbose:
+        print(f"💾 Estado de señales guardado: {estrategia} ({len(filas)} símbolos, {len(conservados)} conservados "
+              f"sin datos en esta ejecución, {len(columnas)} estrategias)")
+    return len(filas)
+
+
+
+def cargar_estado(estrategia, ruta=RUTA_ESTADO, verbose=False):
+    """
+    Carga el estado guardado en la ejecución anterior de una estrategia.
+    :return: Diccionario {symbol: estado} (vacío si no hay ejecución anterior) o None si hubo error
+    """
+    matriz = cargar_matriz(estrategia, ruta, verbose)
+    return None if matriz is None else matriz.estado()
+
+
+
+def cargar_matriz(estrategia, ruta=RUTA_ESTADO, verbose=False):
+    """
+    Carga el estado guardado en la ejecución anterior como MatrizSeñales, uniendo los bytes
+    de cada símbolo sin decodificarlos.
+    :return: MatrizSeñales (vacía si no hay ejecución anterior) o None si hubo error
+    """
+    import numpy as np
+
+    if not os.path.exists(ruta):
+        return MatrizSeñales([], [], np.empty((0, 0), dtype=np.uint8), np.empty(0), [])
+
+    try:
+        with _conectar(ruta) as conexion:
+            # Columnas y filas en la misma transacción de lectura (coherentes con la misma escritura)
+            conexion.execute("BEGIN")
+            fila_columnas = conexion.execute("SELECT columnas FROM columnas_senal WHERE estrategia = ?", (estrategia,)).fetchone()
+            filas = conexion.execute("SELECT symbol, fecha, senales, fuerza FROM estado_senales WHERE estrategia = ?",
+                                     (estrategia,)).fetchall()
+            conexion.execute("COMMIT")
+    except Exception as e:
+        print(f"❌ Error al cargar el estado de señales de {estrategia}: {e}")
+        return None
+
+    columnas = json.loads(fila_columnas[0]) if fila_columnas else []
+    codigos = np.frombuffer(b"".join(fila[2] for fila in filas), dtype=np.uint8).reshape(len(filas), len(columnas)).copy()
+    fuerza = np.array([np.nan if fila[3] is None else fila[3] for fila in filas], dtype=np.float64)
+    matriz = MatrizSeñales([fila[0] for fila in filas], columnas, codigos, fuerza, [fila[1] for fila in filas])
+
+    if verbose:
+        print(f"📂 Estado de señales cargado: {estrategia} ({len(matriz)} símbolos)")
+    return matriz
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from helpers.estado_senales import es_columna_señal, codigos_etiquetas, etiquetas_codigos
+
+
+# Índice de cambios de señal de todo el histórico (una fila por transición de cada estrategia)
+RUTA_EVENTOS = "/app/tmp/eventos_senales.sqlite"
+
+# Fechas en UTC sin zona: el texto se ordena igual que las fechas
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+COLUMNAS_EVENTO = ['symbol', 'columna', 'fecha', 'anterior', 'actual', 'precio']
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS eventos_senales (
+    estrategia TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    columna TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    anterior INTEGER NOT NULL,
+    actual INTEGER NOT NULL,
+    precio REAL,
+    PRIMARY KEY (estrategia, symbol, columna, fecha)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_eventos_fecha ON eventos_senales (estrategia, fecha);
+CREATE TABLE IF NOT EXISTS eventos_progreso (
+    estrategia TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    ultima_fecha TEXT NOT NULL,
+    PRIMARY KEY (estrategia, symbol)
+) WITHOUT ROWID;
+"""
+
+
+
+def _fechas(df):
+    """Fechas de las barras como datetime64 en UTC sin zona (columna datetime o índice)."""
+    import pandas as pd
+
+    fechas = df['datetime'] if 'datetime' in df.columns else df.index
+    # Ya en datetime64 (lo habitual) se evita to_datetime, que inspecciona los valores uno a uno
+    fechas = pd.DatetimeIndex(fechas) if pd.api.types.is_datetime64_any_dtype(fechas) else pd.DatetimeIndex(pd.to_datetime(fechas))
+    if fechas.tz is not None:
+        fechas = fechas.tz_convert('UTC').tz_localize(None)
+    return fechas
+
+
+
+def extraer_transiciones(df, symbol=None, columnas=None, codigos=False):
+    """
+    Transiciones de señal de todo el histórico de un DataFrame de resultados, sin recorrer filas:
+    las señales se codifican como una matriz (barras × estrategias) y se compara cada barra con la anterior.
+    :param df: DataFrame analizado (columnas estrategia_*, datetime y Close)
+    :param symbol: Símbolo con el que se etiquetan los eventos
+    :param columnas: Columnas de señal a revisar (por defecto todas las estrategia_*)
+    :param codigos: Si es True, 'anterior' y 'actual' se devuelven como bytes en lugar de etiquetas
+    :return: DataFrame con COLUMNAS_EVENTO en orden cronológico
+    """
+    import numpy as np
+    import pandas as pd
+
+    columnas = [columna for columna in df.columns if es_columna_señal(columna)] if columnas is None else list(columnas)
+    if len(df) < 2 or not columnas:
+        return pd.DataFrame(columns=COLUMNAS_EVENTO)
+
+    matriz = codigos_etiquetas(df[columnas].to_numpy(dtype=object))
+    fila, columna = np.nonzero(matriz[1:] != matriz[:-1])
+    anterior, actual = matriz[fila, columna], matriz[fila + 1, columna]
+    fila += 1
+
+    precios = df['Close'].to_numpy(dtype=np.float64)[fila] if 'Close' in df.columns else np.full(len(fila), np.nan)
+    return pd.DataFrame({
+        'symbol': symbol,
+        'columna': np.asarray(columnas, dtype=object)[columna],
+        'fecha': _fechas(df)[fila],
+        'anterior': anterior if codigos else etiquetas_codigos(anterior),
+        'actual': actual if codigos else etiquetas_codigos(actual),
+        'precio': precios
+    }, columns=COLUMNAS_EVENTO)
+
+
+
+@contextmanager
+def _conectar(ruta):
+    """Abre el índice de eventos (creando el esquema si no existe) y lo cierra al terminar."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    try:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.executescript(_ESQUEMA)
+        yield conexion
+    finally:
+        conexion.close()
+
+
+
+def actualizar_eventos(estrategia, resultados_trading, ruta=RUTA_EVENTOS, verbose=False):
+    """
+    Añade al índice las transiciones nuevas de cada símbolo. Solo se procesan las barras posteriores
+    a la última indexada; esa última barra se vuelve a evaluar porque pudo estar incompleta.
+    :param resultados_trading: Diccionario {symbol: DataFrame}
+    :return: Número de eventos añadidos o None si hubo error
+    """
+    import pandas as pd
+
+    try:
+        with _conectar(ruta) as conexion:
+            progreso = dict(conexion.execute(
+                "SELECT symbol, ultima_fecha FROM eventos_progreso WHERE estrategia = ?", (estrategia,)).fetchall())
+
+            borrados, filas, avances = [], [], []
+            for symbol, df in (resultados_trading or {}).items():
+                if df is None or len(df) == 0:
+                    continue
+                fechas = _fechas(df)
+                inicio = 0
+                ultima = progreso.get(symbol)
+                if ultima is not None:
+                    posicion = fechas.searchsorted(pd.Timestamp(ultima))
+                    if posicion < len(fechas) and fechas[posicion] == pd.Timestamp(ultima):
+                        # Se compara desde la barra anterior a la última indexada y se rehacen sus eventos
+                        inicio = max(posicion - 1, 0)
+                        borrados.append((estrategia, symbol, ultima))
+                    elif posicion >= len(fechas):
+                        continue
+
+                avances.append((estrategia, symbol, fechas[-1].strftime(FORMATO_FECHA)))
+                eventos = extraer_transiciones(df.iloc[inicio:], symbol, codigos=True)
+                if len(eventos) == 0:
+                    continue
+                fechas_evento = eventos['fecha'].dt.strftime(FORMATO_FECHA).tolist()
+                filas.extend(zip([estrategia] * len(eventos), [symbol] * len(eventos), eventos['columna'].tolist(), fechas_evento,
+                                 eventos['anterior'].tolist(), eventos['actual'].tolist(),
+                                 [None if precio != precio else precio for precio in eventos['precio'].tolist()]))
+
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                conexion.executemany("DELETE FROM eventos_senales WHERE estrategia = ? AND symbol = ? AND fecha >= ?", borrados)
+                conexion.executemany("INSERT OR REPLACE INTO eventos_senales VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+                conexion.executemany("INSERT OR REPLACE INTO eventos_progreso VALUES (?, ?, ?)", avances)
+                conexion.execute("COMMIT")
+            except Exception:
+                conexion.execute("ROLLBACK")
+                raise
+    except Exception as e:
+        print(f"❌ Error al actualizar los eventos de señal de {estrategia}: {e}")
+        return None
+
+    if verbose:
+        print(f"🗂️  Eventos de señal indexados: {estrategia} ({len(filas)} eventos de {len(avances)} símbolos)")
+    return len(filas)
+
+
+
+def _a_texto(fecha):
+    """Fecha (texto, datetime o Timestamp) en el formato del índice."""
+    import pandas as pd
+
+    fecha = pd.Timestamp(fecha)
+    if fecha.tz is not None:
+        fecha = fecha.tz_convert('UTC').tz_localize(None)
+    return fecha.strftime(FORMATO_FECHA)
+
+
+
+def consultar_eventos(estrategia, symbol=None, columna=None, desde=None, hasta=None, ruta=RUTA_EVENTOS):
+    """
+    Eventos indexados de una estrategia, filtrados por símbolo, columna y rango de fechas (usa los índices,
+    no relee históricos).
+    :return: DataFrame con COLUMNAS_EVENTO en orden cronológico o None si hubo error
+    """
+    import pandas as pd
+
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=COLUMNAS_EVENTO)
+
+    condiciones, parametros = ["estrategia = ?"], [estrategia]
+    for campo, valor, operador in (('symbol', symbol, '='), ('columna', columna, '='),
+                                   ('fecha', desde, '>='), ('fecha', hasta, '<=')):
+        if valor is not None:
+            condiciones.append(f"{campo} {operador} ?")
+            parametros.append(_a_texto(valor) if campo == 'fecha' else valor)
+
+    try:
+        with _conectar(ruta) as conexion:
+            filas = conexion.execute(
+                f"SELECT symbol, columna, fecha, anterior, actual, precio FROM eventos_senales "
+                f"WHERE {' AND '.join(condiciones)} ORDER BY fecha, symbol, columna", parametros).fetchall()
+    except Exception as e:
+        print(f"❌ Error al consultar los eventos de señal de {estrategia}: {e}")
+        return None
+
+    eventos = pd.DataFrame(filas, columns=COLUMNAS_EVENTO)
+    eventos['fecha'] = pd.to_datetime(eventos['fecha'], format=FORMATO_FECHA)
+    eventos['anterior'] = etiquetas_codigos(eventos['anterior'].to_numpy())
+    eventos['actual'] = etiquetas_codigos(eventos['actual'].to_numpy())
+    return eventos
+
+
+
+def ultimos_cambios(estrategia, ruta=RUTA_EVENTOS):
+    """
+    Último cambio de cada estrategia de señal por símbolo y cuánto lleva vigente (hasta la última barra indexada).
+    :return: DataFrame con COLUMNAS_EVENTO + ['ultima_barra', 'vigencia'] o None si hubo error
+    """
+    import pandas as pd
+
+    columnas = COLUMNAS_EVENTO + ['ultima_barra', 'vigencia']
+    if not os.path.exists(ruta):
+        return pd.DataFrame(columns=columnas)
+
+    try:
+        with _conectar(ruta) as conexion:
+            # Con MAX() SQLite toma el resto de columnas de la fila del máximo
+            filas = conexion.execute(
+                "SELECT e.symbol, e.columna, MAX(e.fecha), e.anterior, e.actual, e.precio, p.ultima_fecha "
+                "FROM eventos_senales e JOIN eventos_progreso p ON p.estrategia = e.estrategia AND p.symbol = e.symbol "
+                "WHERE e.estrategia = ? GROUP BY e.symbol, e.columna ORDER BY e.symbol, e.columna", (estrategia,)).fetchall()
+    except Exception as e:
+        print(f"❌ Error al consultar los últimos cambios de señal de {estrategia}: {e}")
+        return None
+
+    cambios = pd.DataFrame(filas, columns=COLUMNAS_EVENTO + ['ultima_barra'])
+    cambios['fecha'] = pd.to_datetime(cambios['fecha'], format=FORMATO_FECHA)
+    cambios['ultima_barra'] = pd.to_datetime(cambios['ultima_barra'], format=FORMATO_FECHA)
+    cambios['vigencia'] = cambios['ultima_barra'] - cambios['fecha']
+    cambios['anterior'] = etiquetas_codigos(cambios['anterior'].to_numpy())
+    cambios['actual'] = etiquetas_codigos(cambios['actual'].to_numpy())
+    return cambios[columnas]
@@ -0,0 +1,270 @@
+import os
+import json
+import math
+import time
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage no se mide el RSS
+    resource = None
+
+
+# Instrumentación activa del proceso (la registra DebugMotorBolsaIA al crearse)
+_instrumentacion_activa = None
+
+
+
+def _rss_pico_kb():
+    """Pico de memoria residente del proceso en KB (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if os.uname().sysname == 'Darwin' else pico
+
+
+
+def _percentil(valores_ordenados, percentil):
+    """Percentil por el método del rango más cercano sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return None
+    indice = max(0, math.ceil(percentil / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+
+class Instrumentacion:
+    """
+    Mide etapas del proceso (spans) y latencias de los proveedores de datos.
+    Cada span registra tiempo real y de CPU, pico de RSS del proceso y, si está activado
+    tracemalloc, la memoria Python asignada y el pico alcanzado dentro del span.
+    """
+    def __init__(self, medir_memoria=False):
+        """
+        :param medir_memoria: Si es True, activa tracemalloc (más preciso pero ralentiza la ejecución)
+        """
+        self.medir_memoria = medir_memoria
+        self.inicio = datetime.now()
+        self._inicio_perf = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+        self.spans = []
+        self.latencias = []
+        self.metricas = {}
+        # Objetos con iniciar_etapa(nombre, registro) y finalizar_etapa(token) (p.ej. el perfilador)
+        self.observadores = []
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+
+        if medir_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _pila(self):
+        """Pila de spans abiertos del hilo actual."""
+        if not hasattr(self._local, 'pila'):
+            self._local.pila = []
+        return self._local.pila
+
+    @contextmanager
+    def span(self, nombre, **atributos):
+        """
+        Mide el bloque de código como una etapa del proceso. El diccionario devuelto admite
+        añadir datos durante el span, por ejemplo registro['filas'] = len(df).
+        :param nombre: Nombre de la etapa (p.ej. 'indicadores')
+        :param atributos: Contexto adicional (symbol, estrategia, ...)
+        """
+        pila = self._pila()
+        memoria = self.medir_memoria and tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread()
+
+        registro = {
+            'nombre': nombre,
+            'padre': pila[-1]['registro']['nombre'] if pila else None,
+            'nivel': len(pila),
+            'inicio': datetime.now().isoformat(timespec='milliseconds'),
+            **atributos
+        }
+        marco = {'registro': registro, 'pico_memoria': 0}
+        tokens = [(observador, observador.iniciar_etapa(nombre, registro)) for observador in self.observadores]
+
+        if memoria:
+            # El pico del span padre se guarda antes de reiniciar el contador para el hijo
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1]['pico_memoria'] = max(pila[-1]['pico_memoria'], pico)
+            tracemalloc.reset_peak()
+            marco['memoria_inicial'] = actual
+
+        rss_inicial = _rss_pico_kb()
+        inicio_cpu = time.process_time()
+        inicio = time.perf_counter()
+        pila.append(marco)
+
+        try:
+            yield registro
+        except Exception as e:
+            registro['error'] = str(e)
+            raise
+        finally:
+            registro['duracion_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+            registro['cpu_ms'] = round((time.process_time() - inicio_cpu) * 1000, 3)
+            rss_final = _rss_pico_kb()
+            if rss_final is not None:
+                registro['rss_pico_kb'] = rss_final
+                registro['rss_pico_delta_kb'] = rss_final - rss_inicial
+
+            if memoria:
+                actual, pico = tracemalloc.get_traced_memory()
+                marco['pico_memoria'] = max(marco['pico_memoria'], pico)
+                registro['memoria_delta_kb'] = round((actual - marco['memoria_inicial']) / 1024, 1)
+                registro['memoria_pico_kb'] = round((marco['pico_memoria'] - marco['memoria_inicial']) / 1024, 1)
+
+            pila.pop()
+            if memoria and pila:
+                pila[-1]['pico_memoria'] = max(pila[-1]['pico_memoria'], marco['pico_memoria'])
+
+            for observador, token in reversed(tokens):
+                observador.finalizar_etapa(token)
+
+            with self._bloqueo:
+                self.spans.append(registro)
+
+    def registrar_latencia(self, proveedor, segundos, correcto=True, **atributos):
+        """
+        Registra la duración de una petición a un proveedor de datos.
+        :param proveedor: Nombre del proveedor (p.ej. 'Twelve Data')
+        :param segundos: Duración de la petición en segundos
+        :param correcto: False si la petición falló
+        """
+        with self._bloqueo:
+            self.latencias.append({
+                'proveedor': proveedor,
+                'latencia_ms': round(segundos * 1000, 3),
+                'correcto': correcto,
+                **atributos
+            })
+
+    def registrar_metrica(self, nombre, valor):
+        """Registra un valor suelto para el resumen (contadores, tamaños, ...)."""
+        with self._bloqueo:
+            self.metricas[nombre] = valor
+
+    def resumen(self):
+        """
+        Construye el resumen de la ejecución: totales por etapa, latencias por proveedor y spans.
+        :return: Diccionario serializable a JSON
+        """
+        with self._bloqueo:
+            spans = list(self.spans)
+            latencias = list(self.latencias)
+            metricas = dict(self.metricas)
+
+        por_etapa = {}
+        for registro in spans:
+            etapa = por_etapa.setdefault(registro['nombre'], {'llamadas': 0, 'duracion_ms': 0.0, 'cpu_ms': 0.0, 'filas': 0, 'errores': 0})
+            etapa['llamadas'] += 1
+            etapa['duracion_ms'] = round(etapa['duracion_ms'] + registro['duracion_ms'], 3)
+            etapa['cpu_ms'] = round(etapa['cpu_ms'] + registro['cpu_ms'], 3)
+            etapa['filas'] += registro.get('filas', 0) or 0
+            etapa['errores'] += 'error' in registro
+
+        por_proveedor = {}
+        for latencia in latencias:
+            por_proveedor.setdefault(latencia['proveedor'], []).append(latencia)
+        proveedores = {}
+        for proveedor, peticiones in por_proveedor.items():
+            tiempos = sorted(p['latencia_ms'] for p in peticiones)
+            proveedores[proveedor] = {
+                'peticiones': len(peticiones),
+                'errores': sum(not p['correcto'] for p in peticiones),
+                'media_ms': round(sum(tiempos) / len(tiempos), 3),
+                'p50_ms': _percentil(tiempos, 50),
+                'p95_ms': _percentil(tiempos, 95),
+                'max_ms': tiempos[-1]
+            }
+
+        resumen = {
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'fin': datetime.now().isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'duracion_ms': round((time.perf_counter() - self._inicio_perf) * 1000, 3),
+            'cpu_ms': round((time.process_time() - self._inicio_cpu) * 1000, 3),
+            'rss_pico_kb': _rss_pico_kb(),
+            'metricas': metricas,
+            'etapas': por_etapa,
+            'proveedores': proveedores,
+            'spans': spans,
+            'latencias': latencias
+        }
+        if self.medir_memoria and tracemalloc.is_tracing():
+            resumen['memoria_python_pico_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        return resumen
+
+    def reiniciar(self):
+        """Vacía los spans y latencias registrados (modo daemon: un resumen por ciclo)."""
+        with self._bloqueo:
+            self.spans = []
+            self.latencias = []
+            self.metricas = {}
+        self.inicio = datetime.now()
+        self._inicio_perf = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+
+    def escribir_resumen(self, ruta, reiniciar=True, resumen=None):
+        """
+        Escribe el resumen de la ejecución en JSON (escritura atómica: archivo temporal y renombrado).
+        :param ruta: Ruta del archivo JSON
+        :param reiniciar: Si es True, vacía los registros tras escribir el resumen
+        :param resumen: Resumen ya construido (si es None se construye)
+        :return: Ruta escrita o None si hubo error
+        """
+        try:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(resumen or self.resumen(), f, ensure_ascii=False, indent=2, default=str)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"❌ Error escribiendo el resumen de ejecución {ruta}: {e}")
+            return None
+
+        if reiniciar:
+            self.reiniciar()
+        return ruta
+
+
+
+def activar_instrumentacion(instrumentacion):
+    """Registra la instrumentación que usarán span() y registrar_latencia() en todo el proceso."""
+    global _instrumentacion_activa
+    _instrumentacion_activa = instrumentacion
+
+
+
+def obtener_instrumentacion():
+    """Instrumentación activa del proceso o None."""
+    return _instrumentacion_activa
+
+
+
+@contextmanager
+def span(nombre, **atributos):
+    """
+    Span sobre la instrumentación activa. Sin instrumentación activa no mide nada,
+    de modo que los módulos pueden usarse por separado sin DebugMotorBolsaIA.
+    """
+    if _instrumentacion_activa is None:
+        yield {}
+        return
+    with _instrumentacion_activa.span(nombre, **atributos) as registro:
+        yield registro
+
+
+
+def registrar_latencia(proveedor, segundos, correcto=True, **atributos):
+    """Registra la latencia de un proveedor en la instrumentación activa (si existe)."""
+    if _instrumentacion_activa is not None:
+        _instrumentacion_activa.registrar_latencia(proveedor, segundos, correcto, **atributos)
@@ -0,0 +1,249 @@
+import io
+import os
+import sys
+import queue
+import atexit
+import zlib
+import threading
+
+
+# Niveles de traza por módulo (mismos valores que logging)
+NIVELES = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'OFF': 100}
+
+# Configuración por variables de entorno (modo debug):
+#   MOTORBOLSA_LOG_NIVELES="ProcesingDataPandas=INFO,TradingLogicMarket=DEBUG"  nivel por módulo (por defecto DEBUG)
+#   MOTORBOLSA_LOG_MUESTREO=5       trazas detalladas para 1 de cada 5 símbolos (1 = todos)
+#   MOTORBOLSA_LOG_SIMBOLOS=AAPL,BTC trazas detalladas solo para estos símbolos (tiene prioridad sobre el muestreo)
+#   MOTORBOLSA_LOG_SINCRONO=1       desactiva la salida asíncrona
+VARIABLE_NIVELES = "MOTORBOLSA_LOG_NIVELES"
+VARIABLE_MUESTREO = "MOTORBOLSA_LOG_MUESTREO"
+VARIABLE_SIMBOLOS = "MOTORBOLSA_LOG_SIMBOLOS"
+VARIABLE_SINCRONO = "MOTORBOLSA_LOG_SINCRONO"
+
+# Máximo de registros de logging pendientes antes de que el productor espere al hilo escritor
+TAMAÑO_COLA = 10000
+
+_configuracion = {'niveles': {}, 'nivel_defecto': NIVELES['DEBUG'], 'muestreo': 1, 'simbolos': None}
+_salida_original = None
+
+
+
+class EscritorAsincrono(io.TextIOBase):
+    """
+    Envoltorio de un archivo de texto (sys.stdout o un log) que encola las escrituras
+    y las vuelca en lotes desde un hilo en segundo plano. write() no bloquea;
+    flush() espera a que todo lo encolado se haya escrito. Usa SimpleQueue porque su put()
+    es reentrante (los manejadores de señales también escriben por consola).
+    """
+    def __init__(self, destino, nombre="escritor-log"):
+        super().__init__()
+        self.destino = destino
+        self._cola = queue.SimpleQueue()
+        self._fin = object()
+        self._hilo = threading.Thread(target=self._escribir, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def writable(self):
+        return True
+
+    @property
+    def encoding(self):
+        return getattr(self.destino, 'encoding', 'utf-8')
+
+    def isatty(self):
+        return self.destino.isatty()
+
+    def fileno(self):
+        return self.destino.fileno()
+
+    def write(self, texto):
+        if self.closed:
+            return self.destino.write(texto)
+        self._cola.put(texto)
+        return len(texto)
+
+    def flush(self):
+        """Espera a que el hilo escritor vacíe la cola y vuelque el destino."""
+        if self.closed or not self._hilo.is_alive():
+            return
+        escrito = threading.Event()
+        self._cola.put(escrito)
+        escrito.wait()
+
+    def _escribir(self):
+        """Hilo escritor: agrupa los mensajes pendientes en un solo write por lote."""
+        while True:
+            elemento = self._cola.get()
+            lote, eventos, terminar = [], [], False
+            while True:
+                if elemento is self._fin:
+                    terminar = True
+                elif isinstance(elemento, threading.Event):
+                    eventos.append(elemento)
+                else:
+                    lote.append(elemento)
+                try:
+                    elemento = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+
+            try:
+                if lote:
+                    self.destino.write("".join(lote))
+                self.destino.flush()
+            except Exception:
+                # El log nunca debe interrumpir el proceso
+                pass
+            for evento in eventos:
+                evento.set()
+            if terminar:
+                return
+
+    def close(self):
+        """Vacía la cola, detiene el hilo escritor y marca el envoltorio como cerrado (no cierra el destino)."""
+        if self.closed:
+            return
+        if self._hilo.is_alive():
+            self._cola.put(self._fin)
+            self._hilo.join()
+        super().close()
+
+
+
+def configurar_trazas(niveles=None, muestreo=None, simbolos=None):
+    """
+    Configura qué trazas detalladas se generan en modo debug.
+    Sin argumentos se leen las variables de entorno MOTORBOLSA_LOG_*.
+    :param niveles: Diccionario {módulo: nivel} o texto "Modulo=NIVEL,..." ('*' fija el nivel por defecto)
+    :param muestreo: Trazas detalladas para 1 de cada N símbolos
+    :param simbolos: Lista de símbolos con trazas detalladas (prioridad sobre el muestreo)
+    """
+    niveles = os.environ.get(VARIABLE_NIVELES, "") if niveles is None else niveles
+    if isinstance(niveles, str):
+        pares = [par.split('=', 1) for par in niveles.split(',') if '=' in par]
+        niveles = {modulo.strip(): nivel.strip() for modulo, nivel in pares}
+
+    niveles_numericos = {}
+    for modulo, nivel in niveles.items():
+        if str(nivel).upper() not in NIVELES:
+            print(f"⚠️  Nivel de traza no válido para {modulo}: {nivel}. Disponibles: {', '.join(NIVELES)}")
+            continue
+        niveles_numericos[modulo] = NIVELES[str(nivel).upper()]
+
+    if muestreo is None:
+        try:
+            muestreo = int(os.environ.get(VARIABLE_MUESTREO, 1))
+        except ValueError:
+            print(f"⚠️  {VARIABLE_MUESTREO} debe ser un entero: se usan trazas para todos los símbolos")
+            muestreo = 1
+
+    if simbolos is None and os.environ.get(VARIABLE_SIMBOLOS):
+        simbolos = os.environ[VARIABLE_SIMBOLOS].split(',')
+
+    _configuracion['nivel_defecto'] = niveles_numericos.pop('*', NIVELES['DEBUG'])
+    _configuracion['niveles'] = niveles_numericos
+    _configuracion['muestreo'] = max(1, muestreo)
+    _configuracion['simbolos'] = {s.strip() for s in simbolos if s.strip()} if simbolos else None
+
+
+
+def simbolo_muestreado(symbol):
+    """True si el símbolo recibe trazas detalladas (lista explícita o 1 de cada N de forma estable entre ejecuciones)."""
+    if symbol is None:
+        return True
+    if _configuracion['simbolos'] is not None:
+        return symbol in _configuracion['simbolos']
+    muestreo = _configuracion['muestreo']
+    return muestreo == 1 or zlib.crc32(str(symbol).encode('utf-8')) % muestreo == 0
+
+
+
+def traza_activa(modulo, symbol=None, verbose=True, nivel='DEBUG'):
+    """
+    Decide si un módulo debe generar trazas del nivel indicado para un símbolo.
+    Se usa en lugar de 'verbose' en los bucles por símbolo para no formatear trazas que no se muestran.
+    :param modulo: Nombre del módulo (p.ej. 'ProcesingDataPandas')
+    :param symbol: Símbolo procesado (None para trazas generales)
+    :param verbose: Valor de verbose recibido por la función; si es False no hay trazas
+    :param nivel: Nivel de la traza ('DEBUG' para el detalle paso a paso, 'INFO' para resúmenes)
+    """
+    if not verbose:
+        return False
+    nivel_modulo = _configuracion['niveles'].get(modulo, _configuracion['nivel_defecto'])
+    if NIVELES[nivel] < nivel_modulo:
+        return False
+    return nivel != 'DEBUG' or simbolo_muestreado(symbol)
+
+
+
+def registrar(modulo, mensaje, *argumentos, nivel='INFO', symbol=None, verbose=True):
+    """
+    Escribe una traza con formateo diferido: el mensaje solo se construye si la traza está activa.
+    :param mensaje: Texto con marcadores %s o función sin argumentos que devuelve el texto
+    """
+    if not traza_activa(modulo, symbol, verbose, nivel):
+        return
+    if callable(mensaje):
+        mensaje = mensaje()
+    elif argumentos:
+        mensaje = mensaje % argumentos
+    print(mensaje)
+
+
+
+def activar_salida_asincrona():
+    """
+    Sustituye sys.stdout por un EscritorAsincrono: los print del proceso se encolan y un
+    hilo los escribe en lotes. Se restaura y vacía automáticamente al terminar el proceso.
+    :return: True si la salida asíncrona quedó activa
+    """
+    global _salida_original
+    if _salida_original is not None:
+        return True
+    if os.environ.get(VARIABLE_SINCRONO, "").lower() in ('1', 'true', 'yes'):
+        return False
+
+    _salida_original = sys.stdout
+    sys.stdout = EscritorAsincrono(_salida_original, nombre="salida-asincrona")
+    atexit.register(desactivar_salida_asincrona)
+    return True
+
+
+
+def desactivar_salida_asincrona():
+    """Vacía la salida pendiente y restaura sys.stdout."""
+    global _salida_original
+    if _salida_original is None:
+        return
+    escritor = sys.stdout
+    sys.stdout = _salida_original
+    _salida_original = None
+    if isinstance(escritor, EscritorAsincrono):
+        escritor.close()
+
+
+
+def configurar_logging_asincrono(log_file, level=None):
+    """
+    Configura el logger raíz para escribir en el archivo desde un hilo (QueueHandler + QueueListener),
+    con el mismo formato que logging.basicConfig usaba hasta ahora. No hace nada si ya tiene handlers.
+    :return: QueueListener en marcha o None
+    """
+    import logging
+    import logging.handlers
+
+    raiz = logging.getLogger()
+    if raiz.handlers:
+        return None
+
+    manejador_archivo = logging.FileHandler(log_file)
+    manejador_archivo.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+
+    cola = queue.Queue(maxsize=TAMAÑO_COLA)
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    raiz.setLevel(level or logging.INFO)
+
+    oyente = logging.handlers.QueueListener(cola, manejador_archivo, respect_handler_level=True)
+    oyente.start()
+    atexit.register(oyente.stop)
+    return oyente
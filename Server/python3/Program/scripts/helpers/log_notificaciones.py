@@ -0,0 +1,246 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se protege la escritura entre hilos del mismo proceso
+    fcntl = None
+
+
+# Rotación del registro de notificaciones: un segmento nuevo al superar el tamaño o la antigüedad
+TAMAÑO_MAXIMO_SEGMENTO = 5 * 1024 * 1024
+ANTIGUEDAD_MAXIMA_SEGMENTO = 24 * 60 * 60
+SEGMENTOS_MAXIMOS = 60
+COMPRIMIR_SEGMENTOS = True
+
+SUFIJO_INDICE = ".indice.json"
+SUFIJO_BLOQUEO = ".lock"
+
+_registros = {}
+_bloqueo_registros = threading.Lock()
+
+
+
+class RegistroNotificaciones:
+    """
+    Registro de notificaciones en formato JSON Lines de solo escritura al final: cada entrada es
+    una línea, así añadir cuesta O(1) y una caída a mitad de escritura solo puede truncar la última línea.
+    El segmento activo rota por tamaño o antigüedad; los segmentos rotados se comprimen con gzip y
+    se resumen en un índice (rango de fechas y entradas por estrategia) para consultar sin leerlos todos.
+    """
+    def __init__(self, ruta, tamaño_maximo=TAMAÑO_MAXIMO_SEGMENTO, antiguedad_maxima=ANTIGUEDAD_MAXIMA_SEGMENTO,
+                 segmentos_maximos=SEGMENTOS_MAXIMOS, comprimir=COMPRIMIR_SEGMENTOS):
+        self.ruta = ruta
+        self.tamaño_maximo = tamaño_maximo
+        self.antiguedad_maxima = antiguedad_maxima
+        self.segmentos_maximos = segmentos_maximos
+        self.comprimir = comprimir
+        self.ruta_indice = ruta + SUFIJO_INDICE
+        self._bloqueo = threading.Lock()
+
+    @contextmanager
+    def _exclusivo(self):
+        """Exclusión entre hilos y, con fcntl, entre procesos (daemon y ejecuciones manuales)."""
+        with self._bloqueo:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.ruta + SUFIJO_BLOQUEO, "a") as cerrojo:
+                fcntl.flock(cerrojo, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(cerrojo, fcntl.LOCK_UN)
+
+    def añadir(self, entrada):
+        """
+        Añade una entrada (diccionario) al final del segmento activo, rotándolo antes si corresponde.
+        Se agrega el campo 'timestamp' (epoch) si no existe, usado por el índice y las consultas.
+        """
+        entrada = dict(entrada)
+        entrada.setdefault('timestamp', time.time())
+        linea = (json.dumps(entrada, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+        with self._exclusivo():
+            if self._debe_rotar(entrada['timestamp']):
+                self._rotar()
+            with open(self.ruta, "ab+") as f:
+                # Una escritura interrumpida puede dejar la última línea sin salto: se cierra antes de añadir
+                # para no pegar la nueva entrada a la línea parcial
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        linea = b"\n" + linea
+                f.write(linea)
+
+    def _debe_rotar(self, ahora):
+        """True si el segmento activo supera el tamaño máximo o su primera entrada la antigüedad máxima."""
+        try:
+            if os.path.getsize(self.ruta) >= self.tamaño_maximo:
+                return True
+        except OSError:
+            return False
+        primera = next(_leer_entradas(self.ruta), None)
+        return primera is not None and ahora - primera.get('timestamp', ahora) >= self.antiguedad_maxima
+
+    def _rotar(self):
+        """Cierra el segmento activo: lo renombra, lo resume en el índice, lo comprime y poda los más antiguos."""
+        marca = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        rotado = f"{self.ruta}.{marca}"
+        os.replace(self.ruta, rotado)
+
+        resumen = _resumir_segmento(rotado)
+        if self.comprimir:
+            with open(rotado, "rb") as origen, gzip.open(rotado + ".gz", "wb") as destino:
+                shutil.copyfileobj(origen, destino)
+            os.remove(rotado)
+            rotado += ".gz"
+        resumen['archivo'] = os.path.basename(rotado)
+
+        segmentos = self._leer_indice() + [resumen]
+        sobrantes = segmentos[:-self.segmentos_maximos] if self.segmentos_maximos else []
+        for segmento in sobrantes:
+            try:
+                os.remove(os.path.join(os.path.dirname(self.ruta), segmento['archivo']))
+            except OSError:
+                pass
+        self._escribir_indice(segmentos[len(sobrantes):])
+
+    def _leer_indice(self):
+        try:
+            with open(self.ruta_indice, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _escribir_indice(self, segmentos):
+        temporal = f"{self.ruta_indice}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(segmentos, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, self.ruta_indice)
+
+    def segmentos(self, estrategia=None, desde=None, hasta=None):
+        """
+        Rutas de los segmentos que pueden contener entradas de la estrategia en el rango [desde, hasta]
+        (epoch o datetime). El segmento activo se incluye siempre al final.
+        """
+        desde, hasta = _a_epoch(desde), _a_epoch(hasta)
+        directorio = os.path.dirname(self.ruta)
+        rutas = []
+        for segmento in self._leer_indice():
+            if estrategia is not None and estrategia not in segmento['estrategias']:
+                continue
+            if desde is not None and segmento['hasta'] is not None and segmento['hasta'] < desde:
+                continue
+            if hasta is not None and segmento['desde'] is not None and segmento['desde'] > hasta:
+                continue
+            rutas.append(os.path.join(directorio, segmento['archivo']))
+        if os.path.exists(self.ruta):
+            rutas.append(self.ruta)
+        return rutas
+
+    def consultar(self, estrategia=None, desde=None, hasta=None):
+        """
+        Entradas de una estrategia (o de todas) en el rango [desde, hasta], en orden cronológico.
+        Solo se leen los segmentos que el índice no descarta.
+        """
+        desde_epoch, hasta_epoch = _a_epoch(desde), _a_epoch(hasta)
+        for ruta in self.segmentos(estrategia, desde, hasta):
+            for entrada in _leer_entradas(ruta):
+                if estrategia is not None and entrada.get('estrategia') != estrategia:
+                    continue
+                marca = entrada.get('timestamp')
+                if desde_epoch is not None and (marca is None or marca < desde_epoch):
+                    continue
+                if hasta_epoch is not None and (marca is None or marca > hasta_epoch):
+                    continue
+                yield entrada
+
+    def importar_json(self, ruta_json, verbose=False):
+        """
+        Migra un registro antiguo (un único array JSON reescrito en cada envío) al formato JSON Lines
+        y lo renombra a '<ruta>.migrado' para no importarlo dos veces.
+        :return: Número de entradas importadas o None si hubo error
+        """
+        try:
+            with open(ruta_json, "r", encoding="utf-8") as f:
+                entradas = json.load(f)
+            if not isinstance(entradas, list):
+                raise ValueError("el archivo no contiene un array JSON")
+            marca = os.path.getmtime(ruta_json)
+            with self._exclusivo():
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    for entrada in entradas:
+                        entrada.setdefault('timestamp', marca)
+                        f.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+            os.replace(ruta_json, ruta_json + ".migrado")
+        except Exception as e:
+            print(f"❌ Error migrando el registro de notificaciones {ruta_json}: {e}")
+            return None
+
+        if verbose:
+            print(f"📦 Registro de notificaciones migrado a JSON Lines: {len(entradas)} entradas")
+        return len(entradas)
+
+
+
+def _leer_entradas(ruta):
+    """Entradas de un segmento (texto o gzip). Las líneas incompletas o dañadas se ignoran."""
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    try:
+        with abrir(ruta, "rt", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    continue
+    except OSError:
+        return
+
+
+
+def _resumir_segmento(ruta):
+    """Resumen de un segmento para el índice: rango de fechas, número de entradas y entradas por estrategia."""
+    resumen = {'desde': None, 'hasta': None, 'entradas': 0, 'estrategias': {}}
+    for entrada in _leer_entradas(ruta):
+        marca = entrada.get('timestamp')
+        if marca is not None:
+            resumen['desde'] = marca if resumen['desde'] is None else min(resumen['desde'], marca)
+            resumen['hasta'] = marca if resumen['hasta'] is None else max(resumen['hasta'], marca)
+        estrategia = entrada.get('estrategia', '')
+        resumen['estrategias'][estrategia] = resumen['estrategias'].get(estrategia, 0) + 1
+        resumen['entradas'] += 1
+    return resumen
+
+
+
+def _a_epoch(valor):
+    """Convierte datetime a epoch; los números y None se devuelven tal cual."""
+    if isinstance(valor, datetime):
+        return valor.timestamp()
+    return valor
+
+
+
+def obtener_registro(ruta, verbose=False):
+    """
+    Registro de notificaciones para la ruta (uno por proceso). Si la ruta aún no existe y hay un
+    registro antiguo en formato array JSON con el mismo nombre y extensión .log, se migra.
+    """
+    with _bloqueo_registros:
+        registro = _registros.get(ruta)
+        if registro is None:
+            registro = _registros[ruta] = RegistroNotificaciones(ruta)
+            antiguo = os.path.splitext(ruta)[0] + ".log"
+            if antiguo != ruta and not os.path.exists(ruta) and os.path.exists(antiguo):
+                registro.importar_json(antiguo, verbose)
+        return registro
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from helpers.estado_senales import es_columna_señal
+
+
+# Error absoluto máximo al pasar una columna de float64 a float32, como fracción del rango de la columna
+# (una columna de nivel alto y poca variación, p. ej. un precio de 60000 que se mueve 2 puntos, sigue en float64)
+TOLERANCIA_FLOAT32 = 1e-4
+
+# Columnas de señal (texto repetido) que se convierten a categóricas
+VALORES_SEÑAL = ['COMPRA_FUERTE', 'COMPRA', 'HOLD', 'VENTA', 'VENTA_FUERTE']
+
+
+
+def memoria_dataframe(df):
+    """Devuelve la memoria ocupada por un DataFrame en bytes (incluyendo objetos)."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+
+def _cabe_en_float32(valores, tolerancia=TOLERANCIA_FLOAT32):
+    """
+    Comprueba si una columna float64 puede guardarse en float32: el mayor error absoluto de la conversión
+    no puede superar `tolerancia` veces el rango (máximo - mínimo) de la columna. El error relativo de float32
+    (~6e-8) no sirve de criterio porque siempre es pequeño; lo que importa es si se distinguen las variaciones.
+    """
+    finitos = valores[np.isfinite(valores)]
+    if finitos.size == 0:
+        return True
+    if np.abs(finitos).max() > np.finfo(np.float32).max:
+        return False
+    escala = np.ptp(finitos) or np.abs(finitos).max()
+    if escala == 0:
+        return True
+    error_absoluto = np.abs(finitos.astype(np.float32).astype(np.float64) - finitos).max()
+    return error_absoluto <= tolerancia * escala
+
+
+
+def _tipo_volumen(valores):
+    """Elige el entero más pequeño que representa el volumen sin pérdida (o None si no es entero)."""
+    if np.isnan(valores).any() or not (valores == np.round(valores)).all():
+        return None
+    if valores.size and valores.min() >= 0 and valores.max() <= np.iinfo(np.uint32).max:
+        return np.uint32
+    return np.int64
+
+
+
+def compactar_dataframe(df, eliminar_descripciones=True, tolerancia=TOLERANCIA_FLOAT32):
+    """
+    Reduce la memoria de un DataFrame de resultados:
+    precios e indicadores en float32 cuando la precisión lo permite (ver _cabe_en_float32), volumen entero,
+    señales categóricas y, opcionalmente, sin columnas de descripción.
+    :param df: DataFrame con datos, indicadores y señales
+    :param eliminar_descripciones: Si es True, elimina las columnas *_descripcion
+    :param tolerancia: Error absoluto máximo para float32, como fracción del rango de cada columna
+    :return: Nuevo DataFrame compactado
+    """
+    columnas = {}
+    categoria_señal = pd.CategoricalDtype(VALORES_SEÑAL)
+
+    for columna in df.columns:
+        serie = df[columna]
+
+        if eliminar_descripciones and columna.endswith('_descripcion'):
+            continue
+
+        if columna == 'Volume' and serie.dtype.kind in 'fi':
+            tipo = _tipo_volumen(serie.to_numpy(dtype=np.float64))
+            columnas[columna] = serie.astype(tipo) if tipo else serie
+        elif serie.dtype == np.float64:
+            valores = serie.to_numpy()
+            columnas[columna] = serie.astype(np.float32) if _cabe_en_float32(valores, tolerancia) else serie
+        elif serie.dtype == object and es_columna_señal(columna):
+            # Señales con valores fuera del catálogo se guardan con sus propias categorías
+            if serie.dropna().isin(VALORES_SEÑAL).all():
+                columnas[columna] = serie.astype(categoria_señal)
+            else:
+                columnas[columna] = serie.astype('category')
+        else:
+            columnas[columna] = serie
+
+    return pd.DataFrame(columnas, index=df.index)
+
+
+
+def compactar_dataframes(dataframes, eliminar_descripciones=True, verbose=False):
+    """
+    Aplica el modo compacto a todos los símbolos e informa la memoria ahorrada por símbolo.
+    :param dataframes: Diccionario {symbol: DataFrame}
+    :param eliminar_descripciones: Si es True, elimina las columnas *_descripcion
+    :param verbose: Si es True, muestra el detalle por símbolo
+    :return: Tupla (diccionario de DataFrames compactados, reporte {symbol: {'antes', 'despues', 'ahorro'}})
+    """
+    compactados = {}
+    reporte = {}
+
+    for symbol, df in dataframes.items():
+        antes = memoria_dataframe(df)
+        try:
+            df_compacto = compactar_dataframe(df, eliminar_descripciones)
+        except Exception as e:
+            print(f"⚠️  No se pudo compactar {symbol}: {e}")
+            compactados[symbol] = df
+            continue
+
+        despues = memoria_dataframe(df_compacto)
+        compactados[symbol] = df_compacto
+        reporte[symbol] = {'antes': antes, 'despues': despues, 'ahorro': antes - despues}
+
+        if verbose:
+            porcentaje = (antes - despues) / antes * 100 if antes else 0
+            print(f"  🗜️  {symbol}: {antes / 1024:.1f} KB -> {despues / 1024:.1f} KB ({porcentaje:.1f}% ahorrado)")
+
+    total_antes = sum(r['antes'] for r in reporte.values())
+    total_despues = sum(r['despues'] for r in reporte.values())
+    if total_antes:
+        print(f"🗜️  Modo compacto: {total_antes / 1024 / 1024:.2f} MB -> {total_despues / 1024 / 1024:.2f} MB "
+              f"({(total_antes - total_despues) / total_antes * 100:.1f}% ahorrado en {len(reporte)} símbolos)")
+
+    return compactados, reporte
@@ -0,0 +1,272 @@
+import os
+import math
+import threading
+
+
+# Archivo de métricas en formato texto de Prometheus (recolector textfile de node_exporter)
+RUTA_METRICAS = "/app/logs/metricas/motorbolsaia.prom"
+
+# Endpoint HTTP /metrics del modo daemon
+PUERTO_METRICAS = int(os.environ.get("MOTORBOLSA_PUERTO_METRICAS", 9108))
+HOST_METRICAS = os.environ.get("MOTORBOLSA_HOST_METRICAS", "0.0.0.0")
+
+# Cubetas por defecto (segundos) para latencias de red y tiempos de cálculo
+CUBETAS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CUBETAS_CALCULO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+
+def _formatear_valor(valor):
+    """Formatea un número según la exposición de texto de Prometheus."""
+    if valor == math.inf:
+        return "+Inf"
+    if valor == -math.inf:
+        return "-Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    """Construye el bloque {etiqueta="valor",...} escapando barras, comillas y saltos de línea."""
+    pares = list(zip(nombres, valores)) + (list(extra.items()) if extra else [])
+    if not pares:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{nombre}="{escapar(valor)}"' for nombre, valor in pares) + "}"
+
+
+
+class _Metrica:
+    """Base de las métricas: nombre, ayuda, etiquetas y series por combinación de etiquetas."""
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._bloqueo = threading.Lock()
+
+    def _clave(self, etiquetas):
+        """Valores de etiquetas en el orden declarado."""
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre}: se esperaban las etiquetas {self.etiquetas} y se recibieron {tuple(etiquetas)}")
+        return tuple(str(etiquetas[nombre]) for nombre in self.etiquetas)
+
+    def exportar(self):
+        """Líneas de la métrica en formato de texto de Prometheus."""
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._bloqueo:
+            series = sorted(self._series.items())
+        for valores, serie in series:
+            lineas.extend(self._exportar_serie(valores, serie))
+        return lineas
+
+    def _exportar_serie(self, valores, serie):
+        return [f"{self.nombre}{_formatear_etiquetas(self.etiquetas, valores)} {_formatear_valor(serie)}"]
+
+    def reiniciar(self):
+        with self._bloqueo:
+            self._series = {}
+
+
+
+class Contador(_Metrica):
+    """Contador monótono (peticiones, errores, filas ingeridas, ...)."""
+    tipo = "counter"
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        if cantidad < 0:
+            raise ValueError(f"{self.nombre}: un contador no puede decrementarse")
+        clave = self._clave(etiquetas)
+        with self._bloqueo:
+            self._series[clave] = self._series.get(clave, 0) + cantidad
+
+
+
+class Medidor(_Metrica):
+    """Valor que sube y baja (último timestamp, símbolos activos, duración de la última ejecución, ...)."""
+    tipo = "gauge"
+
+    def establecer(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._bloqueo:
+            self._series[clave] = valor
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._bloqueo:
+            self._series[clave] = self._series.get(clave, 0) + cantidad
+
+
+
+class Histograma(_Metrica):
+    """Distribución de observaciones por cubetas acumuladas (latencias, tiempos de cálculo)."""
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas))
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._bloqueo:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {'cubetas': [0] * len(self.cubetas), 'suma': 0.0, 'cuenta': 0}
+            for i, limite in enumerate(self.cubetas):
+                if valor <= limite:
+                    serie['cubetas'][i] += 1
+            serie['suma'] += valor
+            serie['cuenta'] += 1
+
+    def _exportar_serie(self, valores, serie):
+        lineas = []
+        for limite, cuenta in zip(self.cubetas, serie['cubetas']):
+            etiquetas = _formatear_etiquetas(self.etiquetas, valores, {'le': _formatear_valor(float(limite))})
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {cuenta}")
+        etiquetas_inf = _formatear_etiquetas(self.etiquetas, valores, {'le': '+Inf'})
+        etiquetas_serie = _formatear_etiquetas(self.etiquetas, valores)
+        lineas.append(f"{self.nombre}_bucket{etiquetas_inf} {serie['cuenta']}")
+        lineas.append(f"{self.nombre}_sum{etiquetas_serie} {_formatear_valor(serie['suma'])}")
+        lineas.append(f"{self.nombre}_count{etiquetas_serie} {serie['cuenta']}")
+        return lineas
+
+
+
+class RegistroMetricas:
+    """Registro de las métricas del proceso. Devuelve la misma métrica si ya está registrada."""
+    def __init__(self):
+        self._metricas = {}
+        self._bloqueo = threading.Lock()
+
+    def _registrar(self, clase, nombre, ayuda, etiquetas, **opciones):
+        with self._bloqueo:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **opciones)
+            elif not isinstance(metrica, clase):
+                raise ValueError(f"La métrica {nombre} ya está registrada como {metrica.tipo}")
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Medidor, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_LATENCIA):
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, cubetas=cubetas)
+
+    def exportar_texto(self):
+        """Todas las métricas en formato de exposición de texto de Prometheus (versión 0.0.4)."""
+        with self._bloqueo:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.extend(metrica.exportar())
+        return "\n".join(lineas) + "\n"
+
+    def reiniciar(self):
+        """Vacía los valores de todas las métricas (se mantienen registradas)."""
+        with self._bloqueo:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            metrica.reiniciar()
+
+
+
+# Registro global del proceso y métricas del motor
+REGISTRO = RegistroMetricas()
+
+PETICIONES_PROVEEDOR = REGISTRO.contador(
+    "motorbolsa_peticiones_proveedor_total", "Peticiones HTTP a cada proveedor de datos por resultado", ("proveedor", "resultado"))
+LATENCIA_PROVEEDOR = REGISTRO.histograma(
+    "motorbolsa_latencia_proveedor_segundos", "Latencia de las peticiones a cada proveedor de datos", ("proveedor",), CUBETAS_LATENCIA)
+DESCARGAS_SIMBOLO = REGISTRO.contador(
+    "motorbolsa_descargas_simbolo_total", "Descargas de símbolos por intervalo y resultado (ok, fallo)", ("intervalo", "resultado"))
+FILAS_INGERIDAS = REGISTRO.contador(
+    "motorbolsa_filas_ingeridas_total", "Barras OHLCV descargadas por intervalo", ("intervalo",))
+DURACION_INDICADORES = REGISTRO.histograma(
+    "motorbolsa_indicadores_segundos", "Tiempo de cálculo de los indicadores técnicos de un símbolo", (), CUBETAS_CALCULO)
+FILAS_INDICADORES = REGISTRO.contador(
+    "motorbolsa_filas_indicadores_total", "Filas procesadas en el cálculo de indicadores", ())
+DURACION_ANALISIS = REGISTRO.histograma(
+    "motorbolsa_analisis_segundos", "Tiempo de aplicar las estrategias de trading a un símbolo", (), CUBETAS_CALCULO)
+SEÑALES_GENERADAS = REGISTRO.contador(
+    "motorbolsa_senales_total", "Señal de consenso de la última barra de cada símbolo analizado", ("senal",))
+NOTIFICACIONES = REGISTRO.contador(
+    "motorbolsa_notificaciones_total", "Resultados de la comparación de notificaciones por estrategia", ("estrategia", "resultado"))
+CAMBIOS_SEÑAL = REGISTRO.contador(
+    "motorbolsa_cambios_senal_total", "Cambios de señal detectados entre ejecuciones", ("estrategia",))
+ALERTAS_AGRUPADAS = REGISTRO.contador(
+    "motorbolsa_alertas_agrupadas_total", "Cambios de señal por destino de la agrupación (inmediata, agrupada, oscilacion, descartada)", ("estrategia", "resultado"))
+ENVIOS_NOTIFICACION = REGISTRO.contador(
+    "motorbolsa_envios_notificacion_total", "Lotes de notificación por canal y resultado (enviada, reintento, fallida, duplicada)", ("canal", "resultado"))
+DURACION_EJECUCION = REGISTRO.medidor(
+    "motorbolsa_ejecucion_duracion_segundos", "Duración de la última ejecución de cada estrategia", ("estrategia",))
+ULTIMA_EJECUCION = REGISTRO.medidor(
+    "motorbolsa_ultima_ejecucion_timestamp_segundos", "Momento (epoch) de la última ejecución completada por estrategia", ("estrategia", "resultado"))
+
+
+
+def escribir_metricas(ruta=RUTA_METRICAS, verbose=False):
+    """
+    Escribe las métricas en formato de texto de Prometheus de forma atómica
+    (archivo temporal y renombrado), para el recolector textfile de node_exporter.
+    :return: Ruta escrita o None si hubo error
+    """
+    try:
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(REGISTRO.exportar_texto())
+        os.replace(temporal, ruta)
+    except Exception as e:
+        print(f"❌ Error escribiendo las métricas en {ruta}: {e}")
+        return None
+
+    if verbose:
+        print(f"📈 Métricas escritas en {ruta}")
+    return ruta
+
+
+
+def iniciar_servidor_metricas(puerto=PUERTO_METRICAS, host=HOST_METRICAS, verbose=False):
+    """
+    Expone las métricas en http://host:puerto/metrics desde un hilo en segundo plano.
+    :return: Servidor HTTP (llamar a shutdown() para detenerlo) o None si no se pudo iniciar
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class ManejadorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            contenido = REGISTRO.exportar_texto().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, formato, *argumentos):
+            # Las consultas periódicas de Prometheus no se muestran por consola
+            if verbose:
+                super().log_message(formato, *argumentos)
+
+    try:
+        servidor = ThreadingHTTPServer((host, puerto), ManejadorMetricas)
+    except OSError as e:
+        print(f"❌ No se pudo iniciar el endpoint de métricas en {host}:{puerto}: {e}")
+        return None
+
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="servidor-metricas", daemon=True).start()
+    print(f"📈 Métricas disponibles en http://{host}:{servidor.server_address[1]}/metrics")
+    return servidor
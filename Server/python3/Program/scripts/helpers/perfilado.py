@@ -0,0 +1,301 @@
+import os
+import sys
+import threading
+from datetime import datetime
+
+
+# Perfiles junto a los logs del motor
+DIRECTORIO_PERFILES = "/app/logs/perfiles"
+
+MODOS_PERFIL = ('cprofile', 'sample', 'tracemalloc')
+
+# Etapas seleccionables desde Start.py y spans de la instrumentación que cubre cada una
+ETAPAS_PERFIL = {
+    'fetch': ('descarga',),
+    'conversion': ('conversion', 'validacion'),
+    'indicators': ('indicadores', 'panel'),
+    'analysis': ('analisis', 'panel'),
+    'reports': ('generar_reportes',),
+    'events': ('eventos_senal',),
+    'notifications': ('notificaciones',),
+    'pipeline': ('obtener_indices_mercado', 'obtener_indices_mercado_estrategias'),
+}
+ETAPAS_POR_DEFECTO = ('fetch', 'indicators', 'analysis', 'reports')
+
+FLAG_PERFIL = '--profile'
+FLAG_ETAPAS_PERFIL = '--profile-stages'
+
+
+
+def extraer_opciones_perfil(argumentos):
+    """
+    Separa de los argumentos de Start.py las opciones --profile[=modo] y --profile-stages=etapas.
+    :return: Tupla (argumentos restantes, modo o None, lista de etapas o None)
+    """
+    restantes, modo, etapas = [], None, None
+    for argumento in argumentos:
+        if argumento == FLAG_PERFIL:
+            modo = 'cprofile'
+        elif argumento.startswith(f"{FLAG_PERFIL}="):
+            modo = argumento.split('=', 1)[1].lower()
+        elif argumento.startswith(f"{FLAG_ETAPAS_PERFIL}="):
+            etapas = [etapa.strip().lower() for etapa in argumento.split('=', 1)[1].split(',') if etapa.strip()]
+        else:
+            restantes.append(argumento)
+    return restantes, modo, etapas
+
+
+
+def resolver_etapas(etapas=None):
+    """
+    Convierte las etapas de la línea de comandos en nombres de spans.
+    :param etapas: Lista de etapas de ETAPAS_PERFIL o 'all' (por defecto ETAPAS_POR_DEFECTO)
+    :return: Diccionario {span: etapa} o None si alguna etapa no es válida
+    """
+    etapas = list(etapas or ETAPAS_POR_DEFECTO)
+    if 'all' in etapas:
+        etapas = [etapa for etapa in ETAPAS_PERFIL if etapa != 'pipeline']
+
+    invalidas = [etapa for etapa in etapas if etapa not in ETAPAS_PERFIL]
+    if invalidas:
+        print(f"❌ Etapas de perfilado no válidas: {invalidas}. Disponibles: {', '.join(ETAPAS_PERFIL)}, all")
+        return None
+
+    spans = {}
+    for etapa in etapas:
+        for nombre_span in ETAPAS_PERFIL[etapa]:
+            spans.setdefault(nombre_span, etapa)
+    return spans
+
+
+
+def _describir_frame(frame):
+    """Función y archivo de un frame para las pilas colapsadas."""
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+
+class Perfilador:
+    """
+    Perfila las etapas seleccionadas del proceso enganchándose a los spans de la instrumentación:
+      - cprofile: un cProfile por etapa, guardado como .pstats
+      - sample: muestreo de pilas a baja frecuencia desde un hilo, guardado en formato colapsado (flamegraph)
+      - tracemalloc: diferencia de snapshots al entrar y salir de cada etapa, con los mayores asignadores
+    Solo se perfila el span seleccionado más externo de cada hilo.
+    """
+    def __init__(self, modo, etapas=None, directorio=DIRECTORIO_PERFILES, intervalo_muestreo=0.005, top=25, verbose=False):
+        """
+        :param modo: 'cprofile', 'sample' o 'tracemalloc'
+        :param etapas: Lista de etapas de ETAPAS_PERFIL (por defecto ETAPAS_POR_DEFECTO)
+        :param intervalo_muestreo: Segundos entre muestras en modo 'sample'
+        :param top: Número de entradas mostradas en los resúmenes
+        """
+        if modo not in MODOS_PERFIL:
+            raise ValueError(f"Modo de perfilado no válido: {modo}. Disponibles: {', '.join(MODOS_PERFIL)}")
+        spans = resolver_etapas(etapas)
+        if spans is None:
+            raise ValueError(f"Etapas de perfilado no válidas: {etapas}")
+
+        self.modo = modo
+        self.spans = spans
+        self.directorio = directorio
+        self.intervalo_muestreo = intervalo_muestreo
+        self.top = top
+        self.verbose = verbose
+
+        self._bloqueo = threading.Lock()
+        self._activos = {}       # id de hilo -> span perfilado en curso
+        self._perfiles = {}      # cprofile: span -> cProfile.Profile
+        self._muestras = {}      # sample: span -> {pila: muestras}
+        self._asignaciones = {}  # tracemalloc: span -> {línea: [bytes, bloques]}
+        self._muestreador = None
+        self._detener_muestreo = threading.Event()
+
+    def iniciar_etapa(self, nombre, registro):
+        """Empieza a perfilar el span si está seleccionado. Devuelve el token para finalizar_etapa."""
+        hilo = threading.get_ident()
+        with self._bloqueo:
+            if nombre not in self.spans or hilo in self._activos:
+                return None
+            # cProfile no admite el mismo perfil activo en dos hilos a la vez
+            if self.modo == 'cprofile' and nombre in self._activos.values():
+                return None
+            self._activos[hilo] = nombre
+
+        if self.modo == 'cprofile':
+            import cProfile
+            perfil = self._perfiles.setdefault(nombre, cProfile.Profile())
+            try:
+                perfil.enable()
+            except ValueError as e:
+                # Otro perfilador ya está activo en el proceso
+                print(f"⚠️  No se pudo perfilar {nombre}: {e}")
+                with self._bloqueo:
+                    self._activos.pop(hilo, None)
+                return None
+            return (hilo, nombre, perfil)
+
+        if self.modo == 'sample':
+            self._iniciar_muestreador()
+            return (hilo, nombre, None)
+
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return (hilo, nombre, tracemalloc.take_snapshot())
+
+    def finalizar_etapa(self, token):
+        """Detiene el perfilado del span iniciado con iniciar_etapa."""
+        if token is None:
+            return
+        hilo, nombre, estado = token
+
+        if self.modo == 'cprofile':
+            estado.disable()
+
+        elif self.modo == 'tracemalloc':
+            import tracemalloc
+            filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+            final = tracemalloc.take_snapshot().filter_traces(filtros)
+            diferencias = final.compare_to(estado.filter_traces(filtros), 'lineno')
+            with self._bloqueo:
+                acumulado = self._asignaciones.setdefault(nombre, {})
+                for diferencia in diferencias:
+                    if diferencia.size_diff <= 0:
+                        continue
+                    linea = str(diferencia.traceback[0])
+                    totales = acumulado.setdefault(linea, [0, 0])
+                    totales[0] += diferencia.size_diff
+                    totales[1] += diferencia.count_diff
+
+        with self._bloqueo:
+            self._activos.pop(hilo, None)
+
+    def _iniciar_muestreador(self):
+        """Arranca (una sola vez) el hilo que muestrea las pilas de los hilos en etapas seleccionadas."""
+        with self._bloqueo:
+            if self._muestreador is not None:
+                return
+            self._muestreador = threading.Thread(target=self._muestrear, name="perfilador-muestreo", daemon=True)
+        self._muestreador.start()
+
+    def _muestrear(self):
+        """Bucle de muestreo: cada intervalo toma la pila de cada hilo que está en una etapa seleccionada."""
+        while not self._detener_muestreo.wait(self.intervalo_muestreo):
+            with self._bloqueo:
+                activos = dict(self._activos)
+            if not activos:
+                continue
+            frames = sys._current_frames()
+            for hilo, nombre in activos.items():
+                frame = frames.get(hilo)
+                pila = []
+                while frame is not None:
+                    pila.append(_describir_frame(frame))
+                    frame = frame.f_back
+                if not pila:
+                    continue
+                clave = ";".join(reversed(pila))
+                with self._bloqueo:
+                    muestras = self._muestras.setdefault(nombre, {})
+                    muestras[clave] = muestras.get(clave, 0) + 1
+
+    def _ruta(self, etiqueta, marca, nombre, extension):
+        return os.path.join(self.directorio, f"perfil_{etiqueta}_{marca}_{nombre}.{extension}")
+
+    def escribir(self, etiqueta="ejecucion"):
+        """
+        Guarda los perfiles de la ejecución en DIRECTORIO_PERFILES, muestra un resumen
+        y reinicia los datos acumulados (modo daemon: un perfil por ciclo).
+        :param etiqueta: Texto incluido en el nombre de los archivos (p.ej. la estrategia)
+        :return: Lista de rutas escritas
+        """
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+        except OSError as e:
+            print(f"❌ No se pudo crear el directorio de perfiles {self.directorio}: {e}")
+            return []
+
+        with self._bloqueo:
+            perfiles, self._perfiles = self._perfiles, {}
+            muestras, self._muestras = self._muestras, {}
+            asignaciones, self._asignaciones = self._asignaciones, {}
+
+        rutas = []
+        try:
+            if self.modo == 'cprofile':
+                rutas = self._escribir_cprofile(perfiles, etiqueta, marca)
+            elif self.modo == 'sample':
+                rutas = self._escribir_muestras(muestras, etiqueta, marca)
+            else:
+                rutas = self._escribir_tracemalloc(asignaciones, etiqueta, marca)
+        except Exception as e:
+            print(f"❌ Error escribiendo los perfiles: {e}")
+
+        if not rutas:
+            print(f"⚠️  Perfilado {self.modo}: ninguna etapa seleccionada se ejecutó ({', '.join(sorted(set(self.spans.values())))})")
+        for ruta in rutas:
+            print(f"🔬 Perfil guardado: {ruta}")
+        return rutas
+
+    def _escribir_cprofile(self, perfiles, etiqueta, marca):
+        import io
+        import pstats
+
+        rutas = []
+        for nombre, perfil in perfiles.items():
+            ruta = self._ruta(etiqueta, marca, nombre, 'pstats')
+            perfil.dump_stats(ruta)
+            rutas.append(ruta)
+
+            salida = io.StringIO()
+            pstats.Stats(perfil, stream=salida).sort_stats('cumulative').print_stats(self.top)
+            print(f"\n🔬 cProfile - {nombre} (top {self.top} por tiempo acumulado)")
+            print("\n".join(salida.getvalue().strip().splitlines()[:self.top + 8]))
+        return rutas
+
+    def _escribir_muestras(self, muestras, etiqueta, marca):
+        rutas = []
+        for nombre, pilas in muestras.items():
+            ruta = self._ruta(etiqueta, marca, nombre, 'folded')
+            with open(ruta, 'w', encoding='utf-8') as f:
+                for pila, cuenta in sorted(pilas.items(), key=lambda x: x[1], reverse=True):
+                    f.write(f"{pila} {cuenta}\n")
+            rutas.append(ruta)
+
+            # Tiempo propio: función en la cima de la pila
+            total = sum(pilas.values())
+            propio = {}
+            for pila, cuenta in pilas.items():
+                funcion = pila.rsplit(";", 1)[-1]
+                propio[funcion] = propio.get(funcion, 0) + cuenta
+            print(f"\n🔬 Muestreo - {nombre}: {total} muestras cada {self.intervalo_muestreo * 1000:.0f} ms (≈{total * self.intervalo_muestreo:.2f}s)")
+            for funcion, cuenta in sorted(propio.items(), key=lambda x: x[1], reverse=True)[:self.top]:
+                print(f"   {cuenta / total:>6.1%}  {funcion}")
+        return rutas
+
+    def _escribir_tracemalloc(self, asignaciones, etiqueta, marca):
+        if not asignaciones:
+            return []
+        ruta = self._ruta(etiqueta, marca, 'asignaciones', 'txt')
+        lineas = []
+        for nombre, por_linea in asignaciones.items():
+            total = sum(bytes_ for bytes_, _ in por_linea.values())
+            lineas.append(f"=== {nombre}: {total / 1024:.1f} KB retenidos al salir de la etapa ===")
+            for linea, (bytes_, bloques) in sorted(por_linea.items(), key=lambda x: x[1][0], reverse=True)[:self.top]:
+                lineas.append(f"{bytes_ / 1024:>10.1f} KB {bloques:>8} bloques  {linea}")
+            lineas.append("")
+
+        with open(ruta, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lineas))
+
+        print(f"\n🔬 tracemalloc - mayores asignadores por etapa")
+        print("\n".join(lineas))
+        return [ruta]
+
+    def detener(self):
+        """Detiene el hilo de muestreo (si se inició)."""
+        self._detener_muestreo.set()
@@ -0,0 +1,203 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# Cambios de señal pendientes de enviar en el siguiente resumen de cada destinatario
+RUTA_RESUMEN = "/app/tmp/alertas_pendientes.sqlite"
+
+# Valores por defecto de la sección [Resumen] de notificaciones.info. Cada opción admite variantes
+# '<opcion>.<estrategia>' y '<opcion>.<estrategia>.<destinatario>' ('*' como estrategia = todas)
+OPCIONES_RESUMEN = {
+    'ventana': 3600.0,          # segundos que se acumulan los cambios antes de enviar el resumen
+    'fuerza_inmediata': 0.75,   # |fuerza_señal| desde la que el cambio se envía sin esperar
+    'fuerza_minima': 0.0,       # |fuerza_señal| por debajo de la cual el cambio no se notifica
+}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS alertas_pendientes (
+    estrategia TEXT NOT NULL,
+    canal TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    columna TEXT NOT NULL,
+    anterior TEXT NOT NULL,
+    actual TEXT NOT NULL,
+    fuerza REAL,
+    inmediata INTEGER NOT NULL,
+    primera REAL NOT NULL,
+    ultima REAL NOT NULL,
+    PRIMARY KEY (estrategia, canal, destinatario, symbol, columna)
+) WITHOUT ROWID;
+"""
+
+_agrupador = None
+_bloqueo_agrupador = threading.Lock()
+
+
+
+class AgrupadorAlertas:
+    """
+    Agrupa los cambios de señal por estrategia y destinatario en resúmenes periódicos:
+    - varios cambios de la misma señal dentro de la ventana se fusionan (A→B→C se envía como A→C),
+    - una señal que vuelve a su valor inicial (A→B→A) se descarta como oscilación,
+    - los cambios con |fuerza_señal| >= fuerza_inmediata adelantan el resumen del destinatario,
+    - los cambios con |fuerza_señal| < fuerza_minima no se notifican.
+    Los pendientes se guardan en SQLite, así la ventana abarca varias ejecuciones, y solo se retiran con
+    confirmar una vez encolado el resumen: si el encolado falla, se reintentan en la siguiente ejecución.
+    """
+    def __init__(self, ruta=RUTA_RESUMEN, opciones=None):
+        """
+        :param opciones: Diccionario de la sección [Resumen] ({'ventana': 900, 'ventana.corto_plazo': 0, ...})
+        """
+        self.ruta = ruta
+        self.opciones = {clave.lower(): valor for clave, valor in (opciones or {}).items()}
+
+    def opcion(self, nombre, estrategia, destinatario):
+        """Valor de una opción para la estrategia y el destinatario (de lo más específico a lo general)."""
+        for clave in (f"{nombre}.{estrategia}.{destinatario}", f"{nombre}.*.{destinatario}", f"{nombre}.{estrategia}", nombre):
+            if clave.lower() in self.opciones:
+                return self.opciones[clave.lower()]
+        return OPCIONES_RESUMEN[nombre]
+
+    @contextmanager
+    def _transaccion(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(_ESQUEMA)
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                yield conexion
+                conexion.execute("COMMIT")
+            except Exception:
+                conexion.execute("ROLLBACK")
+                raise
+        finally:
+            conexion.close()
+
+    def procesar(self, estrategia, destinatarios, transiciones, fuerzas, ahora=None):
+        """
+        Registra los cambios nuevos y devuelve los resúmenes que ya deben enviarse (siguen pendientes
+        hasta llamar a confirmar).
+        :param destinatarios: Lista de tuplas (canal, destinatario)
+        :param transiciones: Cambios de señal de estado_senales.comparar_matrices (sin la fuerza)
+        :param fuerzas: Diccionario {symbol: fuerza_señal actual}
+        :return: Tupla (resúmenes {(canal, destinatario): [cambios]}, contadores {resultado: n})
+        """
+        ahora = time.time() if ahora is None else ahora
+        contadores = {'inmediata': 0, 'agrupada': 0, 'oscilacion': 0, 'descartada': 0}
+
+        with self._transaccion() as conexion:
+            for canal, destinatario in destinatarios:
+                fuerza_minima = self.opcion('fuerza_minima', estrategia, destinatario)
+                fuerza_inmediata = self.opcion('fuerza_inmediata', estrategia, destinatario)
+
+                for transicion in transiciones:
+                    symbol, columna = transicion['symbol'], transicion['columna']
+                    fuerza = fuerzas.get(symbol)
+                    intensidad = 0.0 if fuerza is None or fuerza != fuerza else abs(fuerza)
+                    if intensidad < fuerza_minima:
+                        contadores['descartada'] += 1
+                        continue
+                    inmediata = intensidad >= fuerza_inmediata
+                    clave = (estrategia, canal, destinatario, symbol, columna)
+
+                    pendiente = conexion.execute(
+                        "SELECT anterior FROM alertas_pendientes WHERE estrategia = ? AND canal = ? AND destinatario = ? "
+                        "AND symbol = ? AND columna = ?", clave).fetchone()
+                    if pendiente and pendiente[0] == transicion['actual']:
+                        # A→B→A dentro de la ventana: no hay nada que notificar
+                        conexion.execute(
+                            "DELETE FROM alertas_pendientes WHERE estrategia = ? AND canal = ? AND destinatario = ? "
+                            "AND symbol = ? AND columna = ?", clave)
+                        contadores['oscilacion'] += 1
+                    elif pendiente:
+                        conexion.execute(
+                            "UPDATE alertas_pendientes SET actual = ?, fuerza = ?, inmediata = MAX(inmediata, ?), ultima = ? "
+                            "WHERE estrategia = ? AND canal = ? AND destinatario = ? AND symbol = ? AND columna = ?",
+                            (transicion['actual'], fuerza, int(inmediata), ahora) + clave)
+                        contadores['inmediata' if inmediata else 'agrupada'] += 1
+                    else:
+                        conexion.execute(
+                            "INSERT INTO alertas_pendientes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            clave + (transicion['anterior'], transicion['actual'], fuerza, int(inmediata), ahora, ahora))
+                        contadores['inmediata' if inmediata else 'agrupada'] += 1
+
+            resumenes = self._extraer_vencidos(conexion, estrategia, ahora)
+
+        return resumenes, contadores
+
+    def _extraer_vencidos(self, conexion, estrategia, ahora):
+        """Pendientes de los destinatarios con cambios inmediatos o la ventana cumplida."""
+        grupos = conexion.execute(
+            "SELECT canal, destinatario, MIN(primera), MAX(inmediata) FROM alertas_pendientes "
+            "WHERE estrategia = ? GROUP BY canal, destinatario", (estrategia,)).fetchall()
+
+        resumenes = {}
+        for canal, destinatario, primera, inmediata in grupos:
+            if not inmediata and ahora - primera < self.opcion('ventana', estrategia, destinatario):
+                continue
+            filas = conexion.execute(
+                "SELECT symbol, columna, anterior, actual, fuerza, inmediata FROM alertas_pendientes "
+                "WHERE estrategia = ? AND canal = ? AND destinatario = ? ORDER BY inmediata DESC, symbol, columna",
+                (estrategia, canal, destinatario)).fetchall()
+            resumenes[(canal, destinatario)] = [
+                {'symbol': symbol, 'columna': columna, 'anterior': anterior, 'actual': actual,
+                 'fuerza': fuerza, 'inmediata': bool(inmediata)}
+                for symbol, columna, anterior, actual, fuerza, inmediata in filas
+            ]
+        return resumenes
+
+    def confirmar(self, estrategia, canal, destinatarios, hasta):
+        """
+        Retira los pendientes ya encolados de los destinatarios (los actualizados después de `hasta`
+        se conservan para el siguiente resumen).
+        :param hasta: Instante pasado a procesar al extraer los resúmenes
+        """
+        with self._transaccion() as conexion:
+            conexion.executemany(
+                "DELETE FROM alertas_pendientes WHERE estrategia = ? AND canal = ? AND destinatario = ? AND ultima <= ?",
+                [(estrategia, canal, destinatario, hasta) for destinatario in destinatarios])
+
+
+
+def formatear_resumen(estrategia, cambios):
+    """Texto del resumen de un destinatario: primero los cambios inmediatos (⚡) y después el resto."""
+    mensaje = f"🔔 *Actualización de Trading ({estrategia})* 🔔\n\n"
+    mensaje += "📈 *Cambios detectados:*\n"
+    for cambio in cambios:
+        fuerza = 'N/A' if cambio['fuerza'] is None else f"{cambio['fuerza']:.2f}"
+        marca = "⚡ " if cambio['inmediata'] else ""
+        mensaje += f"• {marca}{cambio['symbol']} ({cambio['columna']}): De {cambio['anterior']} a {cambio['actual']} (Fuerza: {fuerza})\n"
+    return mensaje
+
+
+
+def agrupar_por_mensaje(estrategia, resumenes):
+    """
+    Une los destinatarios que reciben el mismo texto para encolarlos juntos (un lote por canal y mensaje).
+    :return: Diccionario {(canal, mensaje): [destinatarios]}
+    """
+    envios = {}
+    for (canal, destinatario), cambios in resumenes.items():
+        envios.setdefault((canal, formatear_resumen(estrategia, cambios)), []).append(destinatario)
+    return envios
+
+
+
+def obtener_agrupador(verbose=False):
+    """Agrupador del proceso con las opciones de la sección [Resumen] de notificaciones.info."""
+    global _agrupador
+
+    with _bloqueo_agrupador:
+        if _agrupador is None:
+            from helpers.config_loader import cargar_configuracion_notificaciones
+
+            _agrupador = AgrupadorAlertas(opciones=cargar_configuracion_notificaciones(verbose=verbose).get('resumen'))
+        return _agrupador
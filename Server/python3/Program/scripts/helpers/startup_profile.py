@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import subprocess
+
+
+# Presupuesto de arranque en frío de Start.py (importar el módulo, antes de ejecutar ninguna etapa)
+PRESUPUESTO_ARRANQUE_MS = 150
+
+# Módulos que deben cargarse solo en la etapa que los usa (nunca al importar Start.py)
+MODULOS_PESADOS = ['pandas', 'numpy', 'requests', 'plotly', 'openpyxl', 'matplotlib']
+
+FLAG_PERFIL_ARRANQUE = '--startup-profile'
+
+_PATRON_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+
+def _parsear_importtime(salida_stderr):
+    """
+    Convierte la salida de 'python -X importtime' en una lista de módulos.
+    :return: Tupla (lista de diccionarios {'modulo', 'propio_ms', 'acumulado_ms', 'nivel'}, resto de líneas de stderr)
+    """
+    modulos = []
+    resto = []
+    for linea in salida_stderr.splitlines():
+        coincidencia = _PATRON_IMPORTTIME.match(linea)
+        if not coincidencia:
+            if not linea.startswith('import time:'):
+                resto.append(linea)
+            continue
+        propio, acumulado, sangria, modulo = coincidencia.groups()
+        modulos.append({
+            'modulo': modulo,
+            'propio_ms': int(propio) / 1000,
+            'acumulado_ms': int(acumulado) / 1000,
+            'nivel': (len(sangria) - 1) // 2
+        })
+    return modulos, resto
+
+
+
+def medir_arranque(directorio_programa=None, modulo='Start'):
+    """
+    Mide en un proceso nuevo (caché de módulos fría) el tiempo de importar Start.py.
+    :param directorio_programa: Directorio que contiene Start.py (por defecto el del proyecto)
+    :return: Tupla (tiempo de importación en ms, lista de módulos pesados cargados) o (None, []) si falló
+    """
+    directorio_programa = directorio_programa or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    comando = [sys.executable, '-X', 'importtime', '-c', f'import {modulo}']
+    proceso = subprocess.run(comando, cwd=directorio_programa, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        print(f"❌ No se pudo importar {modulo}: {proceso.stderr.strip().splitlines()[-1:]}")
+        return None, []
+
+    modulos, _ = _parsear_importtime(proceso.stderr)
+    tiempo_ms = next((m['acumulado_ms'] for m in modulos if m['modulo'] == modulo), None)
+    pesados = [m['modulo'] for m in modulos if m['modulo'] in MODULOS_PESADOS]
+    return tiempo_ms, pesados
+
+
+
+def verificar_presupuesto_arranque(presupuesto_ms=PRESUPUESTO_ARRANQUE_MS, directorio_programa=None):
+    """
+    Comprueba que el arranque en frío de Start.py no supera el presupuesto y que no
+    importa módulos pesados. Pensado para ejecutarse como chequeo de regresión.
+    :return: True si se cumple el presupuesto
+    """
+    tiempo_ms, pesados = medir_arranque(directorio_programa)
+    if tiempo_ms is None:
+        return False
+
+    correcto = tiempo_ms <= presupuesto_ms and not pesados
+    icono = "✅" if correcto else "❌"
+    print(f"{icono} Arranque en frío de Start.py: {tiempo_ms:.1f} ms (presupuesto {presupuesto_ms} ms)")
+    if pesados:
+        print(f"❌ Módulos pesados importados al arrancar: {pesados}")
+    return correcto
+
+
+
+def mostrar_perfil_arranque(modulos, top=25):
+    """
+    Muestra los módulos con mayor tiempo de importación acumulado y el total por paquete raíz.
+    """
+    if not modulos:
+        print("⚠️  No se registraron importaciones")
+        return
+
+    total_ms = sum(m['acumulado_ms'] for m in modulos if m['nivel'] == 0)
+    print(f"\n{'=' * 80}")
+    print(f"⏱️  PERFIL DE ARRANQUE: {len(modulos)} módulos importados en {total_ms:.1f} ms")
+    print(f"{'=' * 80}")
+
+    # Tiempo propio agregado por paquete raíz (pandas, plotly, requests, ...)
+    por_paquete = {}
+    for m in modulos:
+        raiz = m['modulo'].split('.')[0]
+        por_paquete[raiz] = por_paquete.get(raiz, 0) + m['propio_ms']
+    print("📦 Por paquete (tiempo propio):")
+    for paquete, tiempo in sorted(por_paquete.items(), key=lambda x: x[1], reverse=True)[:10]:
+        print(f"   {paquete:<35} {tiempo:>9.1f} ms")
+
+    print(f"\n🐢 Top {top} módulos (tiempo acumulado):")
+    print(f"   {'Módulo':<50} {'Acumulado':>11} {'Propio':>9}")
+    for m in sorted(modulos, key=lambda x: x['acumulado_ms'], reverse=True)[:top]:
+        print(f"   {m['modulo'][:50]:<50} {m['acumulado_ms']:>8.1f} ms {m['propio_ms']:>6.1f} ms")
+
+
+
+def ejecutar_con_perfil_arranque(argumentos, script=None, top=25):
+    """
+    Vuelve a ejecutar Start.py con 'python -X importtime' y, al terminar, muestra el tiempo
+    de importación por módulo de toda la ejecución (cada etapa carga sus módulos al usarse)
+    y el chequeo del presupuesto de arranque en frío.
+    :param argumentos: Argumentos de Start.py sin el flag --startup-profile
+    :param script: Ruta de Start.py (por defecto sys.argv[0])
+    :return: Código de salida del proceso
+    """
+    script = script or os.path.abspath(sys.argv[0])
+    comando = [sys.executable, '-X', 'importtime', script] + list(argumentos)
+    proceso = subprocess.run(comando, stderr=subprocess.PIPE, text=True)
+
+    modulos, resto = _parsear_importtime(proceso.stderr)
+    if resto:
+        print("\n".join(resto), file=sys.stderr)
+
+    mostrar_perfil_arranque(modulos, top)
+    verificar_presupuesto_arranque(directorio_programa=os.path.dirname(script))
+    return proceso.returncode
+
+
+
+if __name__ == "__main__":
+    # Chequeo de regresión: python scripts/helpers/startup_profile.py [presupuesto_ms]
+    presupuesto = int(sys.argv[1]) if len(sys.argv) > 1 else PRESUPUESTO_ARRANQUE_MS
+    sys.exit(0 if verificar_presupuesto_arranque(presupuesto) else 1)
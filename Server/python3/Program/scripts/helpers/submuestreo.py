@@ -0,0 +1,95 @@
+import numpy as np
+
+
+# Submuestreo de series largas para los gráficos interactivos: las últimas barras se conservan completas
+# y el histórico anterior se reduce (LTTB en líneas y barras, agregación OHLC en velas).
+
+
+
+def indices_lttb(y, puntos):
+    """
+    Largest-Triangle-Three-Buckets: índices de los `puntos` valores que mejor conservan la forma visual
+    de la serie (picos y valles), usando la posición de la barra como eje X. Incluye siempre el primero y el último;
+    los NaN se ignoran.
+    :param y: Valores de la serie
+    :param puntos: Número de puntos a conservar
+    :return: Array de índices ordenado
+    """
+    y = np.asarray(y, dtype=np.float64)
+    validos = np.flatnonzero(~np.isnan(y))
+    if len(validos) < len(y):
+        return validos[indices_lttb(y[validos], puntos)]
+
+    n = len(y)
+    if puntos >= n:
+        return np.arange(n)
+    if puntos < 3:
+        return np.unique(np.linspace(0, n - 1, max(puntos, 1)).astype(np.int64))
+
+    # n - 2 puntos interiores en puntos - 2 cubetas (con puntos < n ninguna queda vacía)
+    limites = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+    tamaños = np.diff(limites)
+    medias_x = np.add.reduceat(np.arange(1, n - 1, dtype=np.float64), limites[:-1] - 1) / tamaños
+    medias_y = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / tamaños
+    # Punto de referencia de cada cubeta: la media de la siguiente (o el último punto)
+    siguiente_x = np.append(medias_x[1:], n - 1)
+    siguiente_y = np.append(medias_y[1:], y[-1])
+
+    seleccion = np.empty(puntos, dtype=np.int64)
+    seleccion[0], seleccion[-1] = 0, n - 1
+    a = 0
+    for i in range(puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        candidatos = np.arange(inicio, fin)
+        areas = np.abs((a - siguiente_x[i]) * (y[inicio:fin] - y[a]) - (a - candidatos) * (siguiente_y[i] - y[a]))
+        a = inicio + int(np.argmax(areas))
+        seleccion[i + 1] = a
+    return seleccion
+
+
+
+def _partir(n, puntos, ventana_completa):
+    """Barras del histórico antiguo (a reducir) y puntos que le tocan; la ventana reciente ocupa como mucho la mitad."""
+    recientes = min(max(ventana_completa, 0), puntos // 2)
+    return n - recientes, puntos - recientes
+
+
+
+def reducir_serie(y, puntos, ventana_completa=0):
+    """
+    Índices a dibujar de una serie: las últimas `ventana_completa` barras completas y el resto con LTTB
+    hasta completar `puntos`.
+    :return: Array de índices ordenado (todos si la serie cabe en el presupuesto o puntos <= 0)
+    """
+    n = len(y)
+    if puntos <= 0 or n <= puntos:
+        return np.arange(n)
+    antiguas, puntos_antiguas = _partir(n, puntos, ventana_completa)
+    return np.concatenate([indices_lttb(np.asarray(y)[:antiguas], puntos_antiguas), np.arange(antiguas, n)])
+
+
+
+def reducir_velas(apertura, maximo, minimo, cierre, puntos, ventana_completa=0):
+    """
+    Velas a dibujar: las últimas `ventana_completa` completas y el resto agrupadas en cubetas de barras
+    consecutivas (apertura de la primera, máximo y mínimo de la cubeta, cierre de la última), así no se
+    pierde ningún extremo de precio.
+    :return: Tupla (índices de la primera barra de cada vela, apertura, máximo, mínimo, cierre)
+    """
+    apertura, maximo, minimo, cierre = (np.asarray(v, dtype=np.float64) for v in (apertura, maximo, minimo, cierre))
+    n = len(cierre)
+    if puntos <= 0 or n <= puntos:
+        return np.arange(n), apertura, maximo, minimo, cierre
+
+    antiguas, puntos_antiguas = _partir(n, puntos, ventana_completa)
+    inicios = np.linspace(0, antiguas, puntos_antiguas + 1).astype(np.int64)[:-1]
+    finales = np.append(inicios[1:], antiguas) - 1
+
+    indices = np.concatenate([inicios, np.arange(antiguas, n)])
+    return (
+        indices,
+        np.concatenate([apertura[inicios], apertura[antiguas:]]),
+        np.concatenate([np.fmax.reduceat(maximo[:antiguas], inicios), maximo[antiguas:]]),
+        np.concatenate([np.fmin.reduceat(minimo[:antiguas], inicios), minimo[antiguas:]]),
+        np.concatenate([cierre[finales], cierre[antiguas:]])
+    )